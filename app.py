@@ -7,6 +7,8 @@ from pathlib import Path
 import streamlit as st
 import yaml
 
+from core import capture, health
+from core.metrics import MetricsConfig, start_exporters
 from logging_setup import setup_logging
 
 
@@ -26,6 +28,9 @@ setup_logging(
     backup_count=log_cfg.get("backup_count", 3),
 )
 logger = logging.getLogger(__name__)
+start_exporters(MetricsConfig.from_dict(defaults.get("metrics")))
+capture.configure(capture.CaptureConfig.from_dict(defaults.get("capture")))
+health.configure(health.HealthConfig.from_dict(defaults.get("health")))
 
 
 st.set_page_config(page_title="Modbus RTU UI", page_icon="🔌", layout="wide")
@@ -33,6 +38,8 @@ st.set_page_config(page_title="Modbus RTU UI", page_icon="🔌", layout="wide")
 # Session state defaults
 if "role" not in st.session_state:
     st.session_state.role = "RO"  # RO / OP / ADMIN
+if "defaults" not in st.session_state:
+    st.session_state.defaults = defaults
 if "connection" not in st.session_state:
     st.session_state.connection = {"connected": False, "port": None}
 
@@ -55,10 +62,11 @@ Pages principales:
 - Connexion — sélectionner le port série et tester.
 - Scan réseau — détecter les esclaves Modbus (1…247).
 - Appareil — lecture/écriture avec profils YAML.
-- Graphes — visualisation (à venir).
-- Console — trames brutes (à venir).
-- Journal & Export — logs et exports (à venir).
+- Graphes — courbes en direct et historique SQLite.
+- Console — trames brutes Tx/Rx capturées.
+- Journal & Export — logs, exports CSV/Excel et stockage.
 - Profils — gestion des profils d'appareils.
+- Métriques — télémétrie du bus (latences, erreurs, octets).
 """)
 
 with st.expander("Configuration chargée"):
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Generic, List, Optional, Tuple, TypeVar
+
+from core.bus_manager import Priority, get_bus
+from core.decode import DecodeLayout, decode_block
+from core.modbus_client import ModbusParams
+from core.read_planner import DEFAULT_MAX_GAP, ReadBlock, read_blocks
+from core.recorder import Recorder
+from core.scheduler import DEFAULT_BUDGET, EdfScheduler, LoadReport, PollTask
+from profiles.schema import DeviceProfile
+from storage.sqlite import MeasurementWriter
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class AcquisitionConfig:
+    enabled: bool = True
+    hz: float = 5.0  # default rate of registers without their own poll_s
+    max_gap: int = DEFAULT_MAX_GAP
+    buffer_size: int = 3000
+    bus_budget: float = DEFAULT_BUDGET
+
+    @classmethod
+    def from_dict(cls, cfg: Optional[dict]) -> "AcquisitionConfig":
+        cfg = cfg or {}
+        return cls(
+            enabled=bool(cfg.get("enabled", cls.enabled)),
+            hz=float(cfg.get("hz", cls.hz)),
+            max_gap=int(cfg.get("max_gap", cls.max_gap)),
+            buffer_size=int(cfg.get("buffer_size", cls.buffer_size)),
+            bus_budget=float(cfg.get("bus_budget", cls.bus_budget)),
+        )
+
+
+@dataclass
+class Sample:
+    """Raw words and decoded values read from one unit in one go.
+
+    Samples in the ring buffer hold the registers of one scheduled read; the
+    per-unit ``AcquisitionService.latest`` sample merges all of them.
+    """
+
+    seq: int
+    ts: float
+    port: str
+    unit_id: int
+    raw: Dict[str, Optional[List[int]]]
+    values: Dict[str, Optional[float]]
+    duration_s: float
+
+
+@dataclass
+class PollTarget:
+    unit_id: int
+    profile: DeviceProfile
+    tasks: List[PollTask] = field(default_factory=list)
+
+    @property
+    def blocks(self) -> List[ReadBlock]:
+        return [t.block for t in self.tasks]
+
+    @property
+    def layouts(self) -> List[DecodeLayout]:
+        return [t.layout for t in self.tasks]
+
+
+class RingBuffer(Generic[T]):
+    """Bounded, thread-safe ring with sequence numbers.
+
+    The producer never waits on readers: old items are overwritten and readers
+    catch up with ``since(seq)``, getting only what they have not seen yet.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self._items: List[Optional[T]] = [None] * capacity
+        self._next_seq = 0
+        self._lock = threading.Lock()
+
+    def append(self, item: T) -> int:
+        with self._lock:
+            seq = self._next_seq
+            self._items[seq % self.capacity] = item
+            self._next_seq = seq + 1
+        return seq
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest item, -1 when empty."""
+        return self._next_seq - 1
+
+    def latest(self) -> Optional[T]:
+        with self._lock:
+            if self._next_seq == 0:
+                return None
+            return self._items[(self._next_seq - 1) % self.capacity]
+
+    def since(self, seq: int) -> Tuple[List[T], int]:
+        """Return items newer than ``seq`` and the new cursor.
+
+        Items already overwritten are silently skipped.
+        """
+        with self._lock:
+            end = self._next_seq
+            start = max(seq + 1, end - self.capacity, 0)
+            items = [self._items[i % self.capacity] for i in range(start, end)]
+        return items, end - 1  # type: ignore[return-value]
+
+
+class AcquisitionService:
+    """Multi-rate poller running on its own thread.
+
+    Each target's registers are block-planned per poll interval and the
+    reads are released by an ``EdfScheduler`` (earliest deadline first, on an
+    absolute grid, load shed evenly when the bus is over budget). Every read
+    publishes one ``Sample`` into a ring buffer.
+    """
+
+    def __init__(
+        self,
+        params: ModbusParams,
+        cfg: Optional[AcquisitionConfig] = None,
+        buffer: Optional[RingBuffer[Sample]] = None,
+    ) -> None:
+        self.params = params
+        self.cfg = cfg or AcquisitionConfig()
+        # Several services may publish into one shared (thread-safe) buffer
+        self.buffer: RingBuffer[Sample] = buffer if buffer is not None else RingBuffer(self.cfg.buffer_size)
+        # Shared with UI sessions on the same port; polls yield to writes and interactive reads
+        self.client = get_bus(params.port).handle(Priority.POLL)
+        self.last_error: Optional[str] = None
+        self.scheduler = EdfScheduler(params, budget=self.cfg.bus_budget)
+        self.cycles = 0  # scheduled reads done
+        self.last_cycle_s = 0.0
+        # Newest sample per unit; plain dict reads never block the poll thread
+        self.latest: Dict[int, Sample] = {}
+        # Optional historian; samples are handed over without waiting on disk
+        self.writer: Optional[MeasurementWriter] = None
+        # Per-register deadband/change-only policies, applied before the writer
+        self.recorder = Recorder()
+        self._targets: Dict[int, PollTarget] = {}
+        self._targets_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- targets ----
+    def set_target(self, unit_id: int, profile: DeviceProfile) -> None:
+        tasks = self.scheduler.plan_unit(unit_id, profile, 1.0 / max(self.cfg.hz, 0.01), self.cfg.max_gap)
+        target = PollTarget(unit_id=unit_id, profile=profile, tasks=tasks)
+        with self._targets_lock:
+            self._targets[unit_id] = target
+        self.recorder.set_profile(self.params.port, unit_id, profile)
+        self.scheduler.set_unit(unit_id, tasks, time.monotonic())
+        self._wake.set()
+
+    def remove_target(self, unit_id: int) -> None:
+        self.scheduler.remove_unit(unit_id, time.monotonic())
+        with self._targets_lock:
+            self._targets.pop(unit_id, None)
+        self.latest.pop(unit_id, None)
+        self.recorder.remove(self.params.port, unit_id)
+
+    @property
+    def overruns(self) -> int:
+        """Releases skipped because a read fell a whole period behind."""
+        return self.scheduler.report().missed
+
+    def load(self) -> LoadReport:
+        return self.scheduler.report()
+
+    def set_writer(self, writer: Optional[MeasurementWriter]) -> None:
+        """Start/stop historizing; held series are closed on the old writer."""
+        if writer is self.writer:
+            return
+        if self.writer is not None:
+            self.writer.submit_many(self.recorder.flush())
+        self.writer = writer
+
+    def targets(self) -> List[PollTarget]:
+        with self._targets_lock:
+            return list(self._targets.values())
+
+    # ---- lifecycle ----
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        if self.running:
+            return True
+        if not self.client.connect(self.params):
+            self.last_error = self.client.last_error
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"acq-{self.params.port}", daemon=True)
+        self._thread.start()
+        logger.info("Acquisition started on %s at %.1f Hz", self.params.port, self.cfg.hz)
+        return True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.writer is not None:
+            self.writer.submit_many(self.recorder.flush())
+        self.client.close()
+        logger.info("Acquisition stopped on %s", self.params.port)
+
+    # ---- loop ----
+    def _poll(self, target: PollTarget, tasks: List[PollTask]) -> Sample:
+        """Read ``tasks`` (blocks of ``target``) and publish them as one sample."""
+        t0 = time.monotonic()
+        raw: Dict[str, Optional[List[int]]] = {}
+        values: Dict[str, Optional[float]] = {}
+        results = read_blocks(self.client, target.unit_id, [t.block for t in tasks])
+        for res, task in zip(results, tasks):
+            decoded = decode_block(res.words, task.layout).tolist()
+            for (r, regs), ok, v in zip(res.block.split(res.words), res.valid, decoded):
+                raw[r.name] = regs if ok else None
+                values[r.name] = v if ok else None
+        sample = Sample(
+            seq=-1,
+            ts=time.time(),
+            port=self.params.port,
+            unit_id=target.unit_id,
+            raw=raw,
+            values=values,
+            duration_s=time.monotonic() - t0,
+        )
+        sample.seq = self.buffer.append(sample)
+        prev = self.latest.get(target.unit_id)
+        if prev is not None:
+            merged = Sample(
+                sample.seq,
+                sample.ts,
+                sample.port,
+                sample.unit_id,
+                {**prev.raw, **raw},
+                {**prev.values, **values},
+                sample.duration_s,
+            )
+        else:
+            merged = sample
+        self.latest[target.unit_id] = merged
+        if self.writer is not None:
+            self.writer.submit_many(
+                self.recorder.filter(
+                    (sample.ts, self.params.port, target.unit_id, r.name, r.unit or "", values[r.name])
+                    for t in tasks
+                    for r in t.block.registers
+                )
+            )
+        return sample
+
+    def poll_once(self) -> List[Sample]:
+        """Read every register of every target once, one sample per unit."""
+        return [self._poll(target, target.tasks) for target in self.targets()]
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            task, wait = self.scheduler.next(time.monotonic())
+            if task is None:
+                self._wake.wait(min(wait, 1.0))
+                self._wake.clear()
+                continue
+            with self._targets_lock:
+                target = self._targets.get(task.unit_id)
+            t0 = time.monotonic()
+            try:
+                if target is not None:
+                    self._poll(target, [task])
+            except Exception as exc:  # noqa: BLE001
+                self.last_error = str(exc)
+                logger.exception("Acquisition read failed: %s", exc)
+            now = time.monotonic()
+            self.scheduler.complete(task, t0, now - t0)
+            self.cycles += 1
+            self.last_cycle_s = now - t0
+
+
+_services: Dict[str, AcquisitionService] = {}
+_services_lock = threading.Lock()
+
+
+def get_service(port: str) -> Optional[AcquisitionService]:
+    """Process-wide service for ``port`` (shared by every UI session)."""
+    with _services_lock:
+        return _services.get(port)
+
+
+def services() -> Dict[str, AcquisitionService]:
+    with _services_lock:
+        return dict(_services)
+
+
+def start_service(params: ModbusParams, cfg: Optional[AcquisitionConfig] = None) -> AcquisitionService:
+    with _services_lock:
+        svc = _services.get(params.port)
+        if svc is None:
+            svc = AcquisitionService(params, cfg)
+            _services[params.port] = svc
+    svc.start()
+    return svc
+
+
+def stop_service(port: str) -> None:
+    with _services_lock:
+        svc = _services.pop(port, None)
+    if svc is not None:
+        svc.stop()
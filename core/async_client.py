@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from pymodbus.client import AsyncModbusSerialClient
+from pymodbus.exceptions import ModbusIOException
+
+from core.modbus_client import UNIT_KW, ModbusParams
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncModbusRTUClient:
+    """Asyncio counterpart of ``ModbusRTUClient``.
+
+    A half-duplex RS485 bus carries one transaction at a time, so every call is
+    put on a per-bus ``asyncio.Queue`` and executed in order by a single worker
+    task. Callers just ``await`` their result; nobody holds a thread while
+    waiting and the worker starts the next frame as soon as the previous
+    response is in. One event loop can drive several instances (one per
+    adapter) side by side.
+    """
+
+    def __init__(self) -> None:
+        self.client: Optional[AsyncModbusSerialClient] = None
+        self.params: Optional[ModbusParams] = None
+        self.last_error: Optional[str] = None
+        self._queue: Optional[asyncio.Queue[Tuple[Callable[[], Awaitable[Any]], asyncio.Future]]] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def connect(self, p: ModbusParams) -> bool:
+        await self.close()
+        self.last_error = None
+        self.params = p
+        logger.info(
+            "Connecting async Modbus RTU on %s @%d %s %dN%d",
+            p.port,
+            p.baudrate,
+            p.parity,
+            p.stopbits,
+            p.bytesize,
+        )
+        self.client = AsyncModbusSerialClient(
+            port=p.port,
+            baudrate=p.baudrate,
+            parity=p.parity,
+            stopbits=p.stopbits,
+            bytesize=p.bytesize,
+            timeout=p.timeout,
+        )
+        try:
+            ok = await self.client.connect()
+        except Exception as exc:  # noqa: BLE001
+            self.last_error = str(exc)
+            logger.error("Async Modbus connection exception: %s", exc)
+            return False
+        if not ok:
+            self.last_error = "Failed to open Modbus serial connection"
+            logger.error(self.last_error)
+            return False
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run(), name=f"modbus-{p.port}")
+        return True
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, fut = self._queue.get_nowait()
+                if not fut.done():
+                    fut.cancel()
+            self._queue = None
+        if self.client:
+            try:
+                self.client.close()
+            except Exception:  # noqa: BLE001
+                pass
+            self.client = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    # ---- request queue ----
+    async def _run(self) -> None:
+        assert self._queue is not None
+        while True:
+            call, fut = await self._queue.get()
+            if fut.cancelled():
+                continue
+            try:
+                result = await call()
+            except asyncio.CancelledError:
+                # close() while this request was on the wire: its caller must not wait forever
+                if not fut.done():
+                    fut.cancel()
+                raise
+            except Exception as exc:  # noqa: BLE001
+                if not fut.done():
+                    fut.set_exception(exc)
+            else:
+                if not fut.done():
+                    fut.set_result(result)
+
+    async def _submit(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        if self._queue is None:
+            raise RuntimeError("Not connected")
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._queue.put((call, fut))
+        return await fut
+
+    async def _read(self, fc: int, unit: int, address: int, count: int) -> Optional[List[int]]:
+        if not self.client:
+            return None
+        fn = self.client.read_input_registers if fc == 4 else self.client.read_holding_registers
+        try:
+            rr = await self._submit(lambda: fn(address=address, count=count, **{UNIT_KW: unit}))
+        except (ModbusIOException, asyncio.TimeoutError) as exc:
+            logger.debug("FC%02d IO exception: %s", fc, exc)
+            return None
+        if rr.isError():  # type: ignore[attr-defined]
+            logger.debug("FC%02d error @%d unit=%d: %s", fc, address, unit, rr)
+            return None
+        return list(rr.registers)
+
+    async def _write(self, fc: int, unit: int, address: int, call: Callable[[], Awaitable[Any]]) -> bool:
+        try:
+            wr = await self._submit(call)
+        except (ModbusIOException, asyncio.TimeoutError) as exc:
+            logger.debug("FC%02d IO exception: %s", fc, exc)
+            return False
+        if getattr(wr, "isError", lambda: True)():
+            logger.debug("FC%02d error @%d unit=%d: %s", fc, address, unit, wr)
+            return False
+        return True
+
+    # ---- basic operations ----
+    async def read_holding(self, unit: int, address: int, count: int = 1) -> Optional[List[int]]:
+        return await self._read(3, unit, address, count)
+
+    async def read_input(self, unit: int, address: int, count: int = 1) -> Optional[List[int]]:
+        return await self._read(4, unit, address, count)
+
+    async def write_single_register(self, unit: int, address: int, value: int) -> bool:
+        if not self.client:
+            return False
+        client = self.client
+        return await self._write(
+            6, unit, address, lambda: client.write_register(address=address, value=value, **{UNIT_KW: unit})
+        )
+
+    async def write_multiple_registers(self, unit: int, address: int, values: List[int]) -> bool:
+        if not self.client:
+            return False
+        client = self.client
+        return await self._write(
+            16, unit, address, lambda: client.write_registers(address=address, values=values, **{UNIT_KW: unit})
+        )
+
+    # ---- scanning ----
+    async def scan_units(
+        self,
+        ids: Iterable[int],
+        probe_addr: int = 0,
+        probe_count: int = 1,
+        on_result: Optional[Callable[[int, bool], None]] = None,
+    ) -> List[int]:
+        """Return unit IDs responding to a simple FC03 probe (see ``ModbusRTUClient.scan_units``)."""
+        present: List[int] = []
+        for uid in ids:
+            regs = await self.read_holding(unit=uid, address=probe_addr, count=probe_count)
+            if regs is not None:
+                present.append(uid)
+            if on_result is not None:
+                on_result(uid, regs is not None)
+        logger.info("Async scan complete on %s; found units: %s", self.params.port if self.params else "?", present)
+        return present
@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from dataclasses import dataclass, field, replace
+from enum import IntEnum
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from core import timing
+from core.capture import get_capture
+from core.health import UnitHealth
+from core.modbus_client import ModbusParams, ModbusRTUClient, fast_scan
+
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Lower runs first."""
+
+    WRITE = 0  # operator writes, connect/close
+    INTERACTIVE = 1  # reads triggered from the UI
+    POLL = 2  # background acquisition
+    SCAN = 3  # bus scans
+
+
+BusCall = Callable[[ModbusRTUClient], Any]
+
+
+class BusRequest:
+    __slots__ = ("fn", "priority", "key", "future", "submitted", "started")
+
+    def __init__(self, fn: BusCall, priority: int, key: Optional[Hashable]) -> None:
+        self.fn = fn
+        self.priority = priority
+        self.key = key
+        self.future: Future = Future()
+        self.submitted = time.monotonic()
+        self.started = False
+
+
+@dataclass(order=True)
+class _Entry:
+    priority: int
+    seq: int
+    request: BusRequest = field(compare=False)
+
+
+@dataclass
+class BusStats:
+    executed: int = 0
+    deduplicated: int = 0
+    cancelled: int = 0
+    wait_sum_s: Dict[int, float] = field(default_factory=dict)
+    wait_max_s: Dict[int, float] = field(default_factory=dict)
+    count: Dict[int, int] = field(default_factory=dict)
+
+    def mean_wait_s(self, priority: int) -> float:
+        n = self.count.get(priority, 0)
+        return self.wait_sum_s.get(priority, 0.0) / n if n else 0.0
+
+
+class BusManager:
+    """Single owner of one serial port; every transaction goes through it.
+
+    Requests from all sessions and services are queued by (priority, arrival)
+    and executed one at a time by a worker thread, so an RS485 bus never sees
+    overlapping frames and an operator write waits at most for the transaction
+    already on the wire. Reads submitted with a ``key`` already queued share
+    the pending request (and its result) instead of adding a transaction;
+    a higher-priority duplicate promotes the queued one.
+    """
+
+    def __init__(self, port: str) -> None:
+        self.port = port
+        self.client = ModbusRTUClient()
+        self.client.capture = get_capture(port)
+        self.params: Optional[ModbusParams] = None
+        self.stats = BusStats()
+        self._heap: List[_Entry] = []
+        self._pending: Dict[Hashable, BusRequest] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- queue ----
+    def submit(self, fn: BusCall, priority: int = Priority.INTERACTIVE, key: Optional[Hashable] = None) -> Future:
+        """Queue ``fn(client)``; returns a future for its result."""
+        with self._cond:
+            if key is not None:
+                req = self._pending.get(key)
+                if req is not None and not req.future.done():
+                    self.stats.deduplicated += 1
+                    if priority < req.priority:
+                        # promote: the old heap entry is skipped once the request has run
+                        req.priority = priority
+                        heapq.heappush(self._heap, _Entry(priority, next(self._seq), req))
+                        self._cond.notify()
+                    return req.future
+            req = BusRequest(fn, priority, key)
+            if key is not None:
+                self._pending[key] = req
+            heapq.heappush(self._heap, _Entry(priority, next(self._seq), req))
+            self._cond.notify()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"bus-{self.port}", daemon=True)
+                self._thread.start()
+        return req.future
+
+    def call(
+        self,
+        fn: BusCall,
+        priority: int = Priority.INTERACTIVE,
+        key: Optional[Hashable] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Blocking ``submit``; a cancelled request yields ``None``."""
+        try:
+            return self.submit(fn, priority, key).result(timeout)
+        except CancelledError:
+            return None
+
+    def cancel(self, priority: Optional[int] = None) -> int:
+        """Cancel queued requests (of one priority); returns how many."""
+        n = 0
+        with self._cond:
+            seen = set()
+            for entry in self._heap:
+                req = entry.request
+                # a promoted request has two heap entries; count it once
+                if req.started or req.future.done() or id(req) in seen:
+                    continue
+                seen.add(id(req))
+                if (priority is None or req.priority == priority) and req.future.cancel():
+                    n += 1
+        return n
+
+    def queue_depth(self) -> Dict[int, int]:
+        with self._cond:
+            depth: Dict[int, int] = {}
+            seen = set()
+            for entry in self._heap:
+                req = entry.request
+                if req.started or req.future.done() or id(req) in seen:
+                    continue
+                seen.add(id(req))
+                depth[req.priority] = depth.get(req.priority, 0) + 1
+            return depth
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                req = heapq.heappop(self._heap).request
+                if req.started:
+                    continue  # stale entry of a promoted request
+                req.started = True
+                if req.key is not None and self._pending.get(req.key) is req:
+                    del self._pending[req.key]
+            if not req.future.set_running_or_notify_cancel():
+                self.stats.cancelled += 1
+                continue
+            wait = time.monotonic() - req.submitted
+            st = self.stats
+            st.wait_sum_s[req.priority] = st.wait_sum_s.get(req.priority, 0.0) + wait
+            st.wait_max_s[req.priority] = max(st.wait_max_s.get(req.priority, 0.0), wait)
+            st.count[req.priority] = st.count.get(req.priority, 0) + 1
+            try:
+                result = req.fn(self.client)
+            except BaseException as exc:  # noqa: BLE001
+                req.future.set_exception(exc)
+            else:
+                req.future.set_result(result)
+            st.executed += 1
+
+    # ---- connection ----
+    @property
+    def connected(self) -> bool:
+        return self.client.connected
+
+    def open(self, params: ModbusParams) -> bool:
+        """Open the port (or reopen it with new line settings)."""
+        if self.connected and self.params == params:
+            return True
+        if self.connected and self.params is not None:
+            logger.warning("Reconfiguring shared bus %s: %s -> %s", self.port, self.params, params)
+        ok = bool(self.call(lambda c: c.connect(params), Priority.WRITE))
+        self.params = replace(params) if ok else None
+        return ok
+
+    def close(self) -> None:
+        self.call(lambda c: c.close(), Priority.WRITE)
+        self.params = None
+
+    def exclusive(self, fn: BusCall) -> Future:
+        """Queue ``fn(client)`` as one WRITE-priority request that may change line settings.
+
+        Nothing else goes on the wire until it returns (e.g. a baud/parity
+        sweep); the line settings in use before are restored afterwards.
+        """
+        previous = self.params
+
+        def run(client: ModbusRTUClient) -> Any:
+            try:
+                return fn(client)
+            finally:
+                if previous is not None:
+                    client.connect(previous)
+                else:
+                    client.close()
+
+        return self.submit(run, Priority.WRITE)
+
+    def handle(self, priority: int = Priority.INTERACTIVE) -> "BusHandle":
+        return BusHandle(self, priority)
+
+
+class BusHandle:
+    """``ModbusRTUClient``-compatible view of a shared bus at one priority.
+
+    Reads use the handle's priority and are deduplicated; writes always run
+    at ``Priority.WRITE`` and scans at ``Priority.SCAN``, one request per
+    probe so other traffic interleaves. ``close`` leaves the shared port
+    open; use ``close_bus`` to release it.
+    """
+
+    def __init__(self, bus: BusManager, priority: int = Priority.INTERACTIVE) -> None:
+        self.bus = bus
+        self.priority = priority
+
+    @property
+    def params(self) -> Optional[ModbusParams]:
+        return self.bus.params
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return self.bus.client.last_error
+
+    def health(self) -> List[UnitHealth]:
+        """Circuit-breaker state of every unit seen on this bus (snapshot)."""
+        return self.bus.client.health.snapshot()
+
+    def reset_health(self, unit: Optional[int] = None) -> None:
+        self.bus.client.health.reset(unit)
+
+    def connect(self, p: ModbusParams) -> bool:
+        return self.bus.open(p)
+
+    def close(self) -> None:
+        pass
+
+    # ---- basic operations ----
+    def read_holding(self, unit: int, address: int, count: int = 1) -> Optional[List[int]]:
+        return self.bus.call(lambda c: c.read_holding(unit, address, count), self.priority, key=(3, unit, address, count))
+
+    def read_input(self, unit: int, address: int, count: int = 1) -> Optional[List[int]]:
+        return self.bus.call(lambda c: c.read_input(unit, address, count), self.priority, key=(4, unit, address, count))
+
+    def read_registers(
+        self, fc: int, unit: int, address: int, count: int
+    ) -> Tuple[Optional[List[int]], int, Optional[int]]:
+        return self.bus.call(lambda c: c.read_registers(fc, unit, address, count), self.priority)
+
+    def write_single_register(self, unit: int, address: int, value: int) -> bool:
+        return bool(self.bus.call(lambda c: c.write_single_register(unit, address, value), Priority.WRITE))
+
+    def write_multiple_registers(self, unit: int, address: int, values: List[int]) -> bool:
+        return bool(self.bus.call(lambda c: c.write_multiple_registers(unit, address, values), Priority.WRITE))
+
+    def readwrite_registers(
+        self, unit: int, read_address: int, read_count: int, write_address: int, values: List[int]
+    ) -> Optional[List[int]]:
+        return self.bus.call(
+            lambda c: c.readwrite_registers(unit, read_address, read_count, write_address, values), Priority.WRITE
+        )
+
+    # ---- scanning ----
+    def scan_units(
+        self,
+        ids: Iterable[int],
+        probe_addr: int = 0,
+        probe_count: int = 1,
+        on_result: Optional[Callable[[int, bool], None]] = None,
+    ) -> List[int]:
+        # No pymodbus retries: a missing unit holds the bus for one timeout only
+        tmo = self.bus.params.timeout if self.bus.params else None
+        present: List[int] = []
+        for uid in ids:
+            ok = bool(self.bus.call(lambda c, u=uid: c.probe(u, probe_addr, probe_count, tmo), Priority.SCAN))
+            if ok:
+                present.append(uid)
+            if on_result is not None:
+                on_result(uid, ok)
+        logger.info("Scan complete on %s; found units: %s", self.bus.port, present)
+        return present
+
+    def scan_units_fast(
+        self,
+        ids: Iterable[int],
+        probe_addr: int = 0,
+        probe_count: int = 1,
+        turnaround_s: float = timing.DEFAULT_TURNAROUND_S,
+        retry_passes: int = 1,
+        backoff_ms: float = 50,
+        on_result: Optional[Callable[[int, bool], None]] = None,
+    ) -> List[int]:
+        if self.bus.params is None:
+            return []
+        present = fast_scan(
+            lambda uid, tmo: bool(
+                self.bus.call(lambda c: c.probe(uid, probe_addr, probe_count, tmo), Priority.SCAN)
+            ),
+            ids,
+            self.bus.params,
+            probe_count=probe_count,
+            turnaround_s=turnaround_s,
+            retry_passes=retry_passes,
+            backoff_ms=backoff_ms,
+            on_result=on_result,
+        )
+        logger.info("Fast scan complete on %s; found units: %s", self.bus.port, present)
+        return present
+
+
+_buses: Dict[str, BusManager] = {}
+_buses_lock = threading.Lock()
+
+
+def get_bus(port: str) -> BusManager:
+    """Process-wide manager for ``port`` (shared by every UI session and service)."""
+    with _buses_lock:
+        bus = _buses.get(port)
+        if bus is None:
+            bus = _buses[port] = BusManager(port)
+        return bus
+
+
+def buses() -> Dict[str, BusManager]:
+    with _buses_lock:
+        return dict(_buses)
+
+
+def open_bus(params: ModbusParams) -> BusManager:
+    bus = get_bus(params.port)
+    bus.open(params)
+    return bus
+
+
+def close_bus(port: str) -> None:
+    """Release the port for exclusive users (line sweeps, other tools)."""
+    with _buses_lock:
+        bus = _buses.get(port)
+    if bus is not None:
+        bus.close()
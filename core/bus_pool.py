@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.acquisition import AcquisitionConfig, AcquisitionService, RingBuffer, Sample
+from core.bus_manager import Priority, get_bus
+from core.modbus_client import ModbusParams
+from profiles.schema import DeviceProfile
+
+
+logger = logging.getLogger(__name__)
+
+
+class BusPool:
+    """One worker per serial port, results merged into a single stream.
+
+    Each RS485 bus is independent, so scans and polling run on one thread per
+    adapter and total time follows the slowest bus instead of the sum of all
+    buses. Serial I/O releases the GIL, so threads are enough here.
+    Discovered units and samples are keyed by ``(port, unit_id)``.
+    """
+
+    def __init__(self, params: Iterable[ModbusParams], cfg: Optional[AcquisitionConfig] = None) -> None:
+        self.params: Dict[str, ModbusParams] = {p.port: p for p in params}
+        self.cfg = cfg or AcquisitionConfig()
+        self.samples: RingBuffer[Sample] = RingBuffer(self.cfg.buffer_size * max(1, len(self.params)))
+        self.services: Dict[str, AcquisitionService] = {}
+        self.found: Dict[Tuple[str, int], bool] = {}
+        self.progress: Dict[str, int] = {port: 0 for port in self.params}
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    # ---- scanning ----
+    def _scan_port(
+        self,
+        p: ModbusParams,
+        ids: List[int],
+        probe_addr: int,
+        probe_count: int,
+        fast: bool,
+        fast_opts: Dict[str, float],
+    ) -> List[int]:
+        cli = get_bus(p.port).handle(Priority.SCAN)
+        if not cli.connect(p):
+            self.errors[p.port] = cli.last_error or "connection failed"
+            return []
+
+        def on_result(uid: int, present: bool) -> None:
+            with self._lock:
+                self.progress[p.port] += 1
+                if present:
+                    self.found[(p.port, uid)] = True
+
+        if fast:
+            return cli.scan_units_fast(
+                ids, probe_addr=probe_addr, probe_count=probe_count, on_result=on_result, **fast_opts
+            )
+        return cli.scan_units(ids, probe_addr=probe_addr, probe_count=probe_count, on_result=on_result)
+
+    def scan(
+        self,
+        ids: Iterable[int],
+        probe_addr: int = 0,
+        probe_count: int = 1,
+        fast: bool = False,
+        **fast_opts: float,
+    ) -> List[Tuple[str, int]]:
+        """Scan every port in parallel; return the sorted ``(port, unit_id)`` found.
+
+        ``fast`` switches each worker to ``scan_units_fast`` (``fast_opts`` are
+        passed through).
+        """
+        ids = list(ids)
+        with self._lock:
+            self.found.clear()
+            self.errors.clear()
+            self.progress = {port: 0 for port in self.params}
+        if not self.params:
+            return []
+        with ThreadPoolExecutor(max_workers=len(self.params), thread_name_prefix="scan") as ex:
+            futures = {
+                port: ex.submit(self._scan_port, p, ids, probe_addr, probe_count, fast, fast_opts)
+                for port, p in self.params.items()
+            }
+            for port, fut in futures.items():
+                try:
+                    fut.result()
+                except Exception as exc:  # noqa: BLE001
+                    self.errors[port] = str(exc)
+                    logger.exception("Scan failed on %s: %s", port, exc)
+        logger.info("Pool scan complete on %d port(s); found: %s", len(self.params), sorted(self.found))
+        return sorted(self.found)
+
+    # ---- polling ----
+    def start_polling(self) -> Dict[str, bool]:
+        started: Dict[str, bool] = {}
+        for port, p in self.params.items():
+            svc = self.services.get(port)
+            if svc is None:
+                svc = AcquisitionService(p, self.cfg, buffer=self.samples)
+                self.services[port] = svc
+            started[port] = svc.start()
+            if not started[port]:
+                self.errors[port] = svc.last_error or "connection failed"
+        return started
+
+    def set_target(self, port: str, unit_id: int, profile: DeviceProfile) -> None:
+        if port not in self.services:
+            raise KeyError(f"Port {port} is not polled by this pool")
+        self.services[port].set_target(unit_id, profile)
+
+    def latest(self) -> Dict[Tuple[str, int], Sample]:
+        out: Dict[Tuple[str, int], Sample] = {}
+        for port, svc in self.services.items():
+            for uid, sample in list(svc.latest.items()):
+                out[(port, uid)] = sample
+        return out
+
+    def stop(self) -> None:
+        for svc in self.services.values():
+            svc.stop()
+        self.services.clear()
@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import logging
+import os
+import struct
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from core.crc import check_crc
+
+
+logger = logging.getLogger(__name__)
+
+TX, RX = 0, 1
+
+FILE_MAGIC = b"MBCAP1\n"
+# file header: wall-clock ns and monotonic ns taken at the same instant
+FILE_HEADER = struct.Struct("<qq")
+# record: monotonic ns, direction, length; payload follows
+RECORD = struct.Struct("<qBH")
+SPILL_BATCH = 2048
+
+
+@dataclass
+class CaptureConfig:
+    enabled: bool = True
+    ring_kib: int = 4096
+    max_frames: int = 65536
+    rx_merge_gap_ms: float = 2.0  # Rx chunks closer than this belong to one frame
+    spill_dir: str = ""  # captures go to <spill_dir>/<port>_<date>.mbcap
+    spill_on_connect: bool = False
+    spill_interval_s: float = 0.5
+
+    @classmethod
+    def from_dict(cls, cfg: Optional[dict]) -> "CaptureConfig":
+        cfg = cfg or {}
+        return cls(
+            enabled=bool(cfg.get("enabled", cls.enabled)),
+            ring_kib=int(cfg.get("ring_kib", cls.ring_kib)),
+            max_frames=int(cfg.get("max_frames", cls.max_frames)),
+            rx_merge_gap_ms=float(cfg.get("rx_merge_gap_ms", cls.rx_merge_gap_ms)),
+            spill_dir=str(cfg.get("spill_dir", cls.spill_dir) or ""),
+            spill_on_connect=bool(cfg.get("spill_on_connect", cls.spill_on_connect)),
+            spill_interval_s=float(cfg.get("spill_interval_s", cls.spill_interval_s)),
+        )
+
+
+@dataclass
+class Frame:
+    seq: int
+    ts: float  # wall clock seconds
+    mono_ns: int
+    direction: int
+    data: bytes
+
+    @property
+    def unit(self) -> Optional[int]:
+        return self.data[0] if self.data else None
+
+    @property
+    def function(self) -> Optional[int]:
+        return self.data[1] if len(self.data) > 1 else None
+
+    @property
+    def crc_ok(self) -> bool:
+        return check_crc(self.data)
+
+    def hex(self) -> str:
+        return self.data.hex(" ").upper()
+
+
+class FrameCapture:
+    """Preallocated ring of raw Tx/Rx frames for one port.
+
+    Payloads are copied into one ``bytearray`` and metadata into typed
+    arrays indexed by ``seq % max_frames``, so recording a frame allocates
+    nothing. Payload positions are tracked as ever-growing logical offsets:
+    a frame is still readable while ``offset >= written - capacity``.
+    """
+
+    def __init__(self, port: str = "", cfg: Optional[CaptureConfig] = None) -> None:
+        self.port = port
+        self.cfg = cfg or CaptureConfig()
+        self.capacity = max(1024, self.cfg.ring_kib * 1024)
+        self.max_frames = max(16, self.cfg.max_frames)
+        self._data = bytearray(self.capacity)
+        self._view = memoryview(self._data)
+        self._ts = array("q", bytes(8 * self.max_frames))
+        self._offset = array("q", bytes(8 * self.max_frames))
+        self._length = array("H", bytes(2 * self.max_frames))
+        self._dir = array("B", bytes(self.max_frames))
+        self._next_seq = 0
+        self._written = 0  # logical bytes, including wrap padding
+        self._merge_gap_ns = int(self.cfg.rx_merge_gap_ms * 1e6)
+        self._last_rx_end_ns = 0
+        self._lock = threading.Lock()
+        # wall/monotonic pair to convert timestamps for display
+        self.base_wall_ns = time.time_ns()
+        self.base_mono_ns = time.perf_counter_ns()
+        self.enabled = self.cfg.enabled
+        self.spilled_seq = -1
+        self.dropped = 0  # frames overwritten before they were spilled
+        self._spill_path: Optional[Path] = None
+        self._spill_thread: Optional[threading.Thread] = None
+        self._spill_stop = threading.Event()
+
+    # ---- producer side ----
+    def record(self, direction: int, data: bytes | bytearray | memoryview, mono_ns: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        n = len(data)
+        if n == 0:
+            return
+        now = time.perf_counter_ns() if mono_ns is None else mono_ns
+        with self._lock:
+            seq = self._next_seq
+            if (
+                direction == RX
+                and seq
+                and self._dir[(seq - 1) % self.max_frames] == RX
+                and now - self._last_rx_end_ns <= self._merge_gap_ns
+            ):
+                # continuation of the previous Rx chunk: grow it in place if contiguous
+                slot = (seq - 1) % self.max_frames
+                end = self._offset[slot] + self._length[slot]
+                pos = self._offset[slot] % self.capacity + self._length[slot]
+                if end == self._written and self._length[slot] + n <= 0xFFFF and pos + n <= self.capacity:
+                    self._view[pos : pos + n] = data
+                    self._length[slot] += n
+                    self._written += n
+                    self._last_rx_end_ns = now
+                    return
+            n = min(n, self.capacity, 0xFFFF)
+            pos = self._written % self.capacity
+            if pos + n > self.capacity:  # keep payloads contiguous
+                self._written += self.capacity - pos
+                pos = 0
+            self._view[pos : pos + n] = data[:n]
+            slot = seq % self.max_frames
+            self._ts[slot] = now
+            self._offset[slot] = self._written
+            self._length[slot] = n
+            self._dir[slot] = direction
+            self._written += n
+            self._next_seq = seq + 1
+            if direction == RX:
+                self._last_rx_end_ns = now
+
+    # ---- reader side ----
+    @property
+    def last_seq(self) -> int:
+        return self._next_seq - 1
+
+    def first_seq(self) -> int:
+        """Oldest sequence number whose payload is still in the ring."""
+        with self._lock:
+            return self._first_seq_locked()
+
+    def _first_seq_locked(self) -> int:
+        # offsets grow with seq: binary search for the first one not overwritten
+        lo, hi = max(0, self._next_seq - self.max_frames), self._next_seq
+        floor = self._written - self.capacity
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._offset[mid % self.max_frames] < floor:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def wall_time(self, mono_ns: int) -> float:
+        return (self.base_wall_ns + (mono_ns - self.base_mono_ns)) / 1e9
+
+    def frames(self, start: int, stop: int) -> List[Frame]:
+        """Frames with ``start <= seq < stop`` that are still available."""
+        out: List[Frame] = []
+        with self._lock:
+            start = max(start, self._first_seq_locked())
+            stop = min(stop, self._next_seq)
+            for seq in range(start, stop):
+                slot = seq % self.max_frames
+                pos = self._offset[slot] % self.capacity
+                mono = self._ts[slot]
+                out.append(
+                    Frame(
+                        seq=seq,
+                        ts=self.wall_time(mono),
+                        mono_ns=mono,
+                        direction=self._dir[slot],
+                        data=bytes(self._view[pos : pos + self._length[slot]]),
+                    )
+                )
+        return out
+
+    def since(self, seq: int, limit: int = 10000) -> Tuple[List[Frame], int]:
+        frames = self.frames(seq + 1, seq + 1 + limit)
+        return frames, frames[-1].seq if frames else max(seq, self.first_seq() - 1)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._next_seq = 0
+            self._written = 0
+            self.spilled_seq = -1
+
+    # ---- spill to disk ----
+    def start_spill(self, directory: str | Path) -> Path:
+        """Append every captured frame to a binary file from a background thread."""
+        if self._spill_thread is not None and self._spill_thread.is_alive():
+            assert self._spill_path is not None
+            return self._spill_path
+        safe = "".join(ch if ch.isalnum() else "_" for ch in self.port) or "bus"
+        path = Path(directory) / f"{safe}_{time.strftime('%Y%m%d_%H%M%S')}.mbcap"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as fh:
+            fh.write(FILE_MAGIC + FILE_HEADER.pack(self.base_wall_ns, self.base_mono_ns))
+        self._spill_path = path
+        self.spilled_seq = self.last_seq
+        self._spill_stop.clear()
+        self._spill_thread = threading.Thread(target=self._spill_loop, name=f"capture-{safe}", daemon=True)
+        self._spill_thread.start()
+        logger.info("Spilling %s frames to %s", self.port, path)
+        return path
+
+    def stop_spill(self) -> None:
+        self._spill_stop.set()
+        if self._spill_thread is not None:
+            self._spill_thread.join(2.0)
+            self._spill_thread = None
+
+    @property
+    def spill_path(self) -> Optional[Path]:
+        return self._spill_path
+
+    def _spill_once(self, fh) -> None:
+        while True:
+            # bounded batches so the producer never waits long on the lock
+            frames = self.frames(self.spilled_seq + 1, self.spilled_seq + 1 + SPILL_BATCH)
+            if not frames:
+                break
+            if frames[0].seq > self.spilled_seq + 1:
+                self.dropped += frames[0].seq - self.spilled_seq - 1
+                logger.warning("Capture spill lagged on %s: %d frame(s) lost", self.port, self.dropped)
+            buf = bytearray()
+            for f in frames:
+                buf += RECORD.pack(f.mono_ns, f.direction, len(f.data))
+                buf += f.data
+            fh.write(buf)
+            self.spilled_seq = frames[-1].seq
+        fh.flush()
+
+    def _spill_loop(self) -> None:
+        assert self._spill_path is not None
+        with open(self._spill_path, "ab") as fh:
+            while not self._spill_stop.wait(self.cfg.spill_interval_s):
+                self._spill_once(fh)
+            self._spill_once(fh)
+
+
+class CaptureSerial:
+    """Transparent proxy over a pyserial port that records what crosses it."""
+
+    def __init__(self, ser: Any, capture: FrameCapture) -> None:
+        object.__setattr__(self, "_ser", ser)
+        object.__setattr__(self, "_capture", capture)
+
+    def write(self, data: bytes) -> Optional[int]:
+        self._capture.record(TX, data)
+        return self._ser.write(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = self._ser.read(size)
+        if data:
+            self._capture.record(RX, data)
+        return data
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._ser, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._ser, name, value)
+
+
+# ---- capture files ----
+class CaptureFile:
+    """Random access to a ``.mbcap`` file through an in-memory record index."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.offsets = array("q")
+        self.base_wall_ns = 0
+        self.base_mono_ns = 0
+        self._indexed = 0
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Index records appended since the last call (the file may still grow)."""
+        with open(self.path, "rb") as fh:
+            if self._indexed == 0:
+                head = fh.read(len(FILE_MAGIC) + FILE_HEADER.size)
+                if not head.startswith(FILE_MAGIC) or len(head) < len(FILE_MAGIC) + FILE_HEADER.size:
+                    raise ValueError(f"{self.path} is not a capture file")
+                self.base_wall_ns, self.base_mono_ns = FILE_HEADER.unpack_from(head, len(FILE_MAGIC))
+                self._indexed = len(head)
+            size = os.fstat(fh.fileno()).st_size
+            pos = self._indexed
+            fh.seek(pos)
+            while pos + RECORD.size <= size:
+                hdr = fh.read(RECORD.size)
+                _, _, n = RECORD.unpack(hdr)
+                if pos + RECORD.size + n > size:
+                    break  # partial record still being written
+                self.offsets.append(pos)
+                pos += RECORD.size + n
+                fh.seek(pos)
+            self._indexed = pos
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def read(self, indexes: Sequence[int]) -> List[Frame]:
+        out: List[Frame] = []
+        with open(self.path, "rb") as fh:
+            for i in indexes:
+                fh.seek(self.offsets[i])
+                mono, direction, n = RECORD.unpack(fh.read(RECORD.size))
+                out.append(
+                    Frame(
+                        seq=i,
+                        ts=(self.base_wall_ns + (mono - self.base_mono_ns)) / 1e9,
+                        mono_ns=mono,
+                        direction=direction,
+                        data=fh.read(n),
+                    )
+                )
+        return out
+
+    def iter_frames(self, chunk: int = 4096) -> Iterator[Frame]:
+        for start in range(0, len(self), chunk):
+            yield from self.read(range(start, min(start + chunk, len(self))))
+
+
+def filter_frames(
+    frames: Sequence[Frame],
+    direction: Optional[int] = None,
+    unit: Optional[int] = None,
+    function: Optional[int] = None,
+    bad_crc_only: bool = False,
+) -> List[Frame]:
+    out = []
+    for f in frames:
+        if direction is not None and f.direction != direction:
+            continue
+        if unit is not None and f.unit != unit:
+            continue
+        if function is not None and f.function is not None and (f.function & 0x7F) != function:
+            continue
+        if bad_crc_only and f.crc_ok:
+            continue
+        out.append(f)
+    return out
+
+
+_config = CaptureConfig()
+_captures: Dict[str, FrameCapture] = {}
+_captures_lock = threading.Lock()
+
+
+def configure(cfg: CaptureConfig) -> None:
+    """Set the configuration used for captures created from now on."""
+    global _config
+    _config = cfg
+
+
+def get_capture(port: str) -> FrameCapture:
+    """Process-wide capture ring for ``port``; starts spilling if configured."""
+    with _captures_lock:
+        cap = _captures.get(port)
+        if cap is None:
+            cap = _captures[port] = FrameCapture(port, _config)
+            if _config.enabled and _config.spill_dir and _config.spill_on_connect:
+                cap.start_spill(_config.spill_dir)
+        return cap
+
+
+def captures() -> Dict[str, FrameCapture]:
+    with _captures_lock:
+        return dict(_captures)
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import List
+
+
+def _make_table() -> List[int]:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+# CRC-16/MODBUS (poly 0xA001 reflected, init 0xFFFF), one lookup per byte
+CRC_TABLE: List[int] = _make_table()
+
+
+def crc16(data: bytes | bytearray | memoryview, crc: int = 0xFFFF) -> int:
+    table = CRC_TABLE
+    for b in data:
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+    return crc
+
+
+def append_crc(frame: bytes | bytearray) -> bytes:
+    """``frame`` followed by its CRC, low byte first as on the wire."""
+    crc = crc16(frame)
+    return bytes(frame) + bytes((crc & 0xFF, crc >> 8))
+
+
+def check_crc(frame: bytes | bytearray | memoryview) -> bool:
+    """True if the last two bytes of ``frame`` are the CRC of the rest."""
+    if len(frame) < 4:
+        return False
+    return crc16(frame) == 0  # running the CRC over data + CRC yields 0
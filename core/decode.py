@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import logging
+import struct
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.read_planner import DEFAULT_MAX_GAP, ReadBlock, plan_reads
+from profiles.schema import DeviceProfile, Endianness, RegisterDef, RegType
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DecodeLayout:
+    """Precompiled decode plan for a block of raw words.
+
+    ``hi``/``lo`` index the high and low word of every register in the block
+    (the same word for 16-bit types; swapped for ``le`` word order) and
+    ``by_type`` holds, per ``RegType``, the positions of the registers of that
+    type in the output vector.
+    """
+
+    names: Tuple[str, ...]
+    count: int
+    hi: np.ndarray
+    lo: np.ndarray
+    scale: np.ndarray
+    by_type: Dict[RegType, np.ndarray]
+
+
+def compile_layout(registers: Sequence[RegisterDef], base_address: int, count: Optional[int] = None) -> DecodeLayout:
+    hi: List[int] = []
+    lo: List[int] = []
+    by_type: Dict[RegType, List[int]] = {}
+    for i, r in enumerate(registers):
+        off = r.address - base_address
+        if off < 0:
+            raise ValueError(f"Register {r.name} @{r.address} is before block start {base_address}")
+        if int(r.words or 1) == 1:
+            hi.append(off)
+            lo.append(off)
+        elif r.endianness == Endianness.le:
+            hi.append(off + 1)
+            lo.append(off)
+        else:
+            hi.append(off)
+            lo.append(off + 1)
+        by_type.setdefault(r.type, []).append(i)
+    needed = max((max(h, l) + 1 for h, l in zip(hi, lo)), default=0)
+    if count is None:
+        count = needed
+    elif count < needed:
+        raise ValueError(f"Block of {count} word(s) is too short for its registers ({needed})")
+    return DecodeLayout(
+        names=tuple(r.name for r in registers),
+        count=count,
+        hi=np.asarray(hi, dtype=np.intp),
+        lo=np.asarray(lo, dtype=np.intp),
+        scale=np.asarray([float(r.scale) for r in registers], dtype=np.float64),
+        by_type={t: np.asarray(idx, dtype=np.intp) for t, idx in by_type.items()},
+    )
+
+
+def compile_block_layout(block: ReadBlock) -> DecodeLayout:
+    return compile_layout(block.registers, block.address, block.count)
+
+
+def compile_profile(profile: DeviceProfile, max_gap: int = DEFAULT_MAX_GAP) -> List[Tuple[ReadBlock, DecodeLayout]]:
+    """Plan the block reads of ``profile`` and compile a layout for each."""
+    return [(b, compile_block_layout(b)) for b in plan_reads(profile, max_gap=max_gap)]
+
+
+def decode_block(words: Iterable[int], layout: DecodeLayout) -> np.ndarray:
+    """Decode every register of a block in one vectorized pass.
+
+    Returns float64 values (``raw * scale``) in layout order. Results are
+    identical to decoding each register with ``struct`` and Python ints.
+    """
+    w = np.asarray(words, dtype=np.uint32)
+    if w.shape[0] < layout.count:
+        raise ValueError(f"Expected {layout.count} word(s), got {w.shape[0]}")
+    w &= 0xFFFF
+    hi = w[layout.hi]
+    raw32 = (hi << 16) | w[layout.lo]
+    out = np.empty(len(layout.names), dtype=np.float64)
+    for t, idx in layout.by_type.items():
+        if t == RegType.u16:
+            out[idx] = hi[idx]
+        elif t == RegType.i16:
+            out[idx] = hi[idx].astype(np.uint16).view(np.int16)
+        elif t == RegType.u32:
+            out[idx] = raw32[idx]
+        elif t == RegType.i32:
+            out[idx] = raw32[idx].view(np.int32)
+        elif t == RegType.f32:
+            with np.errstate(invalid="ignore"):  # NaN payloads are kept as-is
+                out[idx] = raw32[idx].view(np.float32)
+    out *= layout.scale
+    return out
+
+
+def decode_register(reg: RegisterDef, regs: Optional[Sequence[int]]) -> Optional[float]:
+    """Decode a single register; ``None`` when its words are missing."""
+    if regs is None or len(regs) < int(reg.words or 1):
+        return None
+    layout = compile_layout([reg], reg.address)
+    return float(decode_block(regs, layout)[0])
+
+
+# Integer range of the raw (unscaled) value per type
+_INT_RANGE = {
+    RegType.u16: (0, 0xFFFF),
+    RegType.i16: (-0x8000, 0x7FFF),
+    RegType.u32: (0, 0xFFFFFFFF),
+    RegType.i32: (-0x80000000, 0x7FFFFFFF),
+}
+
+
+def encode_register(reg: RegisterDef, value: float) -> List[int]:
+    """Words to write for ``value`` in engineering units (inverse of ``decode_register``).
+
+    Integers are rounded after removing the scale; values that do not fit
+    the register type raise ``ValueError`` instead of wrapping around.
+    """
+    raw = float(value) / float(reg.scale or 1.0)
+    if reg.type == RegType.f32:
+        try:
+            packed = struct.pack(">f", raw)
+        except OverflowError:
+            raise ValueError(f"{reg.name}: {value} does not fit in f32") from None
+    else:
+        n = int(round(raw))
+        lo, hi = _INT_RANGE[reg.type]
+        if not lo <= n <= hi:
+            raise ValueError(f"{reg.name}: {value} out of {reg.type.value} range")
+        if int(reg.words or 1) == 1:
+            return [n & 0xFFFF]
+        packed = struct.pack(">I", n & 0xFFFFFFFF)
+    hi_word, lo_word = struct.unpack(">HH", packed)
+    return [lo_word, hi_word] if reg.endianness == Endianness.le else [hi_word, lo_word]
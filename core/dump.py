@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from core import metrics
+
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_SPACE = 65536
+MAX_READ_WORDS = 125  # FC03/FC04 limit
+MAX_WRITE_WORDS = 123  # FC16 limit
+ILLEGAL_ADDRESS = 2
+ILLEGAL_VALUE = 3  # some devices answer this for a block crossing a map boundary
+
+# Per-address state
+UNKNOWN, VALID, HOLE = 0, 1, 2
+
+FILE_MAGIC = b"MBDUMP1\0"
+FILE_HEADER = struct.Struct("<8sBBHHd")  # magic, unit, function, start, end (inclusive), created
+
+ProgressFn = Callable[[int, int], None]
+
+
+class RegisterDump:
+    """One unit's register table (FC03 or FC04) with the state of every address.
+
+    Addresses are UNKNOWN until read, then VALID (word stored) or HOLE
+    (the device answered ILLEGAL DATA ADDRESS). Saved as a small header plus
+    the zlib-compressed state and words, so checkpointing is cheap and a
+    sparse map stays a few KiB on disk.
+    """
+
+    def __init__(self, unit: int, function: int = 3, start: int = 0, end: int = ADDRESS_SPACE - 1) -> None:
+        if function not in (3, 4):
+            raise ValueError("function must be 3 (holding) or 4 (input)")
+        if not 0 <= start <= end < ADDRESS_SPACE:
+            raise ValueError("invalid address range")
+        self.unit = unit
+        self.function = function
+        self.start = start
+        self.end = end
+        self.created = time.time()
+        self.state = bytearray(ADDRESS_SPACE)
+        self.words = array("H", bytes(2 * ADDRESS_SPACE))
+
+    # ---- state ----
+    def set_words(self, address: int, words: List[int]) -> None:
+        self.words[address : address + len(words)] = array("H", words)
+        self.state[address : address + len(words)] = bytes((VALID,)) * len(words)
+
+    def mark_hole(self, address: int, count: int) -> None:
+        self.state[address : address + count] = bytes((HOLE,)) * count
+
+    def runs(self, state: int) -> Iterator[Tuple[int, int]]:
+        """(address, count) runs of ``state`` inside the dump range."""
+        a, end = self.start, self.end + 1
+        st = self.state
+        marker = bytes((state,))
+        while a < end:
+            a = st.find(marker, a, end)
+            if a < 0:
+                return
+            b = a
+            while b < end and st[b] == state:
+                b += 1
+            yield a, b - a
+            a = b
+
+    def count(self, state: int) -> int:
+        return self.state.count(bytes((state,)), self.start, self.end + 1)
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start + 1
+
+    @property
+    def complete(self) -> bool:
+        return self.count(UNKNOWN) == 0
+
+    def seed_holes(self, other: "RegisterDump") -> int:
+        """Skip the holes a previous dump of the same device found; returns how many."""
+        n = 0
+        for a, count in other.runs(HOLE):
+            lo, hi = max(a, self.start), min(a + count - 1, self.end)
+            for i in range(lo, hi + 1):
+                if self.state[i] == UNKNOWN:
+                    self.state[i] = HOLE
+                    n += 1
+        return n
+
+    def template(self) -> "RegisterDump":
+        """Empty dump reading exactly this dump's valid addresses (no probing)."""
+        out = RegisterDump(self.unit, self.function, self.start, self.end)
+        out.state = bytearray(HOLE if s != VALID else UNKNOWN for s in self.state)
+        return out
+
+    # ---- file ----
+    def save(self, path: str | Path) -> None:
+        """Atomic write (tmp + rename), safe to call as a checkpoint."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = FILE_HEADER.pack(FILE_MAGIC, self.unit, self.function, self.start, self.end, self.created)
+        body = zlib.compress(bytes(self.state) + self.words.tobytes(), 1)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(header + body)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "RegisterDump":
+        data = Path(path).read_bytes()
+        magic, unit, function, start, end, created = FILE_HEADER.unpack_from(data)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{path}: not a register dump")
+        raw = zlib.decompress(data[FILE_HEADER.size :])
+        dump = cls(unit, function, start, end)
+        dump.created = created
+        dump.state = bytearray(raw[:ADDRESS_SPACE])
+        dump.words = array("H")
+        dump.words.frombytes(raw[ADDRESS_SPACE:])
+        return dump
+
+
+@dataclass
+class DumpStats:
+    transactions: int = 0
+    holes_found: int = 0
+    failures: int = 0
+    aborted: Optional[str] = None
+    elapsed_s: float = 0.0
+
+
+class DumpAborted(Exception):
+    pass
+
+
+def dump_registers(
+    client,
+    dump: RegisterDump,
+    path: Optional[str | Path] = None,
+    checkpoint_s: float = 1.0,
+    min_hole: int = 1,
+    max_failures: int = 5,
+    progress: Optional[ProgressFn] = None,
+    cancel: Optional[threading.Event] = None,
+) -> DumpStats:
+    """Read every UNKNOWN address of ``dump`` in maximal blocks.
+
+    ``client`` is a ``ModbusRTUClient`` or ``BusHandle`` (``read_registers``).
+    A block refused with ILLEGAL DATA ADDRESS is bisected until its valid
+    sub-ranges read and the rest is marked as holes (down to ``min_hole``
+    words). Timeouts and other errors leave the block UNKNOWN for a later
+    resume; ``max_failures`` in a row abort the run. With ``path`` the dump
+    is checkpointed every ``checkpoint_s`` and at the end.
+    """
+    stats = DumpStats()
+    t0 = time.monotonic()
+    last_save = t0
+    streak = 0
+    total = dump.size
+
+    def read(address: int, count: int) -> None:
+        nonlocal streak, last_save
+        if cancel is not None and cancel.is_set():
+            raise DumpAborted("cancelled")
+        res = client.read_registers(dump.function, dump.unit, address, count)
+        words, outcome, code = res if res is not None else (None, metrics.ERROR, None)
+        stats.transactions += 1
+        if words is not None and len(words) == count:
+            streak = 0
+            dump.set_words(address, words)
+        elif outcome == metrics.EXCEPTION and code in (ILLEGAL_ADDRESS, ILLEGAL_VALUE):
+            streak = 0
+            if count <= min_hole:
+                dump.mark_hole(address, count)
+                stats.holes_found += count
+            else:
+                half = count // 2
+                read(address, half)
+                read(address + half, count - half)
+                return
+        else:
+            stats.failures += 1
+            streak += 1
+            if streak >= max_failures:
+                raise DumpAborted(f"{streak} failed reads in a row (last: {metrics.OUTCOMES[outcome]})")
+        now = time.monotonic()
+        if path is not None and now - last_save >= checkpoint_s:
+            dump.save(path)
+            last_save = now
+        if progress is not None:
+            progress(total - dump.count(UNKNOWN), total)
+
+    try:
+        for address, count in list(dump.runs(UNKNOWN)):
+            end = address + count
+            while address < end:
+                n = min(MAX_READ_WORDS, end - address)
+                read(address, n)
+                address += n
+    except DumpAborted as exc:
+        stats.aborted = str(exc)
+        logger.warning("Dump of unit %d stopped: %s", dump.unit, exc)
+    finally:
+        stats.elapsed_s = time.monotonic() - t0
+        if path is not None:
+            dump.save(path)
+    logger.info(
+        "Dump unit %d FC%02d: %d valid, %d holes, %d unknown in %d transactions (%.1f s)",
+        dump.unit,
+        dump.function,
+        dump.count(VALID),
+        dump.count(HOLE),
+        dump.count(UNKNOWN),
+        stats.transactions,
+        stats.elapsed_s,
+    )
+    return stats
+
+
+def diff(reference: RegisterDump, current: RegisterDump) -> List[Tuple[int, int, int]]:
+    """(address, reference word, current word) where both are valid and differ."""
+    out = []
+    for address, count in reference.runs(VALID):
+        for a in range(address, address + count):
+            if current.state[a] == VALID and current.words[a] != reference.words[a]:
+                out.append((a, reference.words[a], current.words[a]))
+    return out
+
+
+def write_runs(addresses: List[int], words: array, max_words: int = MAX_WRITE_WORDS) -> List[Tuple[int, List[int]]]:
+    """Group sorted addresses into contiguous FC16 writes of at most ``max_words``."""
+    runs: List[Tuple[int, List[int]]] = []
+    for a in addresses:
+        if runs and runs[-1][0] + len(runs[-1][1]) == a and len(runs[-1][1]) < max_words:
+            runs[-1][1].append(words[a])
+        else:
+            runs.append((a, [words[a]]))
+    return runs
+
+
+@dataclass
+class RestoreResult:
+    compared: int = 0
+    changed: int = 0
+    written: int = 0
+    writes: int = 0
+    failed: List[Tuple[int, int]] = field(default_factory=list)  # (address, count) refused
+    changes: List[Tuple[int, int, int]] = field(default_factory=list)  # (address, dump word, device word)
+
+
+def restore(
+    client,
+    dump: RegisterDump,
+    only_changed: bool = True,
+    dry_run: bool = False,
+    progress: Optional[ProgressFn] = None,
+    cancel: Optional[threading.Event] = None,
+) -> RestoreResult:
+    """Write a holding-register dump back with batched FC16 writes.
+
+    With ``only_changed`` the device is read first (valid ranges only, no
+    probing) and only registers that differ are written; ``dry_run`` stops
+    after the comparison.
+    """
+    if dump.function != 3:
+        raise ValueError("only holding registers (FC03) can be restored")
+    res = RestoreResult()
+    if only_changed:
+        current = dump.template()
+        stats = dump_registers(client, current, progress=progress, cancel=cancel)
+        if stats.aborted:
+            raise RuntimeError(f"reading the device failed: {stats.aborted}")
+        res.changes = diff(dump, current)
+        res.compared = current.count(VALID)
+        addresses = [a for a, _, _ in res.changes]
+    else:
+        addresses = [a for address, count in dump.runs(VALID) for a in range(address, address + count)]
+        res.compared = len(addresses)
+    res.changed = len(addresses)
+    if dry_run:
+        return res
+
+    def write(address: int, values: List[int]) -> None:
+        res.writes += 1
+        if client.write_multiple_registers(dump.unit, address, values):
+            res.written += len(values)
+        elif len(values) > 1:
+            # a read-only register inside the run refuses the whole request: split it
+            half = len(values) // 2
+            write(address, values[:half])
+            write(address + half, values[half:])
+        else:
+            res.failed.append((address, 1))
+
+    runs = write_runs(addresses, dump.words)
+    for i, (address, values) in enumerate(runs):
+        if cancel is not None and cancel.is_set():
+            break
+        write(address, values)
+        if progress is not None:
+            progress(i + 1, len(runs))
+    logger.info(
+        "Restore unit %d: %d/%d changed register(s) written in %d FC16 request(s), %d range(s) refused",
+        dump.unit,
+        res.written,
+        res.changed,
+        res.writes,
+        len(res.failed),
+    )
+    return res
+
+
+@dataclass
+class DumpJob:
+    """Progress/cancellation handle shared between the UI and a dump thread."""
+
+    path: Path
+    total: int = 0
+    done: int = 0
+    finished: bool = False
+    error: Optional[str] = None
+    stats: Optional[DumpStats] = None
+    restore: Optional[RestoreResult] = None
+    cancel: threading.Event = field(default_factory=threading.Event)
+
+    def on_progress(self, done: int, total: int) -> None:
+        self.done, self.total = done, total
+
+
+def run_dump_job(client, job: DumpJob, dump: RegisterDump, min_hole: int = 1) -> None:
+    """Thread target: dump (or resume) into ``job.path``."""
+    try:
+        job.stats = dump_registers(
+            client, dump, job.path, min_hole=min_hole, progress=job.on_progress, cancel=job.cancel
+        )
+    except Exception as exc:  # noqa: BLE001
+        job.error = str(exc)
+        logger.exception("Dump to %s failed: %s", job.path, exc)
+    finally:
+        job.finished = True
+
+
+def run_restore_job(
+    client, job: DumpJob, dump: RegisterDump, only_changed: bool = True, dry_run: bool = False
+) -> None:
+    """Thread target: compare and/or restore ``dump`` to the device."""
+    try:
+        job.restore = restore(client, dump, only_changed, dry_run, progress=job.on_progress, cancel=job.cancel)
+    except Exception as exc:  # noqa: BLE001
+        job.error = str(exc)
+        logger.exception("Restore from %s failed: %s", job.path, exc)
+    finally:
+        job.finished = True
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
+
+from core import timing
+
+
+logger = logging.getLogger(__name__)
+
+STATES = ("closed", "open", "half_open")
+CLOSED, OPEN, HALF_OPEN = range(len(STATES))
+
+# What to do with a request to a unit
+ALLOW, PROBE, SKIP = range(3)
+
+
+@dataclass
+class HealthConfig:
+    enabled: bool = True
+    failure_threshold: int = 3  # consecutive failed transactions before the circuit opens
+    backoff_initial_s: float = 1.0  # first re-probe delay once open
+    backoff_max_s: float = 60.0  # the delay doubles after every failed re-probe, up to this
+    probe_turnaround_s: float = timing.DEFAULT_TURNAROUND_S  # slave allowance in the probe timeout
+
+    @classmethod
+    def from_dict(cls, cfg: Optional[dict]) -> "HealthConfig":
+        cfg = cfg or {}
+        return cls(
+            enabled=bool(cfg.get("enabled", cls.enabled)),
+            failure_threshold=max(1, int(cfg.get("failure_threshold", cls.failure_threshold))),
+            backoff_initial_s=float(cfg.get("backoff_initial_s", cls.backoff_initial_s)),
+            backoff_max_s=float(cfg.get("backoff_max_s", cls.backoff_max_s)),
+            probe_turnaround_s=float(cfg.get("probe_turnaround_ms", cls.probe_turnaround_s * 1000)) / 1000,
+        )
+
+
+@dataclass
+class UnitHealth:
+    unit: int
+    state: int = CLOSED
+    consecutive_failures: int = 0
+    backoff_s: float = 0.0
+    next_probe: float = 0.0  # time.monotonic() of the next re-probe while open
+    opened_at: Optional[float] = None  # wall clock
+    last_ok: Optional[float] = None  # wall clock
+    trips: int = 0  # times the circuit opened
+    probes: int = 0
+    skipped: int = 0  # requests answered locally instead of waiting for a timeout
+
+    @property
+    def state_name(self) -> str:
+        return STATES[self.state]
+
+
+class HealthTracker:
+    """Per-unit circuit breaker of one bus.
+
+    ``failure_threshold`` consecutive transactions without an answer (timeout,
+    CRC, garbled frame) open the unit's circuit. Requests to an open unit
+    fail at once instead of costing a full timeout; when its backoff has
+    elapsed the next request first sends a one-register probe with a
+    baud-derived timeout (half-open). An answer, exception responses
+    included, closes the circuit; silence doubles the backoff.
+    """
+
+    def __init__(self, cfg: Optional[HealthConfig] = None) -> None:
+        self.cfg = cfg or _config
+        self._units: Dict[int, UnitHealth] = {}
+        self._lock = threading.Lock()
+
+    def gate(self, unit: int, now: Optional[float] = None) -> int:
+        """ALLOW, PROBE (send a re-probe first) or SKIP for a request to ``unit``."""
+        if not self.cfg.enabled or unit == 0:
+            return ALLOW
+        with self._lock:
+            h = self._units.get(unit)
+            if h is None or h.state == CLOSED:
+                return ALLOW
+            now = time.monotonic() if now is None else now
+            if h.state == OPEN and now < h.next_probe:
+                h.skipped += 1
+                return SKIP
+            h.state = HALF_OPEN
+            h.probes += 1
+            return PROBE
+
+    def record(self, unit: int, alive: bool, track: bool = True, now: Optional[float] = None) -> None:
+        """Account one transaction; with ``track=False`` units not seen yet are ignored (scans)."""
+        if not self.cfg.enabled or unit == 0:
+            return
+        with self._lock:
+            h = self._units.get(unit)
+            if h is None:
+                if not track:
+                    return
+                h = self._units[unit] = UnitHealth(unit)
+            if alive:
+                if h.state != CLOSED:
+                    logger.info("Unit %d answers again, circuit closed", unit)
+                h.state, h.consecutive_failures, h.backoff_s, h.opened_at = CLOSED, 0, 0.0, None
+                h.last_ok = time.time()
+                return
+            h.consecutive_failures += 1
+            now = time.monotonic() if now is None else now
+            if h.state == HALF_OPEN:
+                h.state = OPEN
+                h.backoff_s = min(h.backoff_s * 2, self.cfg.backoff_max_s)
+                h.next_probe = now + h.backoff_s
+            elif h.state == CLOSED and h.consecutive_failures >= self.cfg.failure_threshold:
+                h.state, h.trips = OPEN, h.trips + 1
+                h.backoff_s = self.cfg.backoff_initial_s
+                h.next_probe = now + h.backoff_s
+                h.opened_at = time.time()
+                logger.warning(
+                    "Unit %d: %d failed transactions in a row, circuit open (re-probe in %.1f s)",
+                    unit,
+                    h.consecutive_failures,
+                    h.backoff_s,
+                )
+
+    def snapshot(self) -> List[UnitHealth]:
+        with self._lock:
+            return [replace(h) for _, h in sorted(self._units.items())]
+
+    def reset(self, unit: Optional[int] = None) -> None:
+        """Forget ``unit`` (or every unit): its next request goes out normally."""
+        with self._lock:
+            if unit is None:
+                self._units.clear()
+            else:
+                self._units.pop(unit, None)
+
+
+_config = HealthConfig()
+
+
+def configure(cfg: HealthConfig) -> None:
+    """Set the configuration used by trackers created from now on."""
+    global _config
+    _config = cfg
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.acquisition import RingBuffer, Sample
+
+
+SeriesKey = Tuple[str, int, str]  # (port, unit id, register name)
+
+
+class SeriesWindow:
+    """Fixed-capacity (ts, value) ring on two float64 arrays.
+
+    Appending is O(1) and memory stays constant however long the session
+    runs; ``arrays`` returns the window in chronological order.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self._ts = np.empty(capacity, dtype=np.float64)
+        self._values = np.empty(capacity, dtype=np.float64)
+        self._n = 0  # points appended since creation
+
+    def __len__(self) -> int:
+        return min(self._n, self.capacity)
+
+    @property
+    def last_ts(self) -> float:
+        return float(self._ts[(self._n - 1) % self.capacity]) if self._n else float("-inf")
+
+    def append(self, ts: float, value: float) -> None:
+        i = self._n % self.capacity
+        self._ts[i] = ts
+        self._values[i] = value
+        self._n += 1
+
+    def extend(self, ts: Sequence[float], values: Sequence[float]) -> None:
+        ts_a = np.asarray(ts, dtype=np.float64)[-self.capacity :]
+        val_a = np.asarray(values, dtype=np.float64)[-self.capacity :]
+        for chunk_ts, chunk_v in self._chunks(ts_a, val_a):
+            i = self._n % self.capacity
+            self._ts[i : i + len(chunk_ts)] = chunk_ts
+            self._values[i : i + len(chunk_v)] = chunk_v
+            self._n += len(chunk_ts)
+
+    def _chunks(self, ts: np.ndarray, values: np.ndarray):
+        # split at the wrap-around point so each chunk is one slice assignment
+        head = min(len(ts), self.capacity - self._n % self.capacity)
+        yield ts[:head], values[:head]
+        if head < len(ts):
+            yield ts[head:], values[head:]
+
+    def arrays(self, after: float = float("-inf")) -> Tuple[np.ndarray, np.ndarray]:
+        """Chronological copies of the points newer than ``after``."""
+        idx = np.arange(self._n - len(self), self._n) % self.capacity
+        ts = self._ts[idx]
+        values = self._values[idx]
+        if after != float("-inf"):
+            k = int(np.searchsorted(ts, after, side="right"))
+            ts, values = ts[k:], values[k:]
+        return ts, values
+
+
+class LiveView:
+    """Live windows of the series one UI session is watching.
+
+    ``update`` pulls only the samples published since its last call (a cursor
+    per acquisition buffer) and appends the selected values to their windows,
+    so a refresh costs O(new points) plus rendering a fixed-size window,
+    independent of how long acquisition has been running.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.windows: Dict[SeriesKey, SeriesWindow] = {}
+        self._by_unit: Dict[Tuple[str, int], List[Tuple[str, SeriesWindow]]] = {}
+        self._cursors: Dict[int, int] = {}  # id(buffer) -> last seq consumed
+        self._lock = threading.Lock()
+
+    def select(self, keys: Iterable[SeriesKey]) -> List[SeriesKey]:
+        """Keep windows for ``keys`` only; returns the keys that are new."""
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            added = [k for k in keys if k not in self.windows]
+            self.windows = {k: self.windows[k] if k in self.windows else SeriesWindow(self.capacity) for k in keys}
+            if added:
+                self._cursors.clear()  # replay what the buffers still hold for the new series
+            self._by_unit = {}
+            for (port, unit_id, name), window in self.windows.items():
+                self._by_unit.setdefault((port, unit_id), []).append((name, window))
+        return added
+
+    def seed(self, key: SeriesKey, ts: Sequence[float], values: Sequence[float]) -> None:
+        """Prefill a new window (e.g. from SQLite) before live points arrive."""
+        with self._lock:
+            window = self.windows.get(key)
+            if window is not None and not len(window):
+                window.extend(ts, values)
+
+    def update(self, buffers: Iterable[RingBuffer[Sample]]) -> int:
+        """Consume new samples from ``buffers``; returns the number of points added."""
+        added = 0
+        with self._lock:
+            for buf in buffers:
+                # first look at a buffer starts from whatever it still holds
+                samples, self._cursors[id(buf)] = buf.since(self._cursors.get(id(buf), -1))
+                for sample in samples:
+                    targets = self._by_unit.get((sample.port, sample.unit_id))
+                    if not targets:
+                        continue
+                    for name, window in targets:
+                        v = sample.values.get(name)
+                        if v is not None and sample.ts > window.last_ts:
+                            window.append(sample.ts, v)
+                            added += 1
+        return added
+
+    def arrays(self, key: SeriesKey, after: float = float("-inf")) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            window = self.windows.get(key)
+            return window.arrays(after) if window is not None else None
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets (seconds); +Inf is implicit
+LATENCY_BUCKETS_S: Tuple[float, ...] = (0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)
+
+OUTCOMES = ("ok", "timeout", "exception", "crc", "error")
+OK, TIMEOUT, EXCEPTION, CRC, ERROR = range(len(OUTCOMES))
+
+MetricKey = Tuple[str, int, int]  # (port, unit, function code)
+
+
+@dataclass
+class MetricsConfig:
+    enabled: bool = True
+    textfile: str = ""  # Prometheus textfile collector target; empty = off
+    textfile_interval_s: float = 15.0
+    http_port: int = 0  # serve /metrics on this port; 0 = off
+
+    @classmethod
+    def from_dict(cls, cfg: Optional[dict]) -> "MetricsConfig":
+        cfg = cfg or {}
+        return cls(
+            enabled=bool(cfg.get("enabled", cls.enabled)),
+            textfile=str(cfg.get("textfile", cls.textfile) or ""),
+            textfile_interval_s=float(cfg.get("textfile_interval_s", cls.textfile_interval_s)),
+            http_port=int(cfg.get("http_port", cls.http_port) or 0),
+        )
+
+
+@dataclass
+class TxStats:
+    """Counters of one (port, unit, function) triple; plain ints, no per-call allocation."""
+
+    outcomes: List[int] = field(default_factory=lambda: [0] * len(OUTCOMES))
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_S) + 1))
+    latency_sum_s: float = 0.0
+    latency_max_s: float = 0.0
+    bytes_tx: int = 0
+    bytes_rx: int = 0
+    exception_codes: Dict[int, int] = field(default_factory=dict)
+    last_ts: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return sum(self.outcomes)
+
+    def quantile(self, q: float) -> float:
+        """Latency quantile estimated from the histogram (linear within a bucket)."""
+        total = sum(self.buckets)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for i, n in enumerate(self.buckets):
+            bound = LATENCY_BUCKETS_S[i] if i < len(LATENCY_BUCKETS_S) else self.latency_max_s
+            upper = min(bound, self.latency_max_s)
+            if n and seen + n >= rank:
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return self.latency_max_s
+
+
+class BusMetrics:
+    """Per-transaction telemetry of every Modbus client in the process.
+
+    ``record`` is a dict lookup, a bisect and a few integer increments under
+    a lock, cheap enough to stay on at full polling rate.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = True
+        self.started = time.time()
+        self._stats: Dict[MetricKey, TxStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        port: str,
+        unit: int,
+        function: int,
+        outcome: int,
+        latency_s: float,
+        bytes_tx: int = 0,
+        bytes_rx: int = 0,
+        exception_code: Optional[int] = None,
+    ) -> None:
+        if not self.enabled:
+            return
+        key = (port, unit, function)
+        with self._lock:
+            s = self._stats.get(key)
+            if s is None:
+                s = self._stats[key] = TxStats()
+            s.outcomes[outcome] += 1
+            s.buckets[bisect_left(LATENCY_BUCKETS_S, latency_s)] += 1
+            s.latency_sum_s += latency_s
+            if latency_s > s.latency_max_s:
+                s.latency_max_s = latency_s
+            s.bytes_tx += bytes_tx
+            s.bytes_rx += bytes_rx
+            if exception_code is not None:
+                s.exception_codes[exception_code] = s.exception_codes.get(exception_code, 0) + 1
+            s.last_ts = time.time()
+
+    def snapshot(self) -> Dict[MetricKey, TxStats]:
+        """Deep copy, safe to read while clients keep recording."""
+        with self._lock:
+            return {
+                k: TxStats(
+                    outcomes=list(s.outcomes),
+                    buckets=list(s.buckets),
+                    latency_sum_s=s.latency_sum_s,
+                    latency_max_s=s.latency_max_s,
+                    bytes_tx=s.bytes_tx,
+                    bytes_rx=s.bytes_rx,
+                    exception_codes=dict(s.exception_codes),
+                    last_ts=s.last_ts,
+                )
+                for k, s in self._stats.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self.started = time.time()
+
+    def rows(self) -> List[dict]:
+        """One flat dict per (port, unit, function) for tables."""
+        out = []
+        for (port, unit, fc), s in sorted(self.snapshot().items()):
+            total = s.total
+            out.append(
+                {
+                    "port": port,
+                    "unit": unit,
+                    "fc": fc,
+                    "total": total,
+                    **{name: s.outcomes[i] for i, name in enumerate(OUTCOMES)},
+                    "success_pct": 100.0 * s.outcomes[OK] / total if total else 0.0,
+                    "mean_ms": 1000 * s.latency_sum_s / total if total else 0.0,
+                    "p50_ms": 1000 * s.quantile(0.50),
+                    "p90_ms": 1000 * s.quantile(0.90),
+                    "p99_ms": 1000 * s.quantile(0.99),
+                    "max_ms": 1000 * s.latency_max_s,
+                    "bytes_tx": s.bytes_tx,
+                    "bytes_rx": s.bytes_rx,
+                    "exception_codes": ", ".join(f"{c}×{n}" for c, n in sorted(s.exception_codes.items())),
+                }
+            )
+        return out
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        snap = self.snapshot()
+        lines = [
+            "# HELP modbus_transactions_total Modbus transactions by outcome.",
+            "# TYPE modbus_transactions_total counter",
+        ]
+        for (port, unit, fc), s in sorted(snap.items()):
+            labels = f'port="{_escape(port)}",unit="{unit}",fc="{fc}"'
+            for i, name in enumerate(OUTCOMES):
+                lines.append(f'modbus_transactions_total{{{labels},outcome="{name}"}} {s.outcomes[i]}')
+        lines += [
+            "# HELP modbus_exceptions_total Modbus exception responses by code.",
+            "# TYPE modbus_exceptions_total counter",
+        ]
+        for (port, unit, fc), s in sorted(snap.items()):
+            labels = f'port="{_escape(port)}",unit="{unit}",fc="{fc}"'
+            for code, n in sorted(s.exception_codes.items()):
+                lines.append(f'modbus_exceptions_total{{{labels},code="{code}"}} {n}')
+        lines += [
+            "# HELP modbus_bytes_total Bytes on the wire.",
+            "# TYPE modbus_bytes_total counter",
+        ]
+        for (port, unit, fc), s in sorted(snap.items()):
+            labels = f'port="{_escape(port)}",unit="{unit}",fc="{fc}"'
+            lines.append(f'modbus_bytes_total{{{labels},direction="tx"}} {s.bytes_tx}')
+            lines.append(f'modbus_bytes_total{{{labels},direction="rx"}} {s.bytes_rx}')
+        lines += [
+            "# HELP modbus_latency_seconds Request to response (or timeout) latency.",
+            "# TYPE modbus_latency_seconds histogram",
+        ]
+        for (port, unit, fc), s in sorted(snap.items()):
+            labels = f'port="{_escape(port)}",unit="{unit}",fc="{fc}"'
+            cum = 0
+            for i, n in enumerate(s.buckets):
+                cum += n
+                le = repr(LATENCY_BUCKETS_S[i]) if i < len(LATENCY_BUCKETS_S) else "+Inf"
+                lines.append(f'modbus_latency_seconds_bucket{{{labels},le="{le}"}} {cum}')
+            lines.append(f"modbus_latency_seconds_sum{{{labels}}} {s.latency_sum_s:.6f}")
+            lines.append(f"modbus_latency_seconds_count{{{labels}}} {cum}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str | Path) -> None:
+        """Atomically (re)write a node_exporter textfile."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(self.to_prometheus(), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+_metrics = BusMetrics()
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def get_metrics() -> BusMetrics:
+    return _metrics
+
+
+def start_exporters(cfg: MetricsConfig) -> None:
+    """Start the textfile writer and/or HTTP endpoint once per process."""
+    global _exporters_started
+    _metrics.enabled = cfg.enabled
+    with _exporters_lock:
+        if _exporters_started or not cfg.enabled:
+            return
+        _exporters_started = True
+    if cfg.textfile:
+        threading.Thread(
+            target=_textfile_loop, args=(cfg.textfile, cfg.textfile_interval_s), name="metrics-textfile", daemon=True
+        ).start()
+    if cfg.http_port:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", cfg.http_port), _MetricsHandler)
+        except OSError as exc:
+            logger.error("Cannot serve metrics on port %d: %s", cfg.http_port, exc)
+            return
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info("Serving Prometheus metrics on http://127.0.0.1:%d/metrics", cfg.http_port)
+
+
+def _textfile_loop(path: str, interval_s: float) -> None:
+    while True:
+        try:
+            _metrics.write_prometheus(path)
+        except OSError as exc:
+            logger.warning("Failed to write metrics file %s: %s", path, exc)
+        time.sleep(max(interval_s, 1.0))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = _metrics.to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        logger.debug("metrics http: " + format, *args)
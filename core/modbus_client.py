@@ -1,17 +1,37 @@
 from __future__ import annotations
 
+import inspect
 import logging
+import time
 from dataclasses import dataclass
-from typing import Iterable, List, Optional
+from typing import Callable, Iterable, List, Optional, Tuple
 
 from pymodbus.client import ModbusSerialClient
 from pymodbus.exceptions import ModbusIOException
 import serial
 
+from core import health, metrics, timing
+from core.capture import CaptureSerial, FrameCapture
+from core.rtu import RtuResult, RtuTransport
+
 
 logger = logging.getLogger(__name__)
 
 
+def _unit_kwarg(method) -> str:
+    """Slave id keyword of this pymodbus: ``unit`` (2.x), ``slave`` (3.0-3.9) or ``device_id``."""
+    params = inspect.signature(method).parameters
+    for name in ("device_id", "slave", "unit"):
+        if name in params:
+            return name
+    return "unit"
+
+
+UNIT_KW = _unit_kwarg(ModbusSerialClient.read_holding_registers)
+
+WRITE_RESPONSE_BYTES = 8  # FC06/FC16 echo: unit, fc, addr(2), value|count(2), crc(2)
+
+
 @dataclass
 class ModbusParams:
     method: str = "rtu"
@@ -21,16 +41,30 @@ class ModbusParams:
     stopbits: int = 1
     bytesize: int = 8
     timeout: float = 0.3
+    transport: str = "pymodbus"  # or "lean": core.rtu framer on pyserial
 
 
 class ModbusRTUClient:
     def __init__(self) -> None:
         self.client: Optional[ModbusSerialClient] = None
+        self.lean: Optional[RtuTransport] = None
+        self.params: Optional[ModbusParams] = None
         self.last_error: Optional[str] = None
+        # Outcome (core.metrics OK/TIMEOUT/...) and exception code of the last transaction
+        self.last_outcome = metrics.OK
+        self.last_exception_code: Optional[int] = None
+        self.metrics = metrics.get_metrics()
+        # Raw Tx/Rx frame recorder, attached to the serial port on connect
+        self.capture: Optional[FrameCapture] = None
+        # Per-unit circuit breaker: dead units fail fast instead of costing a timeout per read
+        self.health = health.HealthTracker()
+        self._probing = False  # presence probes (scans) bypass the breaker
 
     def connect(self, p: ModbusParams) -> bool:
         self.close()
         self.last_error = None
+        self.params = p
+        self.health.reset()  # new line settings: every unit gets a fresh chance
         logger.info(
             "Connecting Modbus RTU on %s @%d %s %dN%d",
             p.port,
@@ -39,6 +73,16 @@ class ModbusRTUClient:
             p.stopbits,
             p.bytesize,
         )
+        if p.transport == "lean":
+            lean = RtuTransport(p, capture=self.capture, retries=3)  # pymodbus default
+            try:
+                lean.open()
+            except Exception as exc:  # noqa: BLE001
+                self.last_error = str(exc)
+                logger.error("Failed to open serial port: %s", exc)
+                return False
+            self.lean = lean
+            return True
         self.client = ModbusSerialClient(
             port=p.port,
             baudrate=p.baudrate,
@@ -72,9 +116,19 @@ class ModbusRTUClient:
                 self.last_error = "Failed to open Modbus serial connection (unknown reason)"
                 logger.error(self.last_error)
             return False
+        sock = getattr(self.client, "socket", None)
+        if self.capture is not None and sock is not None and not isinstance(sock, CaptureSerial):
+            self.client.socket = CaptureSerial(sock, self.capture)
         return True
 
+    @property
+    def connected(self) -> bool:
+        return self.client is not None or self.lean is not None
+
     def close(self) -> None:
+        if self.lean is not None:
+            self.lean.close()
+            self.lean = None
         if self.client:
             try:
                 self.client.close()
@@ -82,55 +136,308 @@ class ModbusRTUClient:
                 pass
             self.client = None
 
+    def set_timeout(self, timeout: float, retries: Optional[int] = None) -> None:
+        """Change the response timeout (and retry count) of the live connection."""
+        if self.lean is not None:
+            self.lean.timeout = timeout
+            if retries is not None:
+                self.lean.retries = retries
+            return
+        if not self.client:
+            return
+        comm = getattr(self.client, "comm_params", None)
+        if comm is not None:
+            comm.timeout_connect = timeout
+        sock = getattr(self.client, "socket", None)
+        if sock is not None:
+            sock.timeout = timeout
+        if retries is not None:
+            for holder in (self.client, getattr(self.client, "transaction", None)):
+                if holder is not None and hasattr(holder, "retries"):
+                    holder.retries = retries
+
+    def get_retries(self) -> Optional[int]:
+        if self.lean is not None:
+            return self.lean.retries
+        for holder in (self.client, getattr(self.client, "transaction", None)):
+            if holder is not None and hasattr(holder, "retries"):
+                return int(holder.retries)
+        return None
+
     # ---- basic operations ----
-    def read_holding(self, unit: int, address: int, count: int = 1) -> Optional[List[int]]:
+    def _record(
+        self, unit: int, fc: int, outcome: int, t0: float, tx: int, rx: int, code: Optional[int] = None
+    ) -> None:
+        self.last_outcome, self.last_exception_code = outcome, code
+        self.health.record(unit, outcome in (metrics.OK, metrics.EXCEPTION), track=not self._probing)
+        self.metrics.record(
+            self.params.port if self.params else "", unit, fc, outcome, time.perf_counter() - t0, tx, rx, code
+        )
+
+    def _record_error(self, unit: int, fc: int, t0: float, tx: int, exc: Exception) -> None:
+        # pymodbus drops frames with a bad CRC and reports the missing response
+        outcome = metrics.CRC if "crc" in str(exc).lower() else metrics.TIMEOUT
+        self._record(unit, fc, outcome, t0, tx, 0)
+
+    def _record_lean(self, unit: int, fc: int, t0: float, res: RtuResult) -> None:
+        self._record(unit, fc, res.outcome, t0, res.tx_bytes, res.rx_bytes, res.exception_code)
+        if not res.ok:
+            logger.debug(
+                "FC%02d unit=%d failed: %s (code %s)", fc, unit, metrics.OUTCOMES[res.outcome], res.exception_code
+            )
+
+    def _read(self, fc: int, unit: int, address: int, count: int) -> Optional[List[int]]:
+        if not self._probing:
+            gate = self.health.gate(unit)
+            if gate == health.SKIP or (gate == health.PROBE and not self._reprobe(fc, unit, address)):
+                self.last_outcome, self.last_exception_code = metrics.ERROR, None
+                return None
+        return self._read_once(fc, unit, address, count)
+
+    def _reprobe(self, fc: int, unit: int, address: int) -> bool:
+        """One-register read with a wire-time timeout and no retries; True if the unit answered."""
+        if self.params is None:
+            return False
+        base_timeout, base_retries = self.params.timeout, self.get_retries()
+        self.set_timeout(
+            timing.response_timeout_s(self.params, turnaround_s=self.health.cfg.probe_turnaround_s), retries=0
+        )
+        try:
+            self._read_once(fc, unit, address, 1)
+        finally:
+            self.set_timeout(base_timeout, retries=base_retries)
+        return self.last_outcome in (metrics.OK, metrics.EXCEPTION)
+
+    def _read_once(self, fc: int, unit: int, address: int, count: int) -> Optional[List[int]]:
+        if self.lean is not None:
+            t0 = time.perf_counter()
+            res = self.lean.read_registers(unit, fc, address, count)
+            self._record_lean(unit, fc, t0, res)
+            return res.words
         if not self.client:
             return None
+        fn = self.client.read_input_registers if fc == 4 else self.client.read_holding_registers
+        t0 = time.perf_counter()
         try:
-            rr = self.client.read_holding_registers(address=address, count=count, unit=unit)
-            if rr.isError():  # type: ignore[attr-defined]
-                logger.debug("FC03 error @%d unit=%d: %s", address, unit, rr)
-                return None
-            return list(rr.registers)
+            rr = fn(address=address, count=count, **{UNIT_KW: unit})
         except ModbusIOException as exc:
-            logger.debug("FC03 IO exception: %s", exc)
+            self._record_error(unit, fc, t0, timing.READ_REQUEST_BYTES, exc)
+            logger.debug("FC%02d IO exception: %s", fc, exc)
             return None
-
-    def read_input(self, unit: int, address: int, count: int = 1) -> Optional[List[int]]:
-        if not self.client:
+        if rr.isError():  # type: ignore[attr-defined]
+            code = getattr(rr, "exception_code", None)
+            self._record(
+                unit, fc, metrics.EXCEPTION, t0, timing.READ_REQUEST_BYTES, timing.EXCEPTION_RESPONSE_BYTES, code
+            )
+            logger.debug("FC%02d error @%d unit=%d: %s", fc, address, unit, rr)
             return None
+        regs = list(rr.registers)  # type: ignore[attr-defined]
+        self._record(unit, fc, metrics.OK, t0, timing.READ_REQUEST_BYTES, timing.read_response_bytes(len(regs)))
+        return regs
+
+    def _write(self, fc: int, unit: int, call: Callable[[], object], tx: int) -> bool:
+        t0 = time.perf_counter()
         try:
-            rr = self.client.read_input_registers(address=address, count=count, unit=unit)
-            if rr.isError():  # type: ignore[attr-defined]
-                logger.debug("FC04 error @%d unit=%d: %s", address, unit, rr)
-                return None
-            return list(rr.registers)
+            wr = call()
         except ModbusIOException as exc:
-            logger.debug("FC04 IO exception: %s", exc)
-            return None
+            self._record_error(unit, fc, t0, tx, exc)
+            raise
+        if getattr(wr, "isError", lambda: True)():
+            code = getattr(wr, "exception_code", None)
+            self._record(unit, fc, metrics.EXCEPTION, t0, tx, timing.EXCEPTION_RESPONSE_BYTES, code)
+            return False
+        self._record(unit, fc, metrics.OK, t0, tx, WRITE_RESPONSE_BYTES)
+        return True
+
+    def read_holding(self, unit: int, address: int, count: int = 1) -> Optional[List[int]]:
+        return self._read(3, unit, address, count)
+
+    def read_input(self, unit: int, address: int, count: int = 1) -> Optional[List[int]]:
+        return self._read(4, unit, address, count)
+
+    def read_registers(
+        self, fc: int, unit: int, address: int, count: int
+    ) -> Tuple[Optional[List[int]], int, Optional[int]]:
+        """FC03/FC04 read returning (words, outcome, exception code) for callers that react to the failure kind."""
+        self.last_outcome, self.last_exception_code = metrics.ERROR, None  # stays so when not connected
+        words = self._read(fc, unit, address, count)
+        return words, self.last_outcome, self.last_exception_code
 
     def write_single_register(self, unit: int, address: int, value: int) -> bool:
+        if self.lean is not None:
+            t0 = time.perf_counter()
+            res = self.lean.write_single(unit, address, value)
+            self._record_lean(unit, 6, t0, res)
+            return res.ok
         if not self.client:
             return False
-        wr = self.client.write_register(address=address, value=value, unit=unit)
-        return not getattr(wr, "isError", lambda: True)()
+        client = self.client
+        return self._write(
+            6, unit, lambda: client.write_register(address=address, value=value, **{UNIT_KW: unit}), 8
+        )
 
     def write_multiple_registers(self, unit: int, address: int, values: List[int]) -> bool:
+        if self.lean is not None:
+            t0 = time.perf_counter()
+            res = self.lean.write_multiple(unit, address, values)
+            self._record_lean(unit, 16, t0, res)
+            return res.ok
         if not self.client:
             return False
-        wr = self.client.write_registers(address=address, values=values, unit=unit)
-        return not getattr(wr, "isError", lambda: True)()
+        client = self.client
+        return self._write(
+            16,
+            unit,
+            lambda: client.write_registers(address=address, values=values, **{UNIT_KW: unit}),
+            9 + 2 * len(values),
+        )
+
+    def readwrite_registers(
+        self, unit: int, read_address: int, read_count: int, write_address: int, values: List[int]
+    ) -> Optional[List[int]]:
+        """FC23: write ``values`` and read holding registers back in one transaction."""
+        if self.lean is not None:
+            t0 = time.perf_counter()
+            res = self.lean.read_write(unit, read_address, read_count, write_address, values)
+            self._record_lean(unit, 23, t0, res)
+            return res.words
+        if not self.client:
+            return None
+        tx = 13 + 2 * len(values)
+        t0 = time.perf_counter()
+        try:
+            rr = self.client.readwrite_registers(
+                read_address=read_address,
+                read_count=read_count,
+                write_address=write_address,
+                values=values,
+                **{UNIT_KW: unit},
+            )
+        except ModbusIOException as exc:
+            self._record_error(unit, 23, t0, tx, exc)
+            logger.debug("FC23 IO exception: %s", exc)
+            return None
+        if rr.isError():  # type: ignore[attr-defined]
+            code = getattr(rr, "exception_code", None)
+            self._record(unit, 23, metrics.EXCEPTION, t0, tx, timing.EXCEPTION_RESPONSE_BYTES, code)
+            return None
+        regs = list(rr.registers)  # type: ignore[attr-defined]
+        self._record(unit, 23, metrics.OK, t0, tx, timing.read_response_bytes(len(regs)))
+        return regs
 
     # ---- scanning ----
-    def scan_units(self, ids: Iterable[int], probe_addr: int = 0, probe_count: int = 1) -> List[int]:
+    def scan_units(
+        self,
+        ids: Iterable[int],
+        probe_addr: int = 0,
+        probe_count: int = 1,
+        on_result: Optional[Callable[[int, bool], None]] = None,
+    ) -> List[int]:
         """Return unit IDs responding to a simple FC03 probe.
 
         Conservative approach: device is considered present if FC03 @probe_addr returns non-error.
+        ``on_result(uid, present)`` is called after each probe (progress reporting).
         """
         present: List[int] = []
         for uid in ids:
-            regs = self.read_holding(unit=uid, address=probe_addr, count=probe_count)
-            if regs is not None:
+            ok = self.probe(uid, probe_addr, probe_count)
+            if ok:
                 present.append(uid)
+            if on_result is not None:
+                on_result(uid, ok)
         logger.info("Scan complete; found units: %s", present)
         return present
+
+    def probe(self, unit: int, address: int = 0, count: int = 1, timeout: Optional[float] = None) -> bool:
+        """One FC03 presence probe; with ``timeout`` it runs without retries.
+
+        Probes ignore open circuits and only update the health of units
+        already tracked, so a scan neither skips nor records absent units.
+        """
+        self._probing = True
+        try:
+            if timeout is None or self.params is None:
+                return self.read_holding(unit=unit, address=address, count=count) is not None
+            base_timeout = self.params.timeout
+            base_retries = self.get_retries()
+            self.set_timeout(timeout, retries=0)
+            try:
+                return self.read_holding(unit=unit, address=address, count=count) is not None
+            finally:
+                self.set_timeout(base_timeout, retries=base_retries)
+        finally:
+            self._probing = False
+
+    def scan_units_fast(
+        self,
+        ids: Iterable[int],
+        probe_addr: int = 0,
+        probe_count: int = 1,
+        turnaround_s: float = timing.DEFAULT_TURNAROUND_S,
+        retry_passes: int = 1,
+        backoff_ms: float = 50,
+        on_result: Optional[Callable[[int, bool], None]] = None,
+    ) -> List[int]:
+        """Two-phase scan with baud-derived timeouts (see ``fast_scan``)."""
+        if not self.connected or self.params is None:
+            return []
+        present = fast_scan(
+            lambda uid, tmo: self.probe(uid, probe_addr, probe_count, tmo),
+            ids,
+            self.params,
+            probe_count=probe_count,
+            turnaround_s=turnaround_s,
+            retry_passes=retry_passes,
+            backoff_ms=backoff_ms,
+            on_result=on_result,
+        )
+        logger.info("Fast scan complete; found units: %s", present)
+        return present
+
+
+def fast_scan(
+    probe: Callable[[int, float], bool],
+    ids: Iterable[int],
+    params: ModbusParams,
+    probe_count: int = 1,
+    turnaround_s: float = timing.DEFAULT_TURNAROUND_S,
+    retry_passes: int = 1,
+    backoff_ms: float = 50,
+    on_result: Optional[Callable[[int, bool], None]] = None,
+) -> List[int]:
+    """Probe ``ids`` in passes with growing timeouts; return the sorted responders.
+
+    The first pass probes every ID once with the tightest timeout the line
+    settings allow (frames + t3.5 + ``turnaround_s``) and no pymodbus
+    retries. Each further pass re-probes only the non-responders after an
+    exponential backoff (``backoff_ms * 2**k``), doubling the timeout up to
+    the configured ``ModbusParams.timeout``. ``probe(uid, timeout)`` does the
+    actual transaction.
+    """
+    tight = timing.response_timeout_s(
+        params,
+        response_bytes=timing.read_response_bytes(probe_count),
+        turnaround_s=turnaround_s,
+    )
+    present: List[int] = []
+    pending = list(ids)
+    for k in range(retry_passes + 1):
+        if not pending:
+            break
+        tmo = min(tight * (2 ** k), max(params.timeout, tight))
+        if k:
+            time.sleep(backoff_ms / 1000.0 * (2 ** (k - 1)))
+        logger.debug("Scan pass %d: %d id(s), timeout %.1f ms", k, len(pending), tmo * 1000)
+        missing: List[int] = []
+        last_pass = k == retry_passes
+        for uid in pending:
+            ok = probe(uid, tmo)
+            if ok:
+                present.append(uid)
+            else:
+                missing.append(uid)
+            if on_result is not None and (ok or last_pass):
+                on_result(uid, ok)
+        pending = missing
+    present.sort()
+    return present
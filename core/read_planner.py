@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.modbus_client import ModbusRTUClient
+from profiles.schema import DeviceProfile, RegisterDef
+
+
+logger = logging.getLogger(__name__)
+
+
+# FC03/FC04 response carries at most 250 data bytes -> 125 registers.
+MAX_READ_WORDS = 125
+DEFAULT_MAX_GAP = 8
+READ_FUNCTIONS = (3, 4)
+
+
+@dataclass
+class ReadBlock:
+    """One contiguous FC03/FC04 read covering one or more registers."""
+
+    function: int
+    address: int
+    count: int
+    registers: List[RegisterDef] = field(default_factory=list)
+
+    @property
+    def end(self) -> int:
+        return self.address + self.count
+
+    def split(self, words: List[int]) -> List[Tuple[RegisterDef, List[int]]]:
+        """Cut the raw words of this block back out per register."""
+        out: List[Tuple[RegisterDef, List[int]]] = []
+        for r in self.registers:
+            off = r.address - self.address
+            out.append((r, list(words[off : off + int(r.words or 1)])))
+        return out
+
+
+def plan_reads(
+    registers: Iterable[RegisterDef] | DeviceProfile,
+    max_gap: int = DEFAULT_MAX_GAP,
+    max_words: int = MAX_READ_WORDS,
+) -> List[ReadBlock]:
+    """Group registers into the fewest contiguous block reads.
+
+    Registers are grouped by function code (3=holding, 4=input), sorted by
+    address and merged greedily while the hole between two registers is at most
+    ``max_gap`` words and the block stays within ``max_words``.
+    """
+    if isinstance(registers, DeviceProfile):
+        registers = registers.registers
+    if not 1 <= max_words <= MAX_READ_WORDS:
+        raise ValueError(f"max_words must be in 1..{MAX_READ_WORDS}")
+    if max_gap < 0:
+        raise ValueError("max_gap must be >= 0")
+
+    by_fc: Dict[int, List[RegisterDef]] = {}
+    for r in registers:
+        if r.function not in READ_FUNCTIONS:
+            logger.warning("Register %s uses FC%d; not plannable, skipped", r.name, r.function)
+            continue
+        by_fc.setdefault(r.function, []).append(r)
+
+    blocks: List[ReadBlock] = []
+    for fc in sorted(by_fc):
+        current: Optional[ReadBlock] = None
+        for r in sorted(by_fc[fc], key=lambda x: (x.address, int(x.words or 1))):
+            r_end = r.address + int(r.words or 1)
+            if current is not None:
+                gap = r.address - current.end
+                new_end = max(current.end, r_end)
+                if gap <= max_gap and new_end - current.address <= max_words:
+                    current.count = new_end - current.address
+                    current.registers.append(r)
+                    continue
+                blocks.append(current)
+            current = ReadBlock(function=fc, address=r.address, count=r_end - r.address, registers=[r])
+        if current is not None:
+            blocks.append(current)
+    logger.debug("Planned %d block read(s) for %d register(s)", len(blocks), sum(len(b.registers) for b in blocks))
+    return blocks
+
+
+def read_block(cli: ModbusRTUClient, unit: int, block: ReadBlock) -> Optional[List[int]]:
+    if block.function == 4:
+        return cli.read_input(unit=unit, address=block.address, count=block.count)
+    return cli.read_holding(unit=unit, address=block.address, count=block.count)
+
+
+@dataclass
+class BlockResult:
+    """Words read for one block; ``valid`` has one flag per ``block.registers``."""
+
+    block: ReadBlock
+    words: List[int]
+    valid: List[bool]
+
+
+def read_blocks(
+    cli: ModbusRTUClient,
+    unit: int,
+    blocks: List[ReadBlock],
+    fallback: bool = True,
+) -> List[BlockResult]:
+    """Run every block read.
+
+    Some devices reject reads that span unmapped addresses (the bridged gaps).
+    With ``fallback`` a failed block is retried register by register so a
+    single hole does not blank the whole block; registers that still fail are
+    flagged invalid and their words left at zero.
+    """
+    results: List[BlockResult] = []
+    for block in blocks:
+        words = read_block(cli, unit, block)
+        if words is not None and len(words) >= block.count:
+            results.append(BlockResult(block, list(words[: block.count]), [True] * len(block.registers)))
+            continue
+        logger.debug("Block FC%d @%d+%d failed for unit=%d", block.function, block.address, block.count, unit)
+        filled = [0] * block.count
+        valid: List[bool] = []
+        for r in block.registers:
+            regs = None
+            if fallback and len(block.registers) > 1:
+                single = ReadBlock(function=block.function, address=r.address, count=int(r.words or 1), registers=[r])
+                regs = read_block(cli, unit, single)
+            ok = regs is not None and len(regs) >= int(r.words or 1)
+            if ok:
+                off = r.address - block.address
+                filled[off : off + int(r.words or 1)] = regs[: int(r.words or 1)]
+            valid.append(ok)
+        results.append(BlockResult(block, filled, valid))
+    return results
+
+
+def execute_plan(
+    cli: ModbusRTUClient,
+    unit: int,
+    blocks: List[ReadBlock],
+    fallback: bool = True,
+) -> Dict[str, Optional[List[int]]]:
+    """Run every block read and return raw words keyed by register name."""
+    results: Dict[str, Optional[List[int]]] = {}
+    for res in read_blocks(cli, unit, blocks, fallback=fallback):
+        for (r, regs), ok in zip(res.block.split(res.words), res.valid):
+            results[r.name] = regs if ok else None
+    return results
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from profiles.schema import DeviceProfile, RecordMode, RegisterDef
+from storage.sqlite import MeasurementRow
+
+
+SeriesKey = Tuple[str, int, str]  # (port, unit id, register name)
+
+
+@dataclass(frozen=True)
+class RecordPolicy:
+    mode: RecordMode = RecordMode.all
+    deadband: float = 0.0
+    deadband_pct: float = 0.0
+    max_silence_s: Optional[float] = None
+
+    @classmethod
+    def from_register(cls, r: RegisterDef) -> "RecordPolicy":
+        return cls(mode=r.record, deadband=r.deadband, deadband_pct=r.deadband_pct, max_silence_s=r.max_silence_s)
+
+    def threshold(self, last: float) -> float:
+        """Smallest move that gets recorded, relative to the last recorded value."""
+        if self.mode == RecordMode.change:
+            return 0.0
+        return max(self.deadband, abs(last) * self.deadband_pct / 100.0)
+
+
+class _State:
+    __slots__ = ("rec_ts", "rec_value", "seen", "seen_recorded")
+
+    def __init__(self) -> None:
+        self.rec_ts = float("-inf")
+        self.rec_value: Optional[float] = None  # None: nothing recorded yet, or a gap marker
+        self.seen: Optional[MeasurementRow] = None  # newest row, recorded or not
+        self.seen_recorded = True
+
+
+class Recorder:
+    """Per-register recording policies applied between acquisition and storage.
+
+    Registers with ``record: all`` pass through unchanged (failed reads are
+    dropped, as before). Held registers (``change``/``deadband``) are stored
+    as a step series: a row when the value moves past the threshold, when
+    ``max_silence_s`` has elapsed since the last row, and a NULL row when
+    reads start failing, so ``query_steps`` rebuilds the held value exactly
+    (change) or to within the deadband.
+    """
+
+    def __init__(self) -> None:
+        self.seen = 0
+        self.recorded = 0
+        self._policies: Dict[SeriesKey, RecordPolicy] = {}
+        self._state: Dict[SeriesKey, _State] = {}
+        self._lock = threading.Lock()
+
+    def set_profile(self, port: str, unit_id: int, profile: DeviceProfile) -> None:
+        with self._lock:
+            for r in profile.registers:
+                self._policies[(port, unit_id, r.name)] = RecordPolicy.from_register(r)
+
+    def remove(self, port: str, unit_id: int) -> None:
+        with self._lock:
+            for key in [k for k in self._policies if k[:2] == (port, unit_id)]:
+                self._policies.pop(key, None)
+                self._state.pop(key, None)
+
+    @property
+    def ratio(self) -> float:
+        """Recorded rows per polled value (1.0 = everything written)."""
+        return self.recorded / self.seen if self.seen else 1.0
+
+    def filter(self, rows: Iterable[MeasurementRow]) -> List[MeasurementRow]:
+        """Rows to store out of one poll's (ts, port, unit_id, name, unit, value) rows."""
+        out: List[MeasurementRow] = []
+        with self._lock:
+            for row in rows:
+                ts, port, unit_id, name, _, value = row
+                self.seen += 1
+                key = (port, unit_id, name)
+                policy = self._policies.get(key)
+                if policy is None or policy.mode == RecordMode.all:
+                    if value is not None:
+                        out.append(row)
+                    continue
+                st = self._state.get(key)
+                if st is None:
+                    st = self._state[key] = _State()
+                st.seen = row
+                last = st.rec_value
+                if value is None:
+                    keep = last is not None  # read failures start a gap once
+                elif last is None:
+                    keep = True  # first value, or back after a gap
+                elif value != value or last != last:
+                    keep = (value != value) != (last != last)  # NaN appears/disappears
+                else:
+                    keep = abs(value - last) > policy.threshold(last)
+                if not keep and policy.max_silence_s is not None and value is not None:
+                    keep = ts - st.rec_ts >= policy.max_silence_s
+                st.seen_recorded = keep
+                if keep:
+                    st.rec_ts, st.rec_value = ts, value
+                    out.append(row)
+            self.recorded += len(out)
+        return out
+
+    def flush(self) -> List[MeasurementRow]:
+        """Close every held series (acquisition stopping): last value seen, then a gap."""
+        out: List[MeasurementRow] = []
+        with self._lock:
+            for st in self._state.values():
+                row = st.seen
+                if row is None:
+                    continue
+                if not st.seen_recorded and row[5] is not None:
+                    out.append(row)
+                if row[5] is not None:
+                    ts, port, unit_id, name, unit, _ = row
+                    out.append((ts + 0.001, port, unit_id, name, unit, None))
+                st.seen, st.seen_recorded = None, True
+                st.rec_ts, st.rec_value = float("-inf"), None
+            self.recorded += len(out)
+        return out
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import logging
+import struct
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from core import metrics, timing
+from core.capture import FrameCapture
+from core.crc import append_crc, check_crc
+from core.serial_comm import SerialParams, open_serial
+
+
+logger = logging.getLogger(__name__)
+
+FRAME_CACHE_SIZE = 4096
+READ_REQUEST_BYTES = 8  # unit, fc, address, count, CRC
+
+
+@dataclass
+class RtuResult:
+    outcome: int  # one of core.metrics OK/TIMEOUT/EXCEPTION/CRC/ERROR
+    words: Optional[List[int]] = None
+    exception_code: Optional[int] = None
+    tx_bytes: int = 0
+    rx_bytes: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome == metrics.OK
+
+
+def response_length(header: bytes) -> int:
+    """Full response length from its first three bytes (unit, fc, byte count/addr hi)."""
+    fc = header[1]
+    if fc & 0x80:
+        return timing.EXCEPTION_RESPONSE_BYTES
+    if fc in (1, 2, 3, 4, 23):
+        return 5 + header[2]
+    return 8  # FC05/06/15/16 echo address + value/count
+
+
+class RtuTransport:
+    """Minimal Modbus RTU master straight on pyserial.
+
+    Request frames are built once per (unit, function, address, count) and
+    reused. The response is read by expected length (header first, then the
+    exact remainder), so a transaction returns as soon as its last byte is in
+    instead of waiting out a read timeout. Consecutive requests are spaced by
+    the 3.5-character silent interval measured from the end of the previous
+    frame.
+
+    The port read timeout is the response timeout plus the wire time of a
+    read request. Assigning ``ser.timeout`` reconfigures the port (tcsetattr,
+    SetCommTimeouts on Windows), so it is only touched when ``timeout``
+    changes (scan passes, re-probes), never per transaction. Longer requests
+    are waited out in user space before the reply is read, so every request
+    gets the same first-byte deadline.
+    """
+
+    def __init__(self, params, capture: Optional[FrameCapture] = None, retries: int = 0) -> None:
+        self.params = params
+        self.capture = capture
+        self.retries = retries
+        self.ser = None
+        self._t35 = timing.silent_interval_s(params)
+        self._char_s = timing.char_time_for(params)
+        self._idle_at = 0.0  # perf_counter at which the bus is free again
+        self._timeout = float(params.timeout)
+        self._read_timeout = self._timeout + READ_REQUEST_BYTES * self._char_s
+        self._frames: Dict[Tuple[int, int, int, int], bytes] = {}
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, value: float) -> None:
+        self._timeout = float(value)
+        read_timeout = self._timeout + READ_REQUEST_BYTES * self._char_s
+        if read_timeout != self._read_timeout:
+            self._read_timeout = read_timeout
+            if self.ser is not None:
+                self.ser.timeout = read_timeout
+
+    # ---- lifecycle ----
+    def open(self) -> None:
+        p = self.params
+        self.ser = open_serial(
+            SerialParams(
+                port=p.port,
+                baudrate=p.baudrate,
+                parity=p.parity,
+                stopbits=p.stopbits,
+                bytesize=p.bytesize,
+                timeout_s=self._read_timeout,
+            ),
+            capture=self.capture,
+        )
+
+    def close(self) -> None:
+        if self.ser is not None:
+            try:
+                self.ser.close()
+            except Exception:  # noqa: BLE001
+                pass
+            self.ser = None
+
+    # ---- framing ----
+    def read_request(self, unit: int, fc: int, address: int, count: int) -> bytes:
+        key = (unit, fc, address, count)
+        frame = self._frames.get(key)
+        if frame is None:
+            if len(self._frames) >= FRAME_CACHE_SIZE:
+                self._frames.clear()
+            frame = self._frames[key] = append_crc(struct.pack(">BBHH", unit, fc, address, count))
+        return frame
+
+    def _wait_silent(self) -> None:
+        delay = self._idle_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def transact(self, request: bytes, expect_response: bool = True) -> Tuple[int, bytes]:
+        """Send one frame and read the reply; returns (outcome, raw response)."""
+        ser = self.ser
+        if ser is None:
+            return metrics.ERROR, b""
+        self._wait_silent()
+        if ser.in_waiting:
+            ser.reset_input_buffer()  # late bytes of an earlier timed-out reply
+        ser.write(request)
+        tx_done = time.perf_counter() + len(request) * self._char_s
+        if not expect_response:
+            self._idle_at = tx_done + self._t35
+            return metrics.OK, b""
+        # the port timeout covers a read request on the wire + the response timeout; wait out the excess of a
+        # longer request here so the first-byte deadline stays tx_done + timeout without touching ser.timeout
+        extra = tx_done - READ_REQUEST_BYTES * self._char_s - time.perf_counter()
+        if extra > 0:
+            time.sleep(extra)
+        header = ser.read(3)
+        if len(header) < 3:
+            self._idle_at = time.perf_counter() + self._t35
+            return metrics.TIMEOUT, header
+        # once the header is in, the rest streams at line speed; read() returns as soon as it is complete
+        total = response_length(header)
+        rest = total - 3
+        body = ser.read(rest) if rest > 0 else b""
+        response = header + body
+        self._idle_at = time.perf_counter() + self._t35
+        if len(response) < total:
+            return metrics.TIMEOUT, response
+        if not check_crc(response):
+            return metrics.CRC, response
+        if response[0] != request[0] or (response[1] & 0x7F) != request[1]:
+            return metrics.ERROR, response  # answer from another unit/request
+        if response[1] & 0x80:
+            return metrics.EXCEPTION, response
+        return metrics.OK, response
+
+    def _run(self, request: bytes, expect_response: bool = True) -> Tuple[int, bytes, int]:
+        """``transact`` with retries on timeout/CRC; returns (outcome, response, bytes sent)."""
+        sent = 0
+        outcome, response = metrics.ERROR, b""
+        for _ in range(self.retries + 1):
+            outcome, response = self.transact(request, expect_response)
+            sent += len(request)
+            if outcome not in (metrics.TIMEOUT, metrics.CRC):
+                break
+        return outcome, response, sent
+
+    @staticmethod
+    def _result(outcome: int, response: bytes, sent: int) -> RtuResult:
+        res = RtuResult(outcome=outcome, tx_bytes=sent, rx_bytes=len(response))
+        if outcome == metrics.EXCEPTION:
+            res.exception_code = response[2]
+        return res
+
+    # ---- operations ----
+    def read_registers(self, unit: int, fc: int, address: int, count: int) -> RtuResult:
+        outcome, response, sent = self._run(self.read_request(unit, fc, address, count))
+        res = self._result(outcome, response, sent)
+        if outcome == metrics.OK:
+            if response[2] != 2 * count:
+                res.outcome = metrics.ERROR
+            else:
+                res.words = list(struct.unpack_from(f">{count}H", response, 3))
+        return res
+
+    def write_single(self, unit: int, address: int, value: int) -> RtuResult:
+        request = append_crc(struct.pack(">BBHH", unit, 6, address, value & 0xFFFF))
+        return self._result(*self._run(request, expect_response=unit != 0))
+
+    def write_multiple(self, unit: int, address: int, values: Sequence[int]) -> RtuResult:
+        n = len(values)
+        request = append_crc(
+            struct.pack(f">BBHHB{n}H", unit, 16, address, n, 2 * n, *(int(v) & 0xFFFF for v in values))
+        )
+        return self._result(*self._run(request, expect_response=unit != 0))
+
+    def read_write(
+        self, unit: int, read_address: int, read_count: int, write_address: int, values: Sequence[int]
+    ) -> RtuResult:
+        """FC23: write ``values`` then read ``read_count`` words, in one transaction."""
+        n = len(values)
+        request = append_crc(
+            struct.pack(
+                f">BBHHHHB{n}H",
+                unit,
+                23,
+                read_address,
+                read_count,
+                write_address,
+                n,
+                2 * n,
+                *(int(v) & 0xFFFF for v in values),
+            )
+        )
+        outcome, response, sent = self._run(request)
+        res = self._result(outcome, response, sent)
+        if outcome == metrics.OK:
+            if response[2] != 2 * read_count:
+                res.outcome = metrics.ERROR
+            else:
+                res.words = list(struct.unpack_from(f">{read_count}H", response, 3))
+        return res
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from core.modbus_client import ModbusParams, ModbusRTUClient
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LineConfig:
+    baudrate: int
+    parity: str = "N"
+    stopbits: int = 1
+    bytesize: int = 8
+
+    def label(self) -> str:
+        return f"{self.baudrate} {self.bytesize}{self.parity}{self.stopbits}"
+
+    @classmethod
+    def parse(cls, text: str) -> "LineConfig":
+        """Parse ``"19200 8E1"``."""
+        baud, frame = text.split()
+        return cls(baudrate=int(baud), bytesize=int(frame[0]), parity=frame[1].upper(), stopbits=int(frame[2]))
+
+    def params(self, port: str, timeout: float = 0.3) -> ModbusParams:
+        return ModbusParams(
+            port=port,
+            baudrate=self.baudrate,
+            parity=self.parity,
+            stopbits=self.stopbits,
+            bytesize=self.bytesize,
+            timeout=timeout,
+        )
+
+
+# Most common field settings first: Modbus default (even parity), then the
+# usual no-parity variants, then the faster rates.
+DEFAULT_CANDIDATES: List[LineConfig] = [
+    LineConfig(9600, "E", 1),
+    LineConfig(9600, "N", 1),
+    LineConfig(19200, "E", 1),
+    LineConfig(19200, "N", 1),
+    LineConfig(38400, "N", 2),
+    LineConfig(38400, "N", 1),
+    LineConfig(9600, "N", 2),
+    LineConfig(19200, "N", 2),
+    LineConfig(38400, "E", 1),
+    LineConfig(57600, "N", 1),
+    LineConfig(115200, "N", 1),
+    LineConfig(115200, "E", 1),
+]
+
+
+def adapter_key(port_info: dict) -> str:
+    """Stable identity of a USB adapter across COM port renumbering."""
+    return str(port_info.get("serial_number") or port_info.get("hwid") or port_info.get("device"))
+
+
+class ScanCache:
+    """Per-adapter last-known-good line config and unit IDs, stored as JSON."""
+
+    def __init__(self, path: str | Path = "storage/scan_cache.json") -> None:
+        self.path = Path(path)
+        self._data: Dict[str, dict] = {}
+        if self.path.exists():
+            try:
+                self._data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as exc:
+                logger.warning("Ignoring unreadable scan cache %s: %s", self.path, exc)
+
+    def get(self, key: str) -> Optional[tuple[LineConfig, List[int]]]:
+        entry = self._data.get(key)
+        if not entry:
+            return None
+        return LineConfig(**entry["config"]), list(entry.get("units", []))
+
+    def put(self, key: str, cfg: LineConfig, units: Sequence[int]) -> None:
+        self._data[key] = {"config": asdict(cfg), "units": sorted(units), "ts": time.time()}
+        self.save()
+
+    def forget(self, key: str) -> None:
+        if self._data.pop(key, None) is not None:
+            self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self._data, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+@dataclass
+class ScanOutcome:
+    config: Optional[LineConfig]
+    units: List[int]
+    from_cache: bool = False
+    configs_tried: int = 0
+
+
+def heuristic_scan(
+    port_info: dict,
+    ids: Iterable[int] = range(1, 248),
+    candidates: Optional[Sequence[LineConfig]] = None,
+    cache: Optional[ScanCache] = None,
+    probe_addr: int = 0,
+    probe_count: int = 1,
+    timeout: float = 0.3,
+    on_config: Optional[Callable[[int, int, LineConfig], None]] = None,
+    client: Optional[ModbusRTUClient] = None,
+    **fast_opts: float,
+) -> ScanOutcome:
+    """Find the line config a bus answers on, most likely configs first.
+
+    Known adapters (by ``serial_number``/``hwid``) are first verified against
+    their cached config with one probe per cached unit; only if none answers
+    does the progressive sweep run. The sweep stops at the first config where
+    any unit answers and records it in the cache.
+
+    ``client`` is the port's own client when the sweep runs inside the bus
+    manager (``BusManager.exclusive``); it is left to the caller to restore.
+
+    ``timeout`` is each candidate's connection timeout and the ceiling of the
+    re-probe passes; ``fast_scan`` derives the tight first-pass timeout from
+    the candidate's line settings itself, so keep it generous (slow slaves).
+    """
+    port = port_info["device"]
+    key = adapter_key(port_info)
+    ids = list(ids)
+    order = list(candidates or DEFAULT_CANDIDATES)
+    cli = client or ModbusRTUClient()
+    tried = 0
+    try:
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            cfg, units = cached
+            tried += 1
+            if on_config is not None:
+                on_config(0, len(order) + 1, cfg)
+            if cli.connect(cfg.params(port, timeout)) and units:
+                alive = cli.scan_units_fast(units, probe_addr=probe_addr, probe_count=probe_count, **fast_opts)
+                if alive:
+                    logger.info("Adapter %s verified on cached config %s: %s", key, cfg.label(), alive)
+                    return ScanOutcome(cfg, alive, from_cache=True, configs_tried=tried)
+            logger.info("Cached config %s for %s did not answer; sweeping", cfg.label(), key)
+            order = [c for c in order if c != cfg]
+
+        for i, cfg in enumerate(order, start=1):
+            tried += 1
+            if on_config is not None:
+                on_config(i, len(order) + 1, cfg)
+            if not cli.connect(cfg.params(port, timeout)):
+                logger.error("Cannot open %s: %s", port, cli.last_error)
+                break
+            found = cli.scan_units_fast(ids, probe_addr=probe_addr, probe_count=probe_count, **fast_opts)
+            if found:
+                if cache is not None:
+                    cache.put(key, cfg, found)
+                logger.info("Bus on %s answers at %s: %s", port, cfg.label(), found)
+                return ScanOutcome(cfg, found, configs_tried=tried)
+    finally:
+        if client is None:
+            cli.close()
+    return ScanOutcome(None, [], configs_tried=tried)
+
+
+def candidates_from_config(entries: Optional[Iterable[str]]) -> List[LineConfig]:
+    """Candidate list from ``scan.candidates`` strings, falling back to the defaults."""
+    if not entries:
+        return list(DEFAULT_CANDIDATES)
+    return [LineConfig.parse(e) for e in entries]
+
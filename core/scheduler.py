@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from core import timing
+from core.decode import DecodeLayout, compile_block_layout
+from core.modbus_client import ModbusParams
+from core.read_planner import DEFAULT_MAX_GAP, ReadBlock, plan_reads
+from profiles.schema import DeviceProfile
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET = 0.9  # share of bus time polling may plan for; the rest is left to writes and pages
+COST_ALPHA = 0.2  # EWMA weight of a measured read duration
+REBUDGET_S = 1.0  # how often measured costs are folded back into the rates
+LATENESS_WINDOW = 1000
+
+
+@dataclass
+class PollTask:
+    """One block read of one unit, released every ``effective_s`` seconds."""
+
+    unit_id: int
+    block: ReadBlock
+    layout: DecodeLayout
+    period_s: float  # requested
+    critical: bool = False
+    cost_s: float = 0.0  # expected bus time of one read
+    effective_s: float = 0.0  # period actually scheduled (>= period_s when shedding)
+    release: float = 0.0
+    runs: int = 0
+    missed: int = 0
+
+    @property
+    def deadline(self) -> float:
+        return self.release + self.effective_s
+
+
+@dataclass
+class LoadReport:
+    requested: float  # bus share the requested rates need (1.0 = saturated)
+    budget: float
+    stretch: float  # period multiplier applied to non-critical reads (1.0 = none)
+    critical_stretch: float  # idem for critical reads (> 1 only if they alone exceed the budget)
+    tasks: int
+    runs: int
+    missed: int
+    lateness_p50_ms: float = 0.0
+    lateness_p99_ms: float = 0.0
+    per_unit: Dict[int, Tuple[float, float]] = field(default_factory=dict)  # unit -> (requested, scheduled) reads/s
+
+    @property
+    def overloaded(self) -> bool:
+        return self.requested > self.budget
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class EdfScheduler:
+    """Earliest-deadline-first release of multi-rate block reads on one bus.
+
+    Registers are grouped by poll interval (``RegisterDef.poll_s``, default
+    ``default_period_s``) and each group is block-planned, giving one task
+    per block. Task ``k`` is released every period with its deadline at the
+    next release; the ready task with the earliest deadline runs first.
+
+    Each read's bus time is estimated from the line settings
+    (``timing.read_transaction_s``) and then tracked from measured durations.
+    When the requested rates need more than ``budget`` of the bus, the
+    periods of non-critical reads are stretched by one common factor, so
+    every series slows down in proportion and critical registers keep their
+    rate. A read that falls a whole period behind skips the missed releases
+    (counted in ``missed``) instead of being replayed back-to-back.
+    """
+
+    def __init__(
+        self,
+        params: ModbusParams,
+        budget: float = DEFAULT_BUDGET,
+        turnaround_s: float = timing.DEFAULT_TURNAROUND_S,
+        host_latency_s: float = timing.DEFAULT_HOST_LATENCY_S,
+    ) -> None:
+        if not 0 < budget <= 1:
+            raise ValueError("budget must be in (0, 1]")
+        self.params = params
+        self.budget = budget
+        self.turnaround_s = turnaround_s
+        self.host_latency_s = host_latency_s
+        self.stretch = 1.0
+        self.critical_stretch = 1.0
+        self._tasks: List[PollTask] = []
+        self._lateness: Deque[float] = deque(maxlen=LATENESS_WINDOW)
+        self._last_budget = float("-inf")
+        self._lock = threading.Lock()
+
+    # ---- tasks ----
+    def plan_unit(
+        self, unit_id: int, profile: DeviceProfile, default_period_s: float, max_gap: int = DEFAULT_MAX_GAP
+    ) -> List[PollTask]:
+        by_period: Dict[float, list] = {}
+        for r in profile.registers:
+            by_period.setdefault(float(r.poll_s or default_period_s), []).append(r)
+        tasks = []
+        for period, registers in sorted(by_period.items()):
+            for block in plan_reads(registers, max_gap=max_gap):
+                cost = timing.read_transaction_s(self.params, block.count, self.turnaround_s, self.host_latency_s)
+                tasks.append(
+                    PollTask(
+                        unit_id=unit_id,
+                        block=block,
+                        layout=compile_block_layout(block),
+                        period_s=period,
+                        critical=any(r.critical for r in block.registers),
+                        cost_s=cost,
+                    )
+                )
+        return tasks
+
+    def set_unit(self, unit_id: int, tasks: List[PollTask], now: float) -> None:
+        """Replace the tasks of ``unit_id``; they are released right away."""
+        for t in tasks:
+            t.release = now
+        with self._lock:
+            self._tasks = [t for t in self._tasks if t.unit_id != unit_id] + tasks
+            self._rebudget(now)
+
+    def remove_unit(self, unit_id: int, now: float) -> None:
+        with self._lock:
+            self._tasks = [t for t in self._tasks if t.unit_id != unit_id]
+            self._rebudget(now)
+
+    def tasks(self) -> List[PollTask]:
+        with self._lock:
+            return list(self._tasks)
+
+    # ---- budget ----
+    def _rebudget(self, now: float) -> None:
+        u_crit = sum(t.cost_s / t.period_s for t in self._tasks if t.critical)
+        u_rest = sum(t.cost_s / t.period_s for t in self._tasks if not t.critical)
+        stretch = crit = 1.0
+        if u_crit + u_rest > self.budget:
+            if u_crit < self.budget * 0.999:
+                stretch = u_rest / (self.budget - u_crit)
+            else:
+                stretch = crit = (u_crit + u_rest) / self.budget
+        if abs(stretch - self.stretch) > 0.05 * self.stretch:
+            if stretch > 1.0:
+                logger.warning(
+                    "Requested poll rates need %.0f%% of the bus (budget %.0f%%): periods x%.2f (critical x%.2f)",
+                    100 * (u_crit + u_rest),
+                    100 * self.budget,
+                    stretch,
+                    crit,
+                )
+            else:
+                logger.info("Poll rates back within the bus budget")
+        self.stretch, self.critical_stretch = stretch, crit
+        for t in self._tasks:
+            t.effective_s = t.period_s * (crit if t.critical else stretch)
+        self._last_budget = now
+
+    # ---- dispatch ----
+    def next(self, now: float) -> Tuple[Optional[PollTask], float]:
+        """Ready task with the earliest deadline, or (None, seconds until the next release)."""
+        with self._lock:
+            if now - self._last_budget >= REBUDGET_S:
+                self._rebudget(now)
+            best: Optional[PollTask] = None
+            first_release = float("inf")
+            for t in self._tasks:
+                if t.release <= now:
+                    if best is None or t.deadline < best.deadline:
+                        best = t
+                elif t.release < first_release:
+                    first_release = t.release
+        if best is not None:
+            return best, 0.0
+        return None, first_release - now
+
+    def complete(self, task: PollTask, started: float, duration_s: float) -> None:
+        """Account one run of ``task`` and schedule its next release."""
+        with self._lock:
+            self._lateness.append(started - task.release)
+            task.cost_s += COST_ALPHA * (duration_s - task.cost_s)
+            task.runs += 1
+            end = started + duration_s
+            task.release += task.effective_s
+            if task.release + task.effective_s <= end:
+                # a whole period behind: drop the missed releases, keep the grid
+                missed = int((end - task.release) // task.effective_s)
+                task.missed += missed
+                task.release += missed * task.effective_s
+
+    # ---- reporting ----
+    def report(self) -> LoadReport:
+        with self._lock:
+            tasks = list(self._tasks)
+            lateness = list(self._lateness)
+            stretch, crit = self.stretch, self.critical_stretch
+        per_unit: Dict[int, Tuple[float, float]] = {}
+        for t in tasks:
+            req, sched = per_unit.get(t.unit_id, (0.0, 0.0))
+            per_unit[t.unit_id] = (req + 1.0 / t.period_s, sched + 1.0 / t.effective_s if t.effective_s else sched)
+        return LoadReport(
+            requested=sum(t.cost_s / t.period_s for t in tasks),
+            budget=self.budget,
+            stretch=stretch,
+            critical_stretch=crit,
+            tasks=len(tasks),
+            runs=sum(t.runs for t in tasks),
+            missed=sum(t.missed for t in tasks),
+            lateness_p50_ms=_percentile(lateness, 0.50) * 1000,
+            lateness_p99_ms=_percentile(lateness, 0.99) * 1000,
+            per_unit=per_unit,
+        )
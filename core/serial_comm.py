@@ -8,6 +8,8 @@ import serial
 from serial import Serial
 from serial.tools import list_ports
 
+from core.capture import CaptureSerial, FrameCapture
+
 
 logger = logging.getLogger(__name__)
 
@@ -59,7 +61,8 @@ def list_serial_ports() -> List[dict]:
     return ports
 
 
-def open_serial(params: SerialParams) -> Serial:
+def open_serial(params: SerialParams, capture: Optional[FrameCapture] = None) -> Serial:
+    """Open the port; with ``capture`` every read/write is recorded in it."""
     logger.info(
         "Opening serial port %s @ %d %s %dN%d",
         params.port,
@@ -76,6 +79,8 @@ def open_serial(params: SerialParams) -> Serial:
         bytesize=BYTESIZE_MAP.get(params.bytesize, serial.EIGHTBITS),
         timeout=params.timeout_s,
     )
+    if capture is not None:
+        return CaptureSerial(ser, capture)  # type: ignore[return-value]
     return ser
 
 
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import random
+import select
+import struct
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from core import timing
+from core.crc import append_crc, check_crc
+from core.modbus_client import ModbusParams
+from profiles.schema import DeviceProfile, Endianness, RegisterDef, RegType
+
+
+logger = logging.getLogger(__name__)
+
+# Modbus exception codes
+ILLEGAL_FUNCTION = 1
+ILLEGAL_ADDRESS = 2
+ILLEGAL_VALUE = 3
+DEVICE_FAILURE = 4
+
+
+@dataclass
+class SimFaults:
+    """Fault injection knobs; rates are probabilities per request."""
+
+    turnaround_s: float = 0.0
+    jitter_s: float = 0.0
+    timeout_rate: float = 0.0
+    crc_error_rate: float = 0.0
+    exception_rate: float = 0.0
+    exception_code: int = DEVICE_FAILURE
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, cfg: Optional[dict]) -> "SimFaults":
+        cfg = cfg or {}
+        return cls(
+            turnaround_s=float(cfg.get("turnaround_ms", 0.0)) / 1000.0,
+            jitter_s=float(cfg.get("jitter_ms", 0.0)) / 1000.0,
+            timeout_rate=float(cfg.get("timeout_rate", 0.0)),
+            crc_error_rate=float(cfg.get("crc_error_rate", 0.0)),
+            exception_rate=float(cfg.get("exception_rate", 0.0)),
+            exception_code=int(cfg.get("exception_code", DEVICE_FAILURE)),
+            seed=cfg.get("seed"),
+        )
+
+
+def _seed_words(reg: RegisterDef) -> List[int]:
+    """Deterministic non-zero content so decoded values are recognisable."""
+    if reg.type == RegType.f32:
+        raw = struct.pack(">f", reg.address + 0.5)
+    elif reg.type in (RegType.u32, RegType.i32):
+        raw = struct.pack(">I", 0x10000 + reg.address)
+    else:
+        return [reg.address & 0xFFFF]
+    hi, lo = struct.unpack(">HH", raw)
+    return [lo, hi] if reg.endianness == Endianness.le else [hi, lo]
+
+
+@dataclass
+class SimUnit:
+    """One virtual slave: full holding/input register tables.
+
+    With ``strict`` only addresses mapped by the profile are readable; other
+    addresses answer ILLEGAL DATA ADDRESS like most real devices do.
+    """
+
+    unit_id: int
+    holding: array = field(default_factory=lambda: array("H", bytes(2 * 65536)))
+    inputs: array = field(default_factory=lambda: array("H", bytes(2 * 65536)))
+    valid: Optional[Dict[int, bytearray]] = None  # function -> 65536 flags
+    faults: Optional[SimFaults] = None  # overrides the simulator-wide faults
+
+    @classmethod
+    def from_profile(cls, unit_id: int, profile: DeviceProfile, strict: bool = False) -> "SimUnit":
+        unit = cls(unit_id=unit_id)
+        if strict:
+            unit.valid = {3: bytearray(65536), 4: bytearray(65536)}
+        for reg in profile.registers:
+            words = _seed_words(reg)
+            unit.set_words(reg.function, reg.address, words)
+            if unit.valid is not None:
+                flags = unit.valid.setdefault(reg.function, bytearray(65536))
+                flags[reg.address : reg.address + len(words)] = b"\x01" * len(words)
+        return unit
+
+    def table(self, function: int) -> array:
+        return self.inputs if function == 4 else self.holding
+
+    def set_words(self, function: int, address: int, words: Iterable[int]) -> None:
+        t = self.table(function)
+        for i, w in enumerate(words):
+            t[address + i] = int(w) & 0xFFFF
+
+    def readable(self, function: int, address: int, count: int) -> bool:
+        if address + count > 65536:
+            return False
+        if self.valid is None:
+            return True
+        flags = self.valid.get(function)
+        return flags is not None and all(flags[address : address + count])
+
+
+@dataclass
+class SimStats:
+    requests: int = 0
+    responses: int = 0
+    timeouts: int = 0
+    crc_errors: int = 0
+    exceptions: int = 0
+    bad_requests: int = 0
+
+
+def request_length(buf: bytes | bytearray) -> Optional[int]:
+    """Total length of the request frame at the start of ``buf``; None if unknown yet."""
+    if len(buf) < 2:
+        return None
+    fc = buf[1]
+    if fc in (1, 2, 3, 4, 5, 6):
+        return 8
+    if fc in (15, 16):
+        return 9 + buf[6] if len(buf) >= 7 else None
+    if fc == 23:
+        return 13 + buf[10] if len(buf) >= 11 else None
+    return 4  # unit, fc, crc: enough to answer ILLEGAL FUNCTION
+
+
+class ModbusSlaveSimulator:
+    """Modbus RTU slaves served on a Linux pseudo-terminal pair.
+
+    Point ``ModbusParams.port`` at ``sim.port`` to talk to the virtual units.
+    A pty transfers bytes instantly, so with ``emulate_wire`` the response is
+    held back by the wire time the frames would take at ``params.baudrate``
+    plus the injected turnaround, keeping benchmark numbers realistic.
+    """
+
+    def __init__(
+        self,
+        units: Iterable[SimUnit],
+        faults: Optional[SimFaults] = None,
+        params: Optional[ModbusParams] = None,
+        emulate_wire: bool = True,
+    ) -> None:
+        self.units: Dict[int, SimUnit] = {u.unit_id: u for u in units}
+        self.faults = faults or SimFaults()
+        self.params = params or ModbusParams()
+        self.emulate_wire = emulate_wire
+        self.stats = SimStats()
+        self._rng = random.Random(self.faults.seed)
+        self._master_fd: Optional[int] = None
+        self._slave_fd: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.port = ""
+
+    # ---- lifecycle ----
+    def start(self) -> str:
+        if not hasattr(os, "openpty"):
+            raise RuntimeError("The slave simulator needs a POSIX pseudo-terminal (Linux/macOS)")
+        import tty
+
+        self._master_fd, self._slave_fd = os.openpty()
+        tty.setraw(self._master_fd)
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="modbus-sim", daemon=True)
+        self._thread.start()
+        logger.info("Modbus simulator serving unit(s) %s on %s", sorted(self.units), self.port)
+        return self.port
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        for fd in (self._master_fd, self._slave_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master_fd = self._slave_fd = None
+
+    def __enter__(self) -> "ModbusSlaveSimulator":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ---- serving ----
+    def _run(self) -> None:
+        fd = self._master_fd
+        assert fd is not None
+        buf = bytearray()
+        while not self._stop.is_set():
+            ready, _, _ = select.select([fd], [], [], 0.05)
+            if not ready:
+                if buf:  # silent interval elapsed on a partial frame: drop it
+                    self.stats.bad_requests += 1
+                    buf.clear()
+                continue
+            try:
+                buf += os.read(fd, 4096)
+            except OSError:
+                break
+            while True:
+                n = request_length(buf)
+                if n is None or len(buf) < n:
+                    break
+                frame, buf = bytes(buf[:n]), buf[n:]
+                if not check_crc(frame):
+                    # a real slave stays silent; resync on the next burst
+                    self.stats.bad_requests += 1
+                    buf.clear()
+                    break
+                self._handle(fd, frame)
+
+    def _handle(self, fd: int, frame: bytes) -> None:
+        uid, fc = frame[0], frame[1]
+        unit = self.units.get(uid)
+        if unit is None and uid != 0:
+            return  # nobody home: the master times out
+        self.stats.requests += 1
+        faults = unit.faults if unit is not None and unit.faults is not None else self.faults
+        rng = self._rng
+        if uid != 0 and faults.timeout_rate and rng.random() < faults.timeout_rate:
+            self.stats.timeouts += 1
+            return
+        if faults.exception_rate and rng.random() < faults.exception_rate:
+            pdu = bytes((fc | 0x80, faults.exception_code))
+            self.stats.exceptions += 1
+        else:
+            targets = [unit] if unit is not None else list(self.units.values())
+            pdu = b""
+            for u in targets:
+                pdu = self._execute(u, frame)
+            if not pdu:
+                return  # broadcast on a bus without units: nothing executed, nothing to answer
+            if pdu[0] & 0x80:
+                self.stats.exceptions += 1
+        if uid == 0:
+            return  # broadcast: executed, never answered
+        response = bytearray(append_crc(bytes((uid,)) + pdu))
+        if faults.crc_error_rate and rng.random() < faults.crc_error_rate:
+            response[-1] ^= 0xFF
+            self.stats.crc_errors += 1
+        delay = faults.turnaround_s + (rng.uniform(0, faults.jitter_s) if faults.jitter_s else 0.0)
+        if self.emulate_wire:
+            delay += timing.frame_time_s(self.params, len(frame) + len(response)) + timing.silent_interval_s(self.params)
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            os.write(fd, bytes(response))
+        except OSError:
+            return
+        self.stats.responses += 1
+
+    def _execute(self, unit: SimUnit, frame: bytes) -> bytes:
+        """Apply one request to ``unit`` and return the response PDU."""
+        fc = frame[1]
+        if fc in (3, 4):
+            address, count = struct.unpack(">HH", frame[2:6])
+            if not 1 <= count <= 125:
+                return bytes((fc | 0x80, ILLEGAL_VALUE))
+            if not unit.readable(fc, address, count):
+                return bytes((fc | 0x80, ILLEGAL_ADDRESS))
+            words = unit.table(fc)[address : address + count]
+            return bytes((fc, 2 * count)) + struct.pack(f">{count}H", *words)
+        if fc == 6:
+            address, value = struct.unpack(">HH", frame[2:6])
+            if not unit.readable(3, address, 1):
+                return bytes((fc | 0x80, ILLEGAL_ADDRESS))
+            unit.holding[address] = value
+            return frame[1:6]
+        if fc == 16:
+            address, count = struct.unpack(">HH", frame[2:6])
+            if not 1 <= count <= 123 or frame[6] != 2 * count:
+                return bytes((fc | 0x80, ILLEGAL_VALUE))
+            if not unit.readable(3, address, count):
+                return bytes((fc | 0x80, ILLEGAL_ADDRESS))
+            unit.set_words(3, address, struct.unpack(f">{count}H", frame[7 : 7 + 2 * count]))
+            return frame[1:6]
+        if fc == 23:
+            r_addr, r_count, w_addr, w_count = struct.unpack(">HHHH", frame[2:10])
+            if not 1 <= r_count <= 125 or not 1 <= w_count <= 121 or frame[10] != 2 * w_count:
+                return bytes((fc | 0x80, ILLEGAL_VALUE))
+            if not unit.readable(3, w_addr, w_count) or not unit.readable(3, r_addr, r_count):
+                return bytes((fc | 0x80, ILLEGAL_ADDRESS))
+            # the write is performed before the read
+            unit.set_words(3, w_addr, struct.unpack(f">{w_count}H", frame[11 : 11 + 2 * w_count]))
+            words = unit.holding[r_addr : r_addr + r_count]
+            return bytes((fc, 2 * r_count)) + struct.pack(f">{r_count}H", *words)
+        return bytes((fc | 0x80, ILLEGAL_FUNCTION))
+
+
+def simulator_from_profile(
+    profile: DeviceProfile,
+    unit_ids: Iterable[int],
+    faults: Optional[SimFaults] = None,
+    params: Optional[ModbusParams] = None,
+    strict: bool = False,
+    emulate_wire: bool = True,
+) -> ModbusSlaveSimulator:
+    units = [SimUnit.from_profile(uid, profile, strict=strict) for uid in unit_ids]
+    return ModbusSlaveSimulator(units, faults=faults, params=params, emulate_wire=emulate_wire)
+
+
+def _parse_ids(text: str) -> List[int]:
+    ids: List[int] = []
+    for part in text.split(","):
+        if "-" in part:
+            a, b = part.split("-", 1)
+            ids.extend(range(int(a), int(b) + 1))
+        elif part.strip():
+            ids.append(int(part))
+    return ids
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from profiles.loader import load_profile
+
+    ap = argparse.ArgumentParser(description="Serve virtual Modbus RTU slaves on a pty")
+    ap.add_argument("profile", help="DeviceProfile YAML")
+    ap.add_argument("--units", default="1", help="unit ids, e.g. 1,2,10-12")
+    ap.add_argument("--baudrate", type=int, default=38400)
+    ap.add_argument("--turnaround-ms", type=float, default=5.0)
+    ap.add_argument("--timeout-rate", type=float, default=0.0)
+    ap.add_argument("--crc-error-rate", type=float, default=0.0)
+    ap.add_argument("--exception-rate", type=float, default=0.0)
+    ap.add_argument("--strict", action="store_true", help="unmapped addresses raise ILLEGAL DATA ADDRESS")
+    args = ap.parse_args(argv)
+
+    faults = SimFaults(
+        turnaround_s=args.turnaround_ms / 1000.0,
+        timeout_rate=args.timeout_rate,
+        crc_error_rate=args.crc_error_rate,
+        exception_rate=args.exception_rate,
+    )
+    sim = simulator_from_profile(
+        load_profile(args.profile),
+        _parse_ids(args.units),
+        faults=faults,
+        params=ModbusParams(baudrate=args.baudrate),
+        strict=args.strict,
+    )
+    with sim:
+        print(f"Serving on {sim.port} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+    print(sim.stats)
+
+
+if __name__ == "__main__":
+    main()
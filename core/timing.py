@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:  # imported by core.modbus_client itself
+    from core.modbus_client import ModbusParams
+
+
+# Modbus over serial line spec: above 19200 baud use fixed 750 us / 1.75 ms
+# for the 1.5 / 3.5 character timers.
+FIXED_T15_S = 0.00075
+FIXED_T35_S = 0.00175
+
+DEFAULT_TURNAROUND_S = 0.005  # slave processing time before it answers
+DEFAULT_HOST_LATENCY_S = 0.010  # USB adapter latency timer + OS scheduling
+
+READ_REQUEST_BYTES = 8  # unit, fc, addr(2), count(2), crc(2)
+EXCEPTION_RESPONSE_BYTES = 5  # unit, fc|0x80, code, crc(2)
+
+
+def bits_per_char(parity: str = "N", stopbits: int = 1, bytesize: int = 8) -> int:
+    return 1 + int(bytesize) + (0 if str(parity).upper() == "N" else 1) + int(stopbits)
+
+
+def char_time_s(baudrate: int, parity: str = "N", stopbits: int = 1, bytesize: int = 8) -> float:
+    return bits_per_char(parity, stopbits, bytesize) / float(baudrate)
+
+
+def char_time_for(p: ModbusParams) -> float:
+    return char_time_s(p.baudrate, p.parity, p.stopbits, p.bytesize)
+
+
+def silent_interval_s(p: ModbusParams) -> float:
+    """3.5-character inter-frame delay (t3.5)."""
+    if p.baudrate > 19200:
+        return FIXED_T35_S
+    return 3.5 * char_time_for(p)
+
+
+def frame_time_s(p: ModbusParams, nbytes: int) -> float:
+    """Wire time of an ``nbytes`` frame, excluding the silent interval."""
+    return nbytes * char_time_for(p)
+
+
+def read_response_bytes(count: int) -> int:
+    """FC03/FC04 response size: unit, fc, byte count, data, crc."""
+    return 5 + 2 * int(count)
+
+
+def transaction_time_s(
+    p: ModbusParams,
+    request_bytes: int,
+    response_bytes: int,
+    turnaround_s: float = DEFAULT_TURNAROUND_S,
+) -> float:
+    """Bus time of one request/response exchange including both t3.5 gaps."""
+    t35 = silent_interval_s(p)
+    return frame_time_s(p, request_bytes) + t35 + turnaround_s + frame_time_s(p, response_bytes) + t35
+
+
+def read_transaction_s(
+    p: ModbusParams,
+    count: int,
+    turnaround_s: float = DEFAULT_TURNAROUND_S,
+    host_latency_s: float = DEFAULT_HOST_LATENCY_S,
+) -> float:
+    """Expected bus time of one FC03/FC04 read of ``count`` words, host latency included."""
+    return transaction_time_s(p, READ_REQUEST_BYTES, read_response_bytes(count), turnaround_s) + host_latency_s
+
+
+def response_timeout_s(
+    p: ModbusParams,
+    request_bytes: int = READ_REQUEST_BYTES,
+    response_bytes: Optional[int] = None,
+    turnaround_s: float = DEFAULT_TURNAROUND_S,
+    host_latency_s: float = DEFAULT_HOST_LATENCY_S,
+) -> float:
+    """Tightest sensible response timeout for one transaction at ``p``'s line settings."""
+    if response_bytes is None:
+        response_bytes = read_response_bytes(1)
+    return transaction_time_s(p, request_bytes, response_bytes, turnaround_s) + host_latency_s
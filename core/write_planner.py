@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from core.decode import encode_register
+from profiles.schema import Access, DeviceProfile, RegisterDef, WriteSequence
+
+
+logger = logging.getLogger(__name__)
+
+
+# FC16 request carries at most 246 data bytes -> 123 registers; FC23 writes at most 121.
+MAX_WRITE_WORDS = 123
+MAX_READWRITE_WORDS = 121
+
+WriteItem = Tuple[RegisterDef, float]  # register, value in engineering units
+
+
+@dataclass
+class WriteBlock:
+    """One contiguous FC06/FC16 write covering one or more registers."""
+
+    address: int
+    words: List[int] = field(default_factory=list)
+    registers: List[RegisterDef] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.words)
+
+    @property
+    def end(self) -> int:
+        return self.address + self.count
+
+
+def check_write(reg: RegisterDef, value: float) -> List[int]:
+    """Guardrails for one write; returns the encoded words or raises ``ValueError``."""
+    if reg.access != Access.RW or reg.function != 3:
+        raise ValueError(f"{reg.name}: not a writable holding register")
+    if reg.minimum is not None and value < reg.minimum:
+        raise ValueError(f"{reg.name}: {value} below minimum {reg.minimum}")
+    if reg.maximum is not None and value > reg.maximum:
+        raise ValueError(f"{reg.name}: {value} above maximum {reg.maximum}")
+    return encode_register(reg, value)
+
+
+def find_sequence(profile: DeviceProfile, name: str) -> WriteSequence:
+    for seq in profile.sequences:
+        if seq.name == name:
+            return seq
+    raise ValueError(f"unknown sequence {name!r}")
+
+
+def sequence_items(profile: DeviceProfile, sequence: WriteSequence) -> List[WriteItem]:
+    """(register, value) pairs of a profile write sequence, in the listed order."""
+    by_name = {r.name: r for r in profile.registers}
+    return [(by_name[step.reg], step.value) for step in sequence.steps]
+
+
+def plan_writes(
+    items: Iterable[WriteItem],
+    ordered: bool = False,
+    max_words: int = MAX_WRITE_WORDS,
+) -> List[WriteBlock]:
+    """Group writes into the fewest contiguous FC16 blocks.
+
+    Every item is checked and encoded first: one value outside its limits
+    rejects the whole plan (``ValueError`` listing every problem), so a
+    recipe is never half applied because of a typo. Writes are sorted by
+    address and merged while they are strictly adjacent; gaps are never
+    bridged, since the words in between would be overwritten. With
+    ``ordered`` the given order is kept and only consecutive adjacent items
+    share a block (e.g. a command register that must be written last).
+    """
+    if not 1 <= max_words <= MAX_WRITE_WORDS:
+        raise ValueError(f"max_words must be in 1..{MAX_WRITE_WORDS}")
+    encoded: List[Tuple[RegisterDef, List[int]]] = []
+    errors: List[str] = []
+    for reg, value in items:
+        try:
+            encoded.append((reg, check_write(reg, value)))
+        except ValueError as exc:
+            errors.append(str(exc))
+    if errors:
+        raise ValueError("; ".join(errors))
+    if not ordered:
+        encoded.sort(key=lambda item: item[0].address)
+        for (a, wa), (b, _) in zip(encoded, encoded[1:]):
+            if b.address < a.address + len(wa):
+                raise ValueError(f"{a.name} and {b.name} overlap")
+
+    blocks: List[WriteBlock] = []
+    current: Optional[WriteBlock] = None
+    for reg, words in encoded:
+        if current is not None and reg.address == current.end and current.count + len(words) <= max_words:
+            current.words.extend(words)
+            current.registers.append(reg)
+            continue
+        current = WriteBlock(address=reg.address, words=list(words), registers=[reg])
+        blocks.append(current)
+    logger.debug("Planned %d block write(s) for %d register(s)", len(blocks), len(encoded))
+    return blocks
+
+
+@dataclass
+class WriteResult:
+    transactions: int = 0
+    written: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)  # refused or no answer
+    skipped: List[str] = field(default_factory=list)  # not sent after a failure
+    mismatched: List[str] = field(default_factory=list)  # readback differs (device clamped or ignored it)
+
+    @property
+    def ok(self) -> bool:
+        return not (self.failed or self.skipped or self.mismatched)
+
+
+def _write_block(cli, unit: int, block: WriteBlock) -> bool:
+    try:
+        if block.count == 1:
+            return bool(cli.write_single_register(unit, block.address, block.words[0]))
+        return bool(cli.write_multiple_registers(unit, block.address, block.words))
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Write @%d+%d unit=%d failed: %s", block.address, block.count, unit, exc)
+        return False
+
+
+def _compare(block: WriteBlock, readback: Sequence[int], res: WriteResult) -> None:
+    for reg in block.registers:
+        off = reg.address - block.address
+        n = int(reg.words or 1)
+        if list(readback[off : off + n]) == block.words[off : off + n]:
+            res.written.append(reg.name)
+        else:
+            res.mismatched.append(reg.name)
+
+
+def execute_writes(cli, unit: int, blocks: List[WriteBlock], readback: bool = False) -> WriteResult:
+    """Send the planned blocks in order; stops at the first failed block.
+
+    ``cli`` is a ``ModbusRTUClient`` or ``BusHandle``. A one-word block uses
+    FC06, longer ones FC16. With ``readback`` each block goes out as one FC23
+    write+read of the same range and the words are compared; a device that
+    refuses FC23 gets FC16 followed by an FC03 read instead.
+    """
+    res = WriteResult()
+    use_fc23 = readback and unit != 0
+    for i, block in enumerate(blocks):
+        words: Optional[List[int]] = None
+        if use_fc23 and block.count <= MAX_READWRITE_WORDS:
+            res.transactions += 1
+            words = cli.readwrite_registers(unit, block.address, block.count, block.address, block.words)
+            if words is None:
+                logger.info("FC23 failed for unit=%d, falling back to FC16 + FC03", unit)
+                use_fc23 = False
+        if words is None:
+            res.transactions += 1
+            if not _write_block(cli, unit, block):
+                res.failed.extend(r.name for r in block.registers)
+                res.skipped.extend(r.name for b in blocks[i + 1 :] for r in b.registers)
+                break
+            if readback and unit != 0:
+                res.transactions += 1
+                words = cli.read_holding(unit, block.address, block.count)
+                if words is None:
+                    res.mismatched.extend(r.name for r in block.registers)
+                    continue
+            else:
+                res.written.extend(r.name for r in block.registers)
+                continue
+        _compare(block, words, res)
+    logger.info(
+        "Wrote %d register(s) to unit %d in %d transaction(s), %d failed, %d mismatched",
+        len(res.written),
+        unit,
+        res.transactions,
+        len(res.failed),
+        len(res.mismatched),
+    )
+    return res
+
+
+def apply_sequence(cli, unit: int, profile: DeviceProfile, sequence: WriteSequence | str) -> WriteResult:
+    """Plan and run a profile write sequence with its ``ordered``/``readback`` options."""
+    if isinstance(sequence, str):
+        sequence = find_sequence(profile, sequence)
+    blocks = plan_writes(sequence_items(profile, sequence), ordered=sequence.ordered)
+    return execute_writes(cli, unit, blocks, readback=sequence.readback)
@@ -11,6 +11,18 @@ from .schema import DeviceProfile
 
 logger = logging.getLogger(__name__)
 
+PROFILE_GLOB = "*.y*ml"
+
+
+def profile_key(prof: DeviceProfile) -> str:
+    return f"{prof.meta.brand}:{prof.meta.model}"
+
+
+def load_profile(path: str | Path) -> DeviceProfile:
+    """Parse and validate one profile file (raises on error)."""
+    data = yaml.safe_load(Path(path).read_text(encoding="utf-8"))
+    return DeviceProfile.model_validate(data)
+
 
 def load_profiles(dir_path: str | Path = "profiles") -> Dict[str, DeviceProfile]:
     base = Path(dir_path)
@@ -18,14 +30,12 @@ def load_profiles(dir_path: str | Path = "profiles") -> Dict[str, DeviceProfile]
     if not base.exists():
         logger.warning("Profiles directory does not exist: %s", base)
         return profiles
-    for yml in base.glob("*.y*ml"):
+    for yml in base.glob(PROFILE_GLOB):
         try:
-            data = yaml.safe_load(yml.read_text(encoding="utf-8"))
-            prof = DeviceProfile.model_validate(data)
-            key = f"{prof.meta.brand}:{prof.meta.model}"
+            prof = load_profile(yml)
+            key = profile_key(prof)
             profiles[key] = prof
             logger.info("Loaded profile %s from %s", key, yml)
         except Exception as exc:  # noqa: BLE001
             logger.error("Failed to load profile %s: %s", yml, exc)
     return profiles
-
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+from core.decode import DecodeLayout, compile_profile
+from core.read_planner import DEFAULT_MAX_GAP, ReadBlock
+
+from .loader import PROFILE_GLOB, load_profile, profile_key
+from .schema import DeviceProfile, RegisterDef
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CompiledProfile:
+    """A validated profile plus everything derived from it once."""
+
+    key: str
+    path: Path
+    profile: DeviceProfile
+    by_name: Dict[str, RegisterDef] = field(default_factory=dict)
+    by_address: Dict[Tuple[int, int], RegisterDef] = field(default_factory=dict)  # (function, address)
+    total_words: int = 0
+    plan: List[Tuple[ReadBlock, DecodeLayout]] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, path: Path, profile: DeviceProfile, max_gap: int = DEFAULT_MAX_GAP) -> "CompiledProfile":
+        return cls(
+            key=profile_key(profile),
+            path=path,
+            profile=profile,
+            by_name={r.name: r for r in profile.registers},
+            by_address={(r.function, r.address): r for r in profile.registers},
+            total_words=sum(int(r.words or 1) for r in profile.registers),
+            plan=compile_profile(profile, max_gap=max_gap),
+        )
+
+
+class _DirtyHandler(FileSystemEventHandler):
+    def __init__(self, registry: "ProfileRegistry") -> None:
+        self.registry = registry
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.is_directory:
+            return
+        for p in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if p:
+                self.registry.mark_dirty(Path(p))
+
+
+class ProfileRegistry:
+    """Process-wide cache of compiled profiles.
+
+    Files are re-parsed only when their (mtime, size) changes. With the
+    watchdog observer running, an unchanged directory is not even stat'ed:
+    ``profiles()`` returns the cached dict until an event marks a file dirty.
+    """
+
+    def __init__(self, dir_path: str | Path = "profiles", max_gap: int = DEFAULT_MAX_GAP, watch: bool = True) -> None:
+        self.dir = Path(dir_path)
+        self.max_gap = max_gap
+        self.errors: Dict[Path, str] = {}
+        self._entries: Dict[Path, Tuple[Tuple[int, int], Optional[CompiledProfile]]] = {}
+        self._by_key: Dict[str, CompiledProfile] = {}
+        self._lock = threading.Lock()
+        self._dirty: set[Path] = set()
+        self._full_rescan = True
+        self._observer: Optional[Observer] = None
+        if watch:
+            self._start_watch()
+
+    # ---- watchdog ----
+    def _start_watch(self) -> None:
+        if not self.dir.exists():
+            return
+        try:
+            obs = Observer()
+            obs.schedule(_DirtyHandler(self), str(self.dir), recursive=False)
+            obs.daemon = True
+            obs.start()
+            self._observer = obs
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Profile watcher unavailable, falling back to mtime checks: %s", exc)
+            self._observer = None
+
+    def stop(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+    def mark_dirty(self, path: Optional[Path] = None) -> None:
+        with self._lock:
+            if path is None:
+                self._full_rescan = True
+            elif path.match(PROFILE_GLOB):
+                self._dirty.add(path.resolve())
+
+    # ---- refresh ----
+    def _load(self, path: Path) -> None:
+        try:
+            st = path.stat()
+        except OSError:
+            self._entries.pop(path, None)
+            self.errors.pop(path, None)
+            return
+        sig = (st.st_mtime_ns, st.st_size)
+        cached = self._entries.get(path)
+        if cached is not None and cached[0] == sig:
+            return
+        try:
+            compiled: Optional[CompiledProfile] = CompiledProfile.build(path, load_profile(path), self.max_gap)
+            self.errors.pop(path, None)
+            logger.info("Loaded profile %s from %s", compiled.key, path)
+        except Exception as exc:  # noqa: BLE001
+            compiled = None
+            self.errors[path] = str(exc)
+            logger.error("Failed to load profile %s: %s", path, exc)
+        self._entries[path] = (sig, compiled)
+
+    def refresh(self) -> None:
+        with self._lock:
+            watching = self._observer is not None and self._observer.is_alive()
+            if self._full_rescan or not watching:
+                if not self.dir.exists():
+                    self._entries.clear()
+                    self._by_key = {}
+                    return
+                paths = {p.resolve() for p in self.dir.glob(PROFILE_GLOB)}
+                for gone in set(self._entries) - paths:
+                    self._entries.pop(gone, None)
+                    self.errors.pop(gone, None)
+                self._full_rescan = False
+            else:
+                if not self._dirty:
+                    return
+                paths = set(self._dirty)
+            self._dirty.clear()
+            for path in sorted(paths):
+                self._load(path)
+            by_key: Dict[str, CompiledProfile] = {}
+            for path in sorted(self._entries):
+                compiled = self._entries[path][1]
+                if compiled is not None:
+                    by_key[compiled.key] = compiled
+            self._by_key = by_key
+
+    # ---- access ----
+    def compiled(self) -> Dict[str, CompiledProfile]:
+        self.refresh()
+        return self._by_key
+
+    def profiles(self) -> Dict[str, DeviceProfile]:
+        """Same shape as ``loader.load_profiles()``, served from the cache."""
+        return {k: c.profile for k, c in self.compiled().items()}
+
+    def get(self, key: str) -> Optional[CompiledProfile]:
+        return self.compiled().get(key)
+
+
+_registries: Dict[str, ProfileRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(dir_path: str | Path = "profiles") -> ProfileRegistry:
+    key = str(Path(dir_path).resolve())
+    with _registries_lock:
+        reg = _registries.get(key)
+        if reg is None:
+            reg = _registries[key] = ProfileRegistry(dir_path)
+        return reg
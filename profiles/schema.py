@@ -3,7 +3,7 @@ from __future__ import annotations
 from enum import Enum
 from typing import List, Optional
 
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 
 class Access(str, Enum):
@@ -24,6 +24,12 @@ class Endianness(str, Enum):
     le = "le"  # little endian (word order for 32-bit types)
 
 
+class RecordMode(str, Enum):
+    all = "all"  # every poll
+    change = "change"  # only when the value differs from the last recorded one
+    deadband = "deadband"  # only when it moves by more than the deadband
+
+
 WORDS_BY_TYPE = {
     RegType.u16: 1,
     RegType.i16: 1,
@@ -47,6 +53,11 @@ class RegisterDef(BaseModel):
     maximum: Optional[float] = None
     critical: bool = False
     description: Optional[str] = None
+    record: RecordMode = RecordMode.all
+    deadband: float = Field(0.0, ge=0, description="Absolute deadband, engineering units")
+    deadband_pct: float = Field(0.0, ge=0, description="Deadband in % of the last recorded value")
+    max_silence_s: Optional[float] = Field(None, gt=0, description="Heartbeat: record at least this often")
+    poll_s: Optional[float] = Field(None, gt=0, description="Poll interval; default: the acquisition rate")
 
     @model_validator(mode="after")
     def _set_words_and_validate(self):
@@ -57,9 +68,28 @@ class RegisterDef(BaseModel):
         if self.minimum is not None and self.maximum is not None:
             if self.minimum >= self.maximum:
                 raise ValueError("minimum must be < maximum")
+        if self.record == RecordMode.deadband and not (self.deadband or self.deadband_pct):
+            raise ValueError("record: deadband needs 'deadband' or 'deadband_pct'")
         return self
 
 
+class WriteStep(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    reg: str = Field(..., alias="register", description="RegisterDef name")
+    value: float = Field(..., description="Engineering units (scale applied on encode)")
+
+
+class WriteSequence(BaseModel):
+    """Named multi-register command template (recipe, start/stop command...)."""
+
+    name: str
+    description: Optional[str] = None
+    steps: List[WriteStep]
+    ordered: bool = Field(False, description="Keep the listed order (e.g. a command register written last)")
+    readback: bool = Field(False, description="Read the words back in the same transaction (FC23)")
+
+
 class Metadata(BaseModel):
     brand: str
     model: str
@@ -70,5 +100,22 @@ class Metadata(BaseModel):
 class DeviceProfile(BaseModel):
     meta: Metadata
     registers: List[RegisterDef]
+    sequences: List[WriteSequence] = Field(default_factory=list)
     version: str = "1.0"
 
+    @model_validator(mode="after")
+    def _check_sequences(self):
+        by_name = {r.name: r for r in self.registers}
+        for seq in self.sequences:
+            for step in seq.steps:
+                r = by_name.get(step.reg)
+                if r is None:
+                    raise ValueError(f"sequence {seq.name!r}: unknown register {step.reg!r}")
+                if r.access != Access.RW or r.function != 3:
+                    raise ValueError(f"sequence {seq.name!r}: {r.name!r} is not a writable holding register")
+                if (r.minimum is not None and step.value < r.minimum) or (
+                    r.maximum is not None and step.value > r.maximum
+                ):
+                    raise ValueError(f"sequence {seq.name!r}: {step.value} outside {r.name!r} limits")
+        return self
+
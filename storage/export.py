@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import csv
+import heapq
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Sequence, TextIO, Tuple, Union
+
+from openpyxl import Workbook
+
+from storage.sqlite import DBConfig, SeriesInfo, ShardedDB, list_series
+
+
+logger = logging.getLogger(__name__)
+
+XLSX_MAX_ROWS = 1_048_576
+DEFAULT_CHUNK = 5000
+
+ProgressFn = Callable[[int, int], None]
+# A plain connection, or a sharded store read one shard at a time
+Source = Union[sqlite3.Connection, ShardedDB]
+
+
+@dataclass
+class ExportResult:
+    rows: int = 0
+    cancelled: bool = False
+
+
+@dataclass
+class ExportJob:
+    """Progress/cancellation handle shared between the UI and an export thread."""
+
+    path: Path
+    total: int = 0
+    done: int = 0
+    finished: bool = False
+    error: Optional[str] = None
+    result: Optional[ExportResult] = None
+    cancel: threading.Event = field(default_factory=threading.Event)
+
+    def on_progress(self, done: int, total: int) -> None:
+        self.done, self.total = done, total
+
+
+def _ts_text(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000.0).isoformat(sep=" ", timespec="milliseconds")
+
+
+def _iter_series(
+    conn: sqlite3.Connection, series_id: int, t0_ms: int, t1_ms: int, chunk: int
+) -> Iterator[Tuple[int, int, Optional[float]]]:
+    """Rows of one series in time order, fetched by keyset pages of ``chunk`` rows."""
+    last = t0_ms - 1
+    while True:
+        page = conn.execute(
+            "SELECT ts_ms, value FROM samples WHERE series_id = ? AND ts_ms > ? AND ts_ms < ? ORDER BY ts_ms LIMIT ?",
+            (series_id, last, t1_ms, chunk),
+        ).fetchall()
+        for ts_ms, value in page:
+            yield ts_ms, series_id, value
+        if len(page) < chunk:
+            return
+        last = page[-1][0]
+
+
+def iter_samples(
+    conn: sqlite3.Connection,
+    series_ids: Sequence[int],
+    t0: Optional[float] = None,
+    t1: Optional[float] = None,
+    chunk: int = DEFAULT_CHUNK,
+) -> Iterator[Tuple[int, int, Optional[float]]]:
+    """Yield (ts_ms, series_id, value) across series in global time order.
+
+    Each series is read along its primary key and the streams are k-way
+    merged, so memory holds one page per series and SQLite never sorts.
+    """
+    t0_ms = int(t0 * 1000) if t0 is not None else 0
+    t1_ms = int(t1 * 1000) if t1 is not None else 2**62
+    streams = [_iter_series(conn, sid, t0_ms, t1_ms, chunk) for sid in series_ids]
+    return heapq.merge(*streams, key=lambda row: (row[0], row[1]))
+
+
+def iter_pivoted(
+    rows: Iterator[Tuple[int, int, Optional[float]]], series_ids: Sequence[int]
+) -> Iterator[Tuple[int, List[Optional[float]]]]:
+    """Group time-ordered rows sharing a timestamp into one wide row."""
+    col = {sid: i for i, sid in enumerate(series_ids)}
+    current_ts: Optional[int] = None
+    values: List[Optional[float]] = []
+    for ts_ms, sid, value in rows:
+        if ts_ms != current_ts:
+            if current_ts is not None:
+                yield current_ts, values
+            current_ts = ts_ms
+            values = [None] * len(series_ids)
+        values[col[sid]] = value
+    if current_ts is not None:
+        yield current_ts, values
+
+
+def _connections(src: Source, t0: Optional[float], t1: Optional[float]) -> Iterator[sqlite3.Connection]:
+    if isinstance(src, sqlite3.Connection):
+        yield src
+    else:
+        # shards are disjoint in time: reading them in order keeps the global order
+        yield from src.each_shard(t0, t1)
+
+
+def iter_source(
+    src: Source,
+    series_ids: Sequence[int],
+    t0: Optional[float] = None,
+    t1: Optional[float] = None,
+    chunk: int = DEFAULT_CHUNK,
+) -> Iterator[Tuple[int, int, Optional[float]]]:
+    """``iter_samples`` over a connection or every shard of a sharded store."""
+    for conn in _connections(src, t0, t1):
+        yield from iter_samples(conn, series_ids, t0, t1, chunk)
+
+
+def count_samples(src: Source, series_ids: Sequence[int], t0: Optional[float], t1: Optional[float]) -> int:
+    t0_ms = int(t0 * 1000) if t0 is not None else 0
+    t1_ms = int(t1 * 1000) if t1 is not None else 2**62
+    total = 0
+    for conn in _connections(src, t0, t1):
+        for sid in series_ids:
+            total += conn.execute(
+                "SELECT COUNT(*) FROM samples WHERE series_id = ? AND ts_ms >= ? AND ts_ms < ?", (sid, t0_ms, t1_ms)
+            ).fetchone()[0]
+    return total
+
+
+def _catalog(src: Source) -> sqlite3.Connection:
+    return src if isinstance(src, sqlite3.Connection) else src.conn
+
+
+def _rows(
+    conn: Source,
+    series: Sequence[SeriesInfo],
+    t0: Optional[float],
+    t1: Optional[float],
+    pivot: bool,
+    chunk: int,
+) -> Tuple[List[str], Iterator[Tuple[int, list]]]:
+    """Header and (samples consumed, row) stream for either layout."""
+    ids = [s.id for s in series]
+    merged = iter_source(conn, ids, t0, t1, chunk)
+    if pivot:
+        header = ["timestamp"] + [s.label() for s in series]
+
+        def wide() -> Iterator[Tuple[int, list]]:
+            for ts_ms, values in iter_pivoted(merged, ids):
+                yield sum(v is not None for v in values) or 1, [_ts_text(ts_ms)] + values
+
+        return header, wide()
+    by_id = {s.id: s for s in series}
+    header = ["timestamp", "port", "unit_id", "name", "unit", "value"]
+
+    def long() -> Iterator[Tuple[int, list]]:
+        for ts_ms, sid, value in merged:
+            s = by_id[sid]
+            yield 1, [_ts_text(ts_ms), s.port, s.unit_id, s.name, s.unit, value]
+
+    return header, long()
+
+
+def export_csv(
+    conn: Source,
+    out: TextIO,
+    series: Optional[Sequence[SeriesInfo]] = None,
+    t0: Optional[float] = None,
+    t1: Optional[float] = None,
+    pivot: bool = False,
+    progress: Optional[ProgressFn] = None,
+    cancel: Optional[threading.Event] = None,
+    chunk: int = DEFAULT_CHUNK,
+) -> ExportResult:
+    """Stream samples to ``out`` as CSV; memory use does not depend on history size."""
+    series = list(series) if series is not None else list_series(_catalog(conn))
+    total = count_samples(conn, [s.id for s in series], t0, t1) if progress else 0
+    header, rows = _rows(conn, series, t0, t1, pivot, chunk)
+    writer = csv.writer(out)
+    writer.writerow(header)
+    res = ExportResult()
+    done = 0
+    for consumed, row in rows:
+        writer.writerow(row)
+        res.rows += 1
+        done += consumed
+        if res.rows % chunk == 0:
+            if progress:
+                progress(done, total)
+            if cancel is not None and cancel.is_set():
+                res.cancelled = True
+                break
+    if progress:
+        progress(done, total)
+    return res
+
+
+def export_xlsx(
+    conn: Source,
+    path: str | Path,
+    series: Optional[Sequence[SeriesInfo]] = None,
+    t0: Optional[float] = None,
+    t1: Optional[float] = None,
+    pivot: bool = False,
+    progress: Optional[ProgressFn] = None,
+    cancel: Optional[threading.Event] = None,
+    chunk: int = DEFAULT_CHUNK,
+) -> ExportResult:
+    """Stream samples into an XLSX file using openpyxl's write-only mode.
+
+    Rows beyond the Excel sheet limit continue on a new sheet.
+    """
+    series = list(series) if series is not None else list_series(_catalog(conn))
+    total = count_samples(conn, [s.id for s in series], t0, t1) if progress else 0
+    header, rows = _rows(conn, series, t0, t1, pivot, chunk)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("mesures")
+    ws.append(header)
+    sheet_rows = 1
+    res = ExportResult()
+    done = 0
+    for consumed, row in rows:
+        if sheet_rows >= XLSX_MAX_ROWS:
+            ws = wb.create_sheet(f"mesures_{len(wb.worksheets) + 1}")
+            ws.append(header)
+            sheet_rows = 1
+        ws.append(row)
+        sheet_rows += 1
+        res.rows += 1
+        done += consumed
+        if res.rows % chunk == 0:
+            if progress:
+                progress(done, total)
+            if cancel is not None and cancel.is_set():
+                res.cancelled = True
+                break
+    wb.save(str(path))
+    if progress:
+        progress(done, total)
+    return res
+
+
+def run_export_job(
+    cfg: DBConfig,
+    job: ExportJob,
+    fmt: str,
+    series: Optional[Sequence[SeriesInfo]] = None,
+    t0: Optional[float] = None,
+    t1: Optional[float] = None,
+    pivot: bool = False,
+) -> None:
+    """Thread target: export to ``job.path`` with a private read connection."""
+    conn = ShardedDB(cfg)
+    try:
+        job.path.parent.mkdir(parents=True, exist_ok=True)
+        if fmt == "xlsx":
+            job.result = export_xlsx(conn, job.path, series, t0, t1, pivot, job.on_progress, job.cancel)
+        else:
+            with open(job.path, "w", newline="", encoding="utf-8") as fh:
+                job.result = export_csv(conn, fh, series, t0, t1, pivot, job.on_progress, job.cancel)
+        logger.info("Export %s: %d row(s)%s", job.path, job.result.rows, " (cancelled)" if job.result.cancelled else "")
+    except Exception as exc:  # noqa: BLE001
+        job.error = str(exc)
+        logger.exception("Export to %s failed: %s", job.path, exc)
+    finally:
+        conn.close()
+        job.finished = True
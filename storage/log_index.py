@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Matches the record header written by logging_setup.setup_logging:
+# "2024-01-31 12:00:00 | INFO | core.modbus_client | message"
+RECORD_RE = re.compile(rb"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) \| ([A-Z]+) \| ([^|\r\n]*?) \| ", re.MULTILINE)
+
+LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+LEVEL_CODES = {name: i + 1 for i, name in enumerate(LEVELS)}  # 0 = unknown
+
+CHUNK_BYTES = 1 << 20
+
+
+@dataclass
+class LogRecord:
+    ts: float
+    level: str
+    logger: str
+    text: str
+    file: str
+
+
+@dataclass
+class FileIndex:
+    """Record start offsets of one log file and per-record ts/level/logger."""
+
+    key: Tuple[int, int]
+    indexed_size: int = 0
+    offsets: array = field(default_factory=lambda: array("Q"))
+    times: array = field(default_factory=lambda: array("I"))
+    levels: array = field(default_factory=lambda: array("B"))
+    loggers: array = field(default_factory=lambda: array("H"))
+
+
+def _file_key(path: Path, st: os.stat_result) -> Tuple[int, int]:
+    """Identity that survives the rename done by RotatingFileHandler."""
+    if st.st_ino:
+        return (st.st_dev, st.st_ino)
+    with open(path, "rb") as fh:  # filesystems without inode numbers
+        return (0, hash(fh.read(64)))
+
+
+class LogIndex:
+    """Incremental byte-offset index over ``app.log`` and its ``.1..N`` backups.
+
+    Only bytes appended since the last ``refresh`` are scanned; rotated files
+    keep their index because they are matched by file identity, not by name.
+    Record text is read with ``seek`` on demand, so paging, tail and time seek
+    never read whole files.
+    """
+
+    def __init__(self, log_path: str | Path = "logs/app.log", backup_count: int = 3) -> None:
+        self.log_path = Path(log_path)
+        self.backup_count = backup_count
+        self.logger_names: List[str] = []
+        self._logger_ids: Dict[str, int] = {}
+        self._by_key: Dict[Tuple[int, int], FileIndex] = {}
+        self._files: List[Tuple[Path, FileIndex]] = []  # oldest first
+        self._starts: List[int] = []  # global index of each file's first record
+        self._total = 0
+        self._layout: List[Tuple[Tuple[int, int], int]] = []  # (file key, records) at the last refresh
+        self._ts_cache: Dict[bytes, int] = {}
+        # filter -> (records scanned so far, matching global indexes); extended as the log grows
+        self._match_cache: Dict[tuple, Tuple[int, List[int]]] = {}
+        self._lock = threading.Lock()
+
+    # ---- indexing ----
+    def _logger_id(self, name: str) -> int:
+        lid = self._logger_ids.get(name)
+        if lid is None:
+            lid = len(self.logger_names)
+            self.logger_names.append(name)
+            self._logger_ids[name] = lid
+        return lid
+
+    def _epoch(self, stamp: bytes) -> int:
+        ts = self._ts_cache.get(stamp)
+        if ts is None:
+            if len(self._ts_cache) > 4096:
+                self._ts_cache.clear()
+            ts = int(time.mktime(time.strptime(stamp.decode("ascii"), "%Y-%m-%d %H:%M:%S")))
+            self._ts_cache[stamp] = ts
+        return ts
+
+    def _scan(self, path: Path, idx: FileIndex, size: int) -> None:
+        with open(path, "rb") as fh:
+            fh.seek(idx.indexed_size)
+            pos = idx.indexed_size
+            carry = b""
+            while pos < size:
+                chunk = fh.read(min(CHUNK_BYTES, size - pos))
+                if not chunk:
+                    break
+                pos += len(chunk)
+                data = carry + chunk
+                base = pos - len(data)
+                # only complete lines; a partial last line is rescanned next time
+                cut = data.rfind(b"\n") + 1
+                if cut == 0:
+                    carry = data
+                    continue
+                carry = data[cut:]
+                for m in RECORD_RE.finditer(data, 0, cut):
+                    idx.offsets.append(base + m.start())
+                    idx.times.append(self._epoch(m.group(1)))
+                    idx.levels.append(LEVEL_CODES.get(m.group(2).decode("ascii", "replace"), 0))
+                    idx.loggers.append(self._logger_id(m.group(3).decode("utf-8", "replace")))
+            idx.indexed_size = pos - len(carry)
+
+    def refresh(self) -> None:
+        """Pick up appended bytes and rotations; cheap when nothing changed."""
+        with self._lock:
+            paths = [self.log_path.with_name(f"{self.log_path.name}.{i}") for i in range(self.backup_count, 0, -1)]
+            paths.append(self.log_path)
+            files: List[Tuple[Path, FileIndex]] = []
+            by_key: Dict[Tuple[int, int], FileIndex] = {}
+            for path in paths:
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                key = _file_key(path, st)
+                idx = self._by_key.get(key)
+                if idx is None or st.st_size < idx.indexed_size:
+                    idx = FileIndex(key=key)
+                if st.st_size > idx.indexed_size:
+                    self._scan(path, idx, st.st_size)
+                by_key[key] = idx
+                files.append((path, idx))
+            # Appends only grow the current file; anything else (rotation, truncation, a backup
+            # dropped) renumbers the global indexes, so the cached selections start over.
+            old, new = self._layout, [(idx.key, len(idx.offsets)) for _, idx in files]
+            appended = (
+                [k for k, _ in old] == [k for k, _ in new] and old[:-1] == new[:-1] and (not old or new[-1] >= old[-1])
+            )
+            if not appended:
+                self._match_cache.clear()
+            self._layout = new
+            self._by_key = by_key
+            self._files = files
+            self._starts = []
+            total = 0
+            for _, idx in files:
+                self._starts.append(total)
+                total += len(idx.offsets)
+            self._total = total
+
+    def __len__(self) -> int:
+        return self._total
+
+    # ---- lookup ----
+    def _locate(self, i: int) -> Tuple[int, int]:
+        """Global record index -> (file number, record number in file)."""
+        f = bisect_left(self._starts, i + 1) - 1
+        return f, i - self._starts[f]
+
+    def matching(self, levels: Optional[Iterable[str]] = None, logger_prefix: str = "") -> Optional[List[int]]:
+        """Global indexes of records passing the filters; ``None`` means all.
+
+        The result of each filter is kept and only records added since the
+        previous call are scanned, so following a growing log stays cheap.
+        """
+        level_set = {LEVEL_CODES[lv] for lv in levels} if levels is not None else None
+        if level_set is None and not logger_prefix:
+            return None
+        cache_key = (None if level_set is None else frozenset(level_set), logger_prefix)
+        with self._lock:
+            scanned, out = self._match_cache.get(cache_key, (0, []))
+            if scanned == self._total:
+                return out
+            logger_set = None
+            if logger_prefix:
+                logger_set = {i for i, n in enumerate(self.logger_names) if n.startswith(logger_prefix)}
+            for start, (_, idx) in zip(self._starts, self._files):
+                n = len(idx.offsets)
+                if start + n <= scanned:
+                    continue
+                lv, lg = idx.levels, idx.loggers
+                # appending in place keeps earlier slices handed to callers valid
+                out.extend(
+                    start + j
+                    for j in range(max(0, scanned - start), n)
+                    if (level_set is None or lv[j] in level_set) and (logger_set is None or lg[j] in logger_set)
+                )
+            self._match_cache[cache_key] = (self._total, out)
+            return out
+
+    def seek_time(self, ts: float) -> int:
+        """Global index of the first record at or after ``ts``."""
+        for start, (_, idx) in zip(self._starts, self._files):
+            if idx.times and idx.times[-1] >= ts:
+                return start + bisect_left(idx.times, ts)
+        return len(self)
+
+    def read(self, indexes: Sequence[int]) -> List[LogRecord]:
+        """Read the given records (sorted global indexes) with one seek each."""
+        out: List[LogRecord] = []
+        handles: Dict[int, object] = {}
+        try:
+            for i in indexes:
+                f, j = self._locate(i)
+                path, idx = self._files[f]
+                fh = handles.get(f)
+                if fh is None:
+                    fh = handles[f] = open(path, "rb")
+                start = idx.offsets[j]
+                end = idx.offsets[j + 1] if j + 1 < len(idx.offsets) else idx.indexed_size
+                fh.seek(start)  # type: ignore[attr-defined]
+                text = fh.read(end - start).decode("utf-8", errors="replace").rstrip("\r\n")  # type: ignore[attr-defined]
+                lv = idx.levels[j]
+                out.append(
+                    LogRecord(
+                        ts=float(idx.times[j]),
+                        level=LEVELS[lv - 1] if lv else "?",
+                        logger=self.logger_names[idx.loggers[j]],
+                        text=text,
+                        file=path.name,
+                    )
+                )
+        finally:
+            for fh in handles.values():
+                fh.close()  # type: ignore[attr-defined]
+        return out
+
+    def _selection(
+        self, levels: Optional[Iterable[str]], logger_prefix: str, since: Optional[float]
+    ) -> Tuple[int, Optional[List[int]]]:
+        """(first global index, filtered indexes or ``None`` for a plain range)."""
+        selected = self.matching(levels, logger_prefix)
+        first = self.seek_time(since) if since is not None else 0
+        if selected is not None:
+            selected = selected[bisect_left(selected, first) :]
+        return first, selected
+
+    def pages(
+        self,
+        page_size: int = 200,
+        levels: Optional[Iterable[str]] = None,
+        logger_prefix: str = "",
+        since: Optional[float] = None,
+    ) -> int:
+        first, selected = self._selection(levels, logger_prefix, since)
+        n = len(self) - first if selected is None else len(selected)
+        return max(1, -(-n // page_size))
+
+    def page(
+        self,
+        page_no: int,
+        page_size: int = 200,
+        levels: Optional[Iterable[str]] = None,
+        logger_prefix: str = "",
+        since: Optional[float] = None,
+    ) -> Tuple[List[LogRecord], int]:
+        """One page of filtered records and the number of pages.
+
+        ``page_no`` < 0 counts from the end (``-1`` is the tail).
+        """
+        first, selected = self._selection(levels, logger_prefix, since)
+        n = len(self) - first if selected is None else len(selected)
+        pages = max(1, -(-n // page_size))
+        if page_no < 0:
+            page_no += pages
+        page_no = min(max(page_no, 0), pages - 1)
+        a, b = page_no * page_size, min(n, (page_no + 1) * page_size)
+        picked = range(first + a, first + b) if selected is None else selected[a:b]
+        return self.read(picked), pages
+
+    def tail(self, count: int = 200, levels: Optional[Iterable[str]] = None, logger_prefix: str = "") -> List[LogRecord]:
+        """The last ``count`` records passing the filters."""
+        selected = self.matching(levels, logger_prefix)
+        if selected is None:
+            return self.read(range(max(0, len(self) - count), len(self)))
+        return self.read(selected[-count:])
+
+
+_indexes: Dict[str, LogIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_log_index(log_path: str | Path = "logs/app.log", backup_count: int = 3) -> LogIndex:
+    """Process-wide index for ``log_path``, refreshed on every call."""
+    key = str(Path(log_path).resolve())
+    with _indexes_lock:
+        idx = _indexes.get(key)
+        if idx is None:
+            idx = _indexes[key] = LogIndex(log_path, backup_count)
+    idx.refresh()
+    return idx
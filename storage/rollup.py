@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+# (bucket width in seconds, table); finest first
+ROLLUP_LEVELS: List[Tuple[int, str]] = [
+    (1, "rollup_1s"),
+    (60, "rollup_1m"),
+    (3600, "rollup_1h"),
+]
+
+# Levels stored next to the samples in each time shard; coarser ones are
+# small enough to stay in the main (catalog) database.
+SHARD_STEPS = frozenset({1})
+
+
+def _schema_of(step: int, shard: str) -> str:
+    return shard if step in SHARD_STEPS else "main"
+
+
+def ensure_rollups(conn: sqlite3.Connection, schema: str = "main", shard_only: bool = False) -> None:
+    for step, table in ROLLUP_LEVELS:
+        if shard_only and step not in SHARD_STEPS:
+            continue
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {schema}.{table} (
+                series_id INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                vmin REAL NOT NULL,
+                vmax REAL NOT NULL,
+                vsum REAL NOT NULL,
+                n INTEGER NOT NULL,
+                PRIMARY KEY (series_id, bucket)
+            ) WITHOUT ROWID;
+            """
+        )
+    conn.commit()
+
+
+def drop_rollups(conn: sqlite3.Connection) -> None:
+    for _, table in ROLLUP_LEVELS:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def rebuild_rollups(conn: sqlite3.Connection) -> None:
+    """Recompute every rollup level from ``samples`` (migrations, repairs)."""
+    for step, table in ROLLUP_LEVELS:
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(
+            f"""
+            INSERT INTO {table} (series_id, bucket, vmin, vmax, vsum, n)
+            SELECT series_id, (ts_ms / {step * 1000}) * {step}, MIN(value), MAX(value), SUM(value), COUNT(value)
+            FROM samples WHERE value IS NOT NULL
+            GROUP BY series_id, ts_ms / {step * 1000}
+            """
+        )
+
+
+def update_rollups(
+    conn: sqlite3.Connection, rows: Iterable[Tuple[int, int, Optional[float]]], shard: str = "main"
+) -> None:
+    """Fold new (series_id, ts_ms, value) rows into every rollup level.
+
+    Rows are pre-aggregated in memory so each level costs one upsert per
+    touched bucket, not per sample. Call inside the insert transaction;
+    ``shard`` is the schema holding the ``SHARD_STEPS`` levels.
+    """
+    rows = [r for r in rows if r[2] is not None]
+    if not rows:
+        return
+    for step, table in ROLLUP_LEVELS:
+        step_ms = step * 1000
+        agg: Dict[Tuple[int, int], List[float]] = {}
+        for series_id, ts_ms, value in rows:
+            k = (series_id, (ts_ms // step_ms) * step)
+            a = agg.get(k)
+            if a is None:
+                agg[k] = [value, value, value, 1]
+            else:
+                if value < a[0]:
+                    a[0] = value
+                if value > a[1]:
+                    a[1] = value
+                a[2] += value
+                a[3] += 1
+        conn.executemany(
+            f"""
+            INSERT INTO {_schema_of(step, shard)}.{table} (series_id, bucket, vmin, vmax, vsum, n)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (series_id, bucket) DO UPDATE SET
+                vmin = min(vmin, excluded.vmin),
+                vmax = max(vmax, excluded.vmax),
+                vsum = vsum + excluded.vsum,
+                n = n + excluded.n
+            """,
+            [(k[0], k[1], a[0], a[1], a[2], int(a[3])) for k, a in agg.items()],
+        )
+
+
+@dataclass
+class Series:
+    """Downsampled series: one point per bucket with min/max/avg."""
+
+    source: str
+    bucket_s: float
+    ts: List[float] = field(default_factory=list)
+    vmin: List[float] = field(default_factory=list)
+    vmax: List[float] = field(default_factory=list)
+    vavg: List[float] = field(default_factory=list)
+    n: List[int] = field(default_factory=list)
+
+
+def pick_level(t0: float, t1: float, max_points: int) -> Tuple[float, Optional[Tuple[int, str]]]:
+    """Bucket width for the window and the coarsest rollup level that fits in it."""
+    bucket_s = max((t1 - t0) / max(max_points, 1), 1e-6)
+    level = None
+    for step, table in ROLLUP_LEVELS:
+        if step <= bucket_s:
+            level = (step, table)
+    return bucket_s, level
+
+
+def query_series(
+    conn: sqlite3.Connection,
+    series_id: int,
+    t0: float,
+    t1: float,
+    max_points: int = 1000,
+) -> Series:
+    """Min/max/avg per bucket over [t0, t1) with at most ``max_points`` buckets.
+
+    Windows wider than ``max_points`` seconds only read rollup tables, so the
+    cost depends on the number of buckets, not on the raw history size.
+    """
+    bucket_s, level = pick_level(t0, t1, max_points)
+    if level is None:
+        source = "samples"
+        sql = """
+            SELECT CAST((ts_ms / 1000.0 - :t0) / :b AS INTEGER) AS k, MIN(value), MAX(value), AVG(value), COUNT(value)
+            FROM samples
+            WHERE series_id = :sid AND ts_ms >= :t0_ms AND ts_ms < :t1_ms AND value IS NOT NULL
+            GROUP BY k ORDER BY k
+        """
+    else:
+        source = level[1]
+        sql = f"""
+            SELECT CAST((bucket - :t0) / :b AS INTEGER) AS k, MIN(vmin), MAX(vmax), SUM(vsum) / SUM(n), SUM(n)
+            FROM {level[1]}
+            WHERE series_id = :sid AND bucket >= :t0 - {level[0]} AND bucket < :t1
+            GROUP BY k ORDER BY k
+        """
+    out = Series(source=source, bucket_s=bucket_s)
+    params = {
+        "t0": t0,
+        "t1": t1,
+        "t0_ms": int(t0 * 1000),
+        "t1_ms": int(t1 * 1000),
+        "b": bucket_s,
+        "sid": series_id,
+    }
+    for k, vmin, vmax, vavg, n in conn.execute(sql, params):
+        out.ts.append(t0 + max(k, 0) * bucket_s)
+        out.vmin.append(vmin)
+        out.vmax.append(vmax)
+        out.vavg.append(vavg)
+        out.n.append(n)
+    return out
+
+
+def merge_series(parts: List[Series]) -> Series:
+    """Combine ``query_series`` results over disjoint sets of rows (shard batches) with the same window."""
+    if len(parts) == 1:
+        return parts[0]
+    acc: Dict[float, List[float]] = {}  # ts -> [vmin, vmax, vsum, n]
+    for part in parts:
+        for ts, vmin, vmax, vavg, n in zip(part.ts, part.vmin, part.vmax, part.vavg, part.n):
+            a = acc.get(ts)
+            if a is None:
+                acc[ts] = [vmin, vmax, vavg * n, n]
+            else:
+                a[0], a[1], a[2], a[3] = min(a[0], vmin), max(a[1], vmax), a[2] + vavg * n, a[3] + n
+    out = Series(source=parts[0].source, bucket_s=parts[0].bucket_s)
+    for ts in sorted(acc):
+        vmin, vmax, vsum, n = acc[ts]
+        out.ts.append(ts)
+        out.vmin.append(vmin)
+        out.vmax.append(vmax)
+        out.vavg.append(vsum / n)
+        out.n.append(int(n))
+    return out
+
+
+@dataclass
+class Steps:
+    """Step-held series: each value holds until the next point; None is a gap."""
+
+    ts: List[float] = field(default_factory=list)
+    values: List[Optional[float]] = field(default_factory=list)
+
+
+def query_steps(
+    conn: sqlite3.Connection,
+    series_id: int,
+    t0: float,
+    t1: float,
+    hold_until: Optional[float] = None,
+    held: bool = True,
+) -> Steps:
+    """Raw points of [t0, t1) plus the value held at ``t0``.
+
+    Meant for change-only/deadband series, where a missing row means "same
+    value as before", not "no data". The held value entering the window is
+    the last row before ``t0``, looked up in the attached data and in the
+    per-shard last rows of ``series_last`` (shards not attached); with
+    ``hold_until`` the last value is also repeated at that time so the final
+    step is drawn. ``held=False`` skips the held value (later shard batches).
+    """
+    out = Steps()
+    t0_ms, t1_ms = int(t0 * 1000), int(t1 * 1000)
+    if held:
+        candidates = [
+            conn.execute(
+                f"SELECT ts_ms, value FROM {table} WHERE series_id = ? AND ts_ms < ? ORDER BY ts_ms DESC LIMIT 1",
+                (series_id, t0_ms),
+            ).fetchone()
+            for table in ("samples", "main.series_last")
+        ]
+        prev = max((c for c in candidates if c is not None), key=lambda c: c[0], default=None)
+        if prev is not None and prev[1] is not None:
+            out.ts.append(t0)
+            out.values.append(prev[1])
+    for ts_ms, value in conn.execute(
+        "SELECT ts_ms, value FROM samples WHERE series_id = ? AND ts_ms >= ? AND ts_ms < ? ORDER BY ts_ms",
+        (series_id, t0_ms, t1_ms),
+    ):
+        out.ts.append(ts_ms / 1000.0)
+        out.values.append(value)
+    if hold_until is not None:
+        hold_last(out, hold_until)
+    return out
+
+
+def hold_last(steps: Steps, until: float) -> None:
+    """Repeat the last value at ``until`` so the final step is drawn."""
+    if steps.values and steps.values[-1] is not None and steps.ts[-1] < until:
+        steps.ts.append(until)
+        steps.values.append(steps.values[-1])
@@ -1,10 +1,31 @@
 from __future__ import annotations
 
 import logging
+import os
 import sqlite3
+import threading
+import time
+from collections import deque
 from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from storage.rollup import (
+    ROLLUP_LEVELS,
+    SHARD_STEPS,
+    Series,
+    Steps,
+    drop_rollups,
+    ensure_rollups,
+    hold_last,
+    merge_series,
+    pick_level,
+    query_series,
+    query_steps,
+    rebuild_rollups,
+    update_rollups,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -13,30 +34,717 @@ logger = logging.getLogger(__name__)
 @dataclass
 class DBConfig:
     path: str = "storage/data.sqlite"
+    synchronous: str = "NORMAL"  # WAL + NORMAL: durable across app crashes, fsync only at checkpoints
+    cache_kib: int = 16384
+    batch_size: int = 500
+    flush_interval_s: float = 1.0
+    max_pending: int = 500_000  # rows waiting to be written; the oldest are dropped beyond
+    shard: str = "day"  # day | session | none (single file)
+    retention_days: float = 0.0  # delete shards older than this; 0 = keep everything
+
+    @classmethod
+    def from_dict(cls, cfg: Optional[dict]) -> "DBConfig":
+        cfg = cfg or {}
+        return cls(
+            path=str(cfg.get("path", cls.path)),
+            synchronous=str(cfg.get("synchronous", cls.synchronous)),
+            cache_kib=int(cfg.get("cache_kib", cls.cache_kib)),
+            batch_size=int(cfg.get("batch_size", cls.batch_size)),
+            flush_interval_s=float(cfg.get("flush_interval_s", cls.flush_interval_s)),
+            max_pending=max(1, int(cfg.get("max_pending", cls.max_pending))),
+            shard=str(cfg.get("shard", cls.shard)),
+            retention_days=float(cfg.get("retention_days", cls.retention_days) or 0),
+        )
+
+
+SCHEMA_VERSION = 2
+
+# (ts, port, unit_id, name, unit, value) as produced by the acquisition
+MeasurementRow = Tuple[float, str, int, str, str, Optional[float]]
+
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone() is not None
+
+
+def _create_samples(conn: sqlite3.Connection, schema: str = "main") -> None:
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {schema}.samples (
+            series_id INTEGER NOT NULL,
+            ts_ms INTEGER NOT NULL,
+            value REAL,
+            PRIMARY KEY (series_id, ts_ms)
+        ) WITHOUT ROWID;
+        """
+    )
 
 
 def ensure_db(cfg: DBConfig) -> sqlite3.Connection:
     Path(cfg.path).parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(cfg.path, check_same_thread=False)
+    # Only takes effect on a new file (before the first table is created)
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={cfg.synchronous}")
+    conn.execute(f"PRAGMA cache_size=-{int(cfg.cache_kib)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
     conn.execute(
         """
-        CREATE TABLE IF NOT EXISTS measurements (
-            ts REAL NOT NULL,
+        CREATE TABLE IF NOT EXISTS series (
+            id INTEGER PRIMARY KEY,
+            port TEXT NOT NULL DEFAULT '',
             unit_id INTEGER NOT NULL,
             name TEXT NOT NULL,
-            value REAL,
-            PRIMARY KEY (ts, unit_id, name)
+            unit TEXT NOT NULL DEFAULT '',
+            UNIQUE (port, unit_id, name, unit)
         );
         """
     )
+    _create_samples(conn)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS shards (
+            name TEXT PRIMARY KEY,
+            t0_ms INTEGER NOT NULL,
+            t1_ms INTEGER NOT NULL
+        );
+        """
+    )
+    # Last row of every series in every shard: the value held when a window
+    # opens may have been written many shards earlier (change-only series)
+    backfill = not _table_exists(conn, "series_last")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS series_last (
+            series_id INTEGER NOT NULL,
+            shard TEXT NOT NULL,
+            ts_ms INTEGER NOT NULL,
+            value REAL,
+            PRIMARY KEY (series_id, shard)
+        ) WITHOUT ROWID;
+        """
+    )
     conn.commit()
+    if backfill:
+        _backfill_series_last(conn, cfg)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < SCHEMA_VERSION:
+        _migrate(conn)
+    ensure_rollups(conn)
     return conn
 
 
-def insert_measurement(conn: sqlite3.Connection, ts: float, unit_id: int, name: str, value: float) -> None:
-    conn.execute(
-        "INSERT OR REPLACE INTO measurements (ts, unit_id, name, value) VALUES (?, ?, ?, ?)",
-        (ts, unit_id, name, value),
-    )
-    conn.commit()
+def _backfill_series_last(conn: sqlite3.Connection, cfg: DBConfig) -> None:
+    """Fill ``series_last`` from shards written before it existed."""
+    for (name,) in conn.execute("SELECT name FROM main.shards").fetchall():
+        if not shard_path(cfg, name).exists():
+            continue
+        attach_shard(conn, cfg, name, "backfill")
+        try:
+            with conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO main.series_last (series_id, shard, ts_ms, value)
+                    SELECT s.series_id, ?, s.ts_ms, s.value FROM backfill.samples s
+                    JOIN (SELECT series_id, MAX(ts_ms) AS ts_ms FROM backfill.samples GROUP BY series_id) m
+                    ON m.series_id = s.series_id AND m.ts_ms = s.ts_ms
+                    """,
+                    (name,),
+                )
+        finally:
+            conn.execute("DETACH DATABASE backfill")
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Move the legacy ``measurements`` (ts, unit_id, name, value) table to series/samples."""
+    legacy = _table_exists(conn, "measurements")
+    with conn:
+        # Rollups from before the series dictionary were keyed by (unit_id, name)
+        drop_rollups(conn)
+        ensure_rollups(conn)
+        if legacy:
+            logger.info("Migrating legacy measurements table to series/samples")
+            conn.execute(
+                "INSERT OR IGNORE INTO series (port, unit_id, name, unit) "
+                "SELECT DISTINCT '', unit_id, name, '' FROM measurements"
+            )
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO samples (series_id, ts_ms, value)
+                SELECT s.id, CAST(ROUND(m.ts * 1000) AS INTEGER), m.value
+                FROM measurements m JOIN series s ON s.port = '' AND s.unit = '' AND s.unit_id = m.unit_id AND s.name = m.name
+                """
+            )
+            conn.execute("DROP TABLE measurements")
+        rebuild_rollups(conn)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    if legacy:
+        conn.execute("VACUUM")
+
+
+class SeriesCatalog:
+    """In-memory cache of the ``series`` dictionary for one connection."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+        self._ids: Dict[Tuple[str, int, str, str], int] = {}
+
+    def series_id(self, port: str, unit_id: int, name: str, unit: str = "") -> int:
+        key = (port or "", int(unit_id), name, unit or "")
+        sid = self._ids.get(key)
+        if sid is None:
+            self.conn.execute("INSERT OR IGNORE INTO series (port, unit_id, name, unit) VALUES (?, ?, ?, ?)", key)
+            sid = self.conn.execute(
+                "SELECT id FROM series WHERE port = ? AND unit_id = ? AND name = ? AND unit = ?", key
+            ).fetchone()[0]
+            self._ids[key] = sid
+        return sid
+
+    def reset(self) -> None:
+        """Forget cached ids (after a rolled-back transaction)."""
+        self._ids.clear()
+
+
+@dataclass
+class SeriesInfo:
+    id: int
+    port: str
+    unit_id: int
+    name: str
+    unit: str
+
+    def label(self) -> str:
+        prefix = f"{self.port} " if self.port else ""
+        suffix = f" [{self.unit}]" if self.unit else ""
+        return f"{prefix}unité {self.unit_id} · {self.name}{suffix}"
+
+
+def list_series(conn: sqlite3.Connection) -> List[SeriesInfo]:
+    return [
+        SeriesInfo(*row)
+        for row in conn.execute("SELECT id, port, unit_id, name, unit FROM series ORDER BY port, unit_id, name")
+    ]
+
+
+def insert_samples(
+    conn: sqlite3.Connection, rows: Iterable[Tuple[int, int, Optional[float]]], shard: str = "main"
+) -> int:
+    """Insert (series_id, ts_ms, value) rows and update rollups; caller owns the transaction."""
+    rows = list(rows)
+    cur = conn.executemany(f"INSERT OR REPLACE INTO {shard}.samples (series_id, ts_ms, value) VALUES (?, ?, ?)", rows)
+    update_rollups(conn, rows, shard)
+    return cur.rowcount
+
+
+def insert_measurement(
+    conn: sqlite3.Connection,
+    ts: float,
+    unit_id: int,
+    name: str,
+    value: float,
+    port: str = "",
+    unit: str = "",
+) -> None:
+    insert_measurements(conn, [(ts, port, unit_id, name, unit, value)])
+
+
+def insert_measurements(
+    conn: sqlite3.Connection,
+    rows: Iterable[MeasurementRow],
+    catalog: Optional[SeriesCatalog] = None,
+    shard: str = "main",
+    shard_name: Optional[str] = None,
+) -> int:
+    """Insert many measurement rows in a single transaction.
+
+    Rollup tables are updated in the same transaction. ``shard`` is the
+    schema the rows go to; ``shard_name`` also extends its time range in
+    the shard index and records each series' last row in ``series_last``.
+    """
+    catalog = catalog or SeriesCatalog(conn)
+    samples = [
+        (catalog.series_id(port, unit_id, name, unit), int(round(ts * 1000)), value)
+        for ts, port, unit_id, name, unit, value in rows
+    ]
+    with conn:
+        n = insert_samples(conn, samples, shard)
+        if shard_name and samples:
+            ts_ms = [s[1] for s in samples]
+            conn.execute(
+                "INSERT INTO main.shards (name, t0_ms, t1_ms) VALUES (?, ?, ?) ON CONFLICT (name) DO UPDATE SET "
+                "t0_ms = min(t0_ms, excluded.t0_ms), t1_ms = max(t1_ms, excluded.t1_ms)",
+                (shard_name, min(ts_ms), max(ts_ms)),
+            )
+            last: Dict[int, Tuple[int, Optional[float]]] = {}
+            for sid, t, value in samples:
+                if sid not in last or t >= last[sid][0]:
+                    last[sid] = (t, value)
+            conn.executemany(
+                "INSERT INTO main.series_last (series_id, shard, ts_ms, value) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (series_id, shard) DO UPDATE SET ts_ms = excluded.ts_ms, value = excluded.value "
+                "WHERE excluded.ts_ms >= series_last.ts_ms",
+                [(sid, shard_name, t, value) for sid, (t, value) in last.items()],
+            )
+        return n
+
+
+# ---- time shards ----
+# Attached databases per connection; SQLite's default limit is 10
+MAX_ATTACHED = 9
+RETENTION_CHECK_S = 3600.0
+FLUSH_RETRY_S = 0.5  # first retry delay after a failed flush, doubled up to FLUSH_RETRY_MAX_S
+FLUSH_RETRY_MAX_S = 30.0
+
+
+@dataclass
+class ShardInfo:
+    name: str
+    t0_ms: int
+    t1_ms: int
+    path: Path
+
+
+def shard_path(cfg: DBConfig, name: str) -> Path:
+    """``storage/data.sqlite`` -> ``storage/data-20261018.sqlite``."""
+    main = Path(cfg.path)
+    return main.with_name(f"{main.stem}-{name}{main.suffix}")
+
+
+def _day_bounds(ts: float) -> Tuple[str, float, float]:
+    """Shard name and [start, end) of the local calendar day holding ``ts``."""
+    day = date.fromtimestamp(ts)
+    start = datetime.combine(day, datetime.min.time()).timestamp()
+    end = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+    return day.strftime("%Y%m%d"), start, end
+
+
+def attach_shard(conn: sqlite3.Connection, cfg: DBConfig, name: str, schema: str, create: bool = False) -> None:
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(shard_path(cfg, name)),))
+    if create:
+        conn.execute(f"PRAGMA {schema}.auto_vacuum=INCREMENTAL")
+        conn.execute(f"PRAGMA {schema}.journal_mode=WAL")
+        _create_samples(conn, schema)
+        ensure_rollups(conn, schema, shard_only=True)
+        conn.commit()
+
+
+def list_shards(
+    conn: sqlite3.Connection, cfg: DBConfig, t0: Optional[float] = None, t1: Optional[float] = None
+) -> List[ShardInfo]:
+    """Shards holding data in [t0, t1), oldest first."""
+    t0_ms = int(t0 * 1000) if t0 is not None else 0
+    t1_ms = int(t1 * 1000) if t1 is not None else 2**62
+    return [
+        ShardInfo(name, a, b, shard_path(cfg, name))
+        for name, a, b in conn.execute(
+            "SELECT name, t0_ms, t1_ms FROM main.shards WHERE t1_ms >= ? AND t0_ms < ? ORDER BY t0_ms", (t0_ms, t1_ms)
+        )
+    ]
+
+
+class ShardRouter:
+    """Writer side: sends rows to the shard of their local day (or of this session).
+
+    The shard being written is kept attached as schema ``shard``; a shard
+    file is created on its first row, with incremental auto-vacuum.
+    """
+
+    SCHEMA = "shard"
+
+    def __init__(self, conn: sqlite3.Connection, cfg: DBConfig) -> None:
+        self.conn = conn
+        self.cfg = cfg
+        self.current: Optional[str] = None
+        self._session = datetime.now().strftime("%Y%m%d-%H%M%S") if cfg.shard == "session" else None
+        self._day = ""
+        self._lo = self._hi = 0.0
+
+    def name_for(self, ts: float) -> Optional[str]:
+        if self.cfg.shard == "none":
+            return None
+        if self._session is not None:
+            return self._session
+        if not self._lo <= ts < self._hi:
+            self._day, self._lo, self._hi = _day_bounds(ts)
+        return self._day
+
+    def split(self, rows: Iterable[MeasurementRow]) -> List[Tuple[Optional[str], List[MeasurementRow]]]:
+        """Consecutive runs of rows sharing a shard."""
+        groups: List[Tuple[Optional[str], List[MeasurementRow]]] = []
+        for row in rows:
+            name = self.name_for(row[0])
+            if not groups or groups[-1][0] != name:
+                groups.append((name, []))
+            groups[-1][1].append(row)
+        return groups
+
+    def schema(self, name: Optional[str]) -> str:
+        if name is None:
+            return "main"
+        if name != self.current:
+            self.close()
+            attach_shard(self.conn, self.cfg, name, self.SCHEMA, create=True)
+            self.current = name
+        return self.SCHEMA
+
+    def insert(self, rows: List[MeasurementRow], catalog: SeriesCatalog) -> int:
+        """Insert ``rows``, one transaction per shard group; returns how many were committed.
+
+        On ``sqlite3.Error`` the exception carries ``committed``: the groups
+        before the failing one are already written (with their rollups), so
+        only ``rows[committed:]`` may be retried.
+        """
+        n = 0
+        for name, group in self.split(rows):
+            try:
+                insert_measurements(self.conn, group, catalog, self.schema(name), name)
+            except sqlite3.Error as exc:
+                exc.committed = n  # type: ignore[attr-defined]
+                raise
+            n += len(group)
+        return n
+
+    def close(self) -> None:
+        if self.current is not None:
+            self.conn.execute(f"DETACH DATABASE {self.SCHEMA}")
+            self.current = None
+
+
+def apply_retention(
+    conn: sqlite3.Connection, cfg: DBConfig, now: Optional[float] = None, keep: Iterable[str] = ()
+) -> List[str]:
+    """Delete whole shard files older than ``retention_days``; returns their names.
+
+    Coarse rollups in the main file are trimmed to the same horizon and the
+    freed pages returned with an incremental vacuum. Data written before
+    sharding (in the main file) is not purged.
+    """
+    if cfg.retention_days <= 0 or cfg.shard == "none":
+        return []
+    cutoff = (now if now is not None else time.time()) - cfg.retention_days * 86400
+    keep = set(keep)
+    removed: List[str] = []
+    old = conn.execute("SELECT name FROM main.shards WHERE t1_ms < ?", (int(cutoff * 1000),)).fetchall()
+    for (name,) in old:
+        if name in keep:
+            continue
+        path = shard_path(cfg, name)
+        try:
+            for p in (path, Path(f"{path}-wal"), Path(f"{path}-shm")):
+                p.unlink(missing_ok=True)
+        except OSError as exc:  # still attached by a reader on Windows; retried next pass
+            logger.warning("Cannot delete shard %s yet: %s", path, exc)
+            continue
+        removed.append(name)
+    with conn:
+        conn.executemany("DELETE FROM main.shards WHERE name = ?", [(n,) for n in removed])
+        # the newest row of a series stays: it may still be the value held today
+        conn.executemany(
+            "DELETE FROM main.series_last WHERE shard = ? AND ts_ms < "
+            "(SELECT MAX(l.ts_ms) FROM main.series_last l WHERE l.series_id = series_last.series_id)",
+            [(n,) for n in removed],
+        )
+        for step, table in ROLLUP_LEVELS:
+            if step not in SHARD_STEPS:
+                conn.execute(f"DELETE FROM main.{table} WHERE bucket < ?", (int(cutoff),))
+    conn.execute("PRAGMA main.incremental_vacuum")
+    if removed:
+        logger.info("Retention: removed %d shard(s) older than %.1f day(s)", len(removed), cfg.retention_days)
+    return removed
+
+
+class ShardedDB:
+    """Read connection over the main file and the shards a query needs.
+
+    ``window(t0, t1)`` attaches the shards overlapping the window and exposes
+    them, together with pre-sharding rows of the main file, through TEMP
+    views named ``samples`` and ``rollup_1s``. Temp objects shadow the main
+    tables, so the queries in ``storage.rollup`` and ``storage.export`` run
+    unchanged, and SQLite pushes their WHERE clauses into every shard.
+
+    At most ``MAX_ATTACHED`` shards are attached at once: ``query_series`` and
+    ``query_steps`` run over windows of any length in batches of shards and
+    merge the results.
+    """
+
+    def __init__(self, cfg: DBConfig) -> None:
+        self.cfg = cfg
+        self.conn = ensure_db(cfg)
+        self._attached: Optional[Tuple[Tuple[str, ...], bool]] = None
+
+    def shards(self, t0: Optional[float] = None, t1: Optional[float] = None) -> List[ShardInfo]:
+        return list_shards(self.conn, self.cfg, t0, t1)
+
+    def window(self, t0: Optional[float] = None, t1: Optional[float] = None) -> sqlite3.Connection:
+        """Connection to query [t0, t1); values held from earlier shards come from ``series_last``."""
+        if self.cfg.shard == "none":
+            return self.conn
+        names = [s.name for s in self.shards(t0, t1) if s.path.exists()]
+        if len(names) > MAX_ATTACHED:
+            raise ValueError(
+                f"window spans {len(names)} shards (max {MAX_ATTACHED} attached): use query_series/query_steps"
+            )
+        self._attach(names, include_main=True)
+        return self.conn
+
+    def batches(self, t0: Optional[float] = None, t1: Optional[float] = None):
+        """Yield the connection once per batch of up to ``MAX_ATTACHED`` shards of [t0, t1), oldest first.
+
+        The first batch also covers pre-sharding rows of the main file.
+        """
+        if self.cfg.shard == "none":
+            yield self.conn
+            return
+        names = [s.name for s in self.shards(t0, t1) if s.path.exists()]
+        for i in range(0, max(len(names), 1), MAX_ATTACHED):
+            self._attach(names[i : i + MAX_ATTACHED], include_main=i == 0)
+            yield self.conn
+
+    def query_series(self, series_id: int, t0: float, t1: float, max_points: int = 1000) -> Series:
+        """``rollup.query_series`` over [t0, t1), whatever the number of shards it spans."""
+        _, level = pick_level(t0, t1, max_points)
+        if level is not None and level[0] not in SHARD_STEPS:
+            return query_series(self.conn, series_id, t0, t1, max_points)  # coarse rollups live in the main file
+        return merge_series([query_series(conn, series_id, t0, t1, max_points) for conn in self.batches(t0, t1)])
+
+    def query_steps(self, series_id: int, t0: float, t1: float, hold_until: Optional[float] = None) -> Steps:
+        """``rollup.query_steps`` over [t0, t1), whatever the number of shards it spans."""
+        out = Steps()
+        for i, conn in enumerate(self.batches(t0, t1)):
+            part = query_steps(conn, series_id, t0, t1, held=i == 0)
+            out.ts.extend(part.ts)
+            out.values.extend(part.values)
+        if hold_until is not None:
+            hold_last(out, hold_until)
+        return out
+
+    def each_shard(self, t0: Optional[float] = None, t1: Optional[float] = None):
+        """Yield the connection once per shard of [t0, t1), oldest first (exports)."""
+        if self.cfg.shard == "none":
+            yield self.conn
+            return
+        self._attach([], include_main=True)  # pre-sharding rows come first
+        yield self.conn
+        for s in self.shards(t0, t1):
+            if s.path.exists():
+                self._attach([s.name], include_main=False)
+                yield self.conn
+
+    def _attach(self, names: List[str], include_main: bool) -> None:
+        state = (tuple(names), include_main)
+        if state == self._attached:
+            return
+        conn = self.conn
+        conn.execute("DROP VIEW IF EXISTS temp.samples")
+        for step, table in ROLLUP_LEVELS:
+            if step in SHARD_STEPS:
+                conn.execute(f"DROP VIEW IF EXISTS temp.{table}")
+        if self._attached is not None:
+            for i in range(len(self._attached[0])):
+                conn.execute(f"DETACH DATABASE s{i}")
+        self._attached = None
+        for i, name in enumerate(names):
+            attach_shard(conn, self.cfg, name, f"s{i}")
+        schemas = (["main"] if include_main else []) + [f"s{i}" for i in range(len(names))]
+        views = {"samples": "series_id, ts_ms, value"}
+        for step, table in ROLLUP_LEVELS:
+            if step in SHARD_STEPS:
+                views[table] = "series_id, bucket, vmin, vmax, vsum, n"
+        for view, cols in views.items():
+            union = " UNION ALL ".join(f"SELECT {cols} FROM {schema}.{view}" for schema in schemas)
+            conn.execute(f"CREATE TEMP VIEW {view} AS {union}")
+        self._attached = state
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class MeasurementWriter:
+    """Background writer that group-commits measurements.
+
+    ``submit`` only appends to an in-memory list; a dedicated thread flushes it
+    with one ``executemany`` transaction when ``batch_size`` rows are pending or
+    ``flush_interval_s`` has elapsed, whichever comes first.
+
+    Rows the database refuses (locked, disk full, I/O error) go back to the
+    head of the queue and are retried with exponential backoff; shard groups
+    already committed are not sent again, so rollups never count a row twice.
+    The queue is bounded by ``max_pending``, on submit as on retry; the
+    oldest rows beyond it are dropped and counted in ``rows_dropped``.
+    """
+
+    def __init__(self, cfg: Optional[DBConfig] = None) -> None:
+        self.cfg = cfg or DBConfig()
+        self.flushes = 0
+        self.rows_written = 0
+        self.last_flush_s = 0.0
+        self.max_flush_s = 0.0
+        self.total_flush_s = 0.0
+        self.flush_failures = 0
+        self.rows_dropped = 0
+        self.last_error: Optional[str] = None
+        self._pending: Deque[MeasurementRow] = deque(maxlen=self.cfg.max_pending)
+        self._retry_s = 0.0  # current backoff, 0 while flushes succeed
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- producer side ----
+    def submit(
+        self,
+        ts: float,
+        unit_id: int,
+        name: str,
+        value: Optional[float],
+        port: str = "",
+        unit: str = "",
+    ) -> None:
+        with self._cond:
+            if len(self._pending) == self.cfg.max_pending:
+                self._dropped(1)
+            self._pending.append((ts, port, unit_id, name, unit, value))
+            if len(self._pending) >= self.cfg.batch_size:
+                self._cond.notify()
+
+    def submit_many(self, rows: Iterable[MeasurementRow]) -> None:
+        rows = list(rows)
+        with self._cond:
+            self._dropped(len(self._pending) + len(rows) - self.cfg.max_pending)
+            self._pending.extend(rows)  # the deque's maxlen drops the oldest
+            if len(self._pending) >= self.cfg.batch_size:
+                self._cond.notify()
+
+    def _dropped(self, n: int) -> None:
+        """Account ``n`` oldest rows pushed out of the full queue (caller holds the lock)."""
+        if n <= 0:
+            return
+        if not self.rows_dropped:
+            logger.error("Measurement queue full (%d rows): dropping the oldest", self.cfg.max_pending)
+        self.rows_dropped += n
+
+    # ---- stats ----
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    @property
+    def avg_flush_s(self) -> float:
+        return self.total_flush_s / self.flushes if self.flushes else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "flush_failures": self.flush_failures,
+            "rows_dropped": self.rows_dropped,
+            "last_flush_ms": self.last_flush_s * 1000,
+            "avg_flush_ms": self.avg_flush_s * 1000,
+            "max_flush_ms": self.max_flush_s * 1000,
+        }
+
+    # ---- lifecycle ----
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the thread after a final flush of everything pending."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _requeue(self, rows: List[MeasurementRow]) -> None:
+        """Put refused rows back in front of newer ones, keeping at most ``max_pending``."""
+        with self._cond:
+            self._dropped(len(rows) + len(self._pending) - self.cfg.max_pending)
+            self._pending = deque(rows + list(self._pending), maxlen=self.cfg.max_pending)
+
+    def _flush(self, router: ShardRouter, catalog: SeriesCatalog, rows: List[MeasurementRow]) -> bool:
+        t0 = time.perf_counter()
+        try:
+            router.insert(rows, catalog)
+        except sqlite3.Error as exc:
+            committed = getattr(exc, "committed", 0)
+            catalog.reset()
+            self.rows_written += committed
+            self.flush_failures += 1
+            self.last_error = str(exc)
+            self._retry_s = min(max(2 * self._retry_s, FLUSH_RETRY_S), FLUSH_RETRY_MAX_S)
+            logger.error(
+                "Failed to flush %d measurement(s), retry in %.1f s: %s",
+                len(rows) - committed,
+                self._retry_s,
+                exc,
+            )
+            self._requeue(rows[committed:])
+            return False
+        if self._retry_s:
+            logger.info("Measurement flush recovered, %d queued row(s) written", len(rows))
+            self._retry_s = 0.0
+            self.last_error = None
+        dt = time.perf_counter() - t0
+        self.flushes += 1
+        self.rows_written += len(rows)
+        self.last_flush_s = dt
+        self.total_flush_s += dt
+        self.max_flush_s = max(self.max_flush_s, dt)
+        logger.debug("Flushed %d measurement(s) in %.1f ms", len(rows), dt * 1000)
+        return True
+
+    def _run(self) -> None:
+        conn = ensure_db(self.cfg)
+        catalog = SeriesCatalog(conn)
+        router = ShardRouter(conn, self.cfg)
+        next_purge = 0.0
+        try:
+            while True:
+                with self._cond:
+                    # after a failed flush, wait out the backoff even if a full batch is pending
+                    deadline = time.monotonic() + (self._retry_s or self.cfg.flush_interval_s)
+                    while not self._stop and (self._retry_s or len(self._pending) < self.cfg.batch_size):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    rows = list(self._pending)
+                    self._pending.clear()
+                    stopping = self._stop
+                if rows and not self._flush(router, catalog, rows) and stopping:
+                    with self._cond:
+                        lost = len(self._pending)
+                        self._pending.clear()
+                    self.rows_dropped += lost
+                    logger.error("Writer stopped with the database unavailable: %d row(s) lost", lost)
+                if time.monotonic() >= next_purge:
+                    next_purge = time.monotonic() + RETENTION_CHECK_S
+                    try:
+                        apply_retention(conn, self.cfg, keep=[router.current] if router.current else [])
+                    except sqlite3.Error as exc:
+                        logger.error("Retention pass failed: %s", exc)
+                if stopping:
+                    break
+        finally:
+            router.close()
+            conn.close()
+
+
+_writer: Optional[MeasurementWriter] = None
+_writer_lock = threading.Lock()
+
 
+def get_writer(cfg: Optional[DBConfig] = None) -> MeasurementWriter:
+    """Process-wide writer, started on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = MeasurementWriter(cfg)
+        _writer.start()
+        return _writer
@@ -0,0 +1,276 @@
+"""End-to-end bus benchmark against the pty slave simulator.
+
+    python -m tools.bench_bus --units 4 --baudrate 38400 --json bench.json
+    python -m tools.bench_bus --baseline bench.json   # exit 1 on regression
+    python -m tools.bench_bus --transport async       # asyncio client, one coroutine per unit
+
+Reports scan time, poll throughput, per-transaction latency percentiles and
+SQLite ingest rate so changes to the client or storage show up as numbers.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from core.async_client import AsyncModbusRTUClient
+from core.modbus_client import ModbusParams, ModbusRTUClient
+from core.read_planner import execute_plan, plan_reads
+from core.simulator import SimFaults, simulator_from_profile
+from profiles.loader import load_profile
+from profiles.schema import DeviceProfile, Metadata, RegisterDef, RegType
+from storage.sqlite import DBConfig, MeasurementWriter
+
+
+# metric -> (unit, higher is better)
+METRICS: Dict[str, Tuple[str, bool]] = {
+    "scan_s": ("s", False),
+    "scan_fast_s": ("s", False),
+    "poll_registers_per_s": ("reg/s", True),
+    "poll_transactions_per_s": ("tx/s", True),
+    "latency_p50_ms": ("ms", False),
+    "latency_p90_ms": ("ms", False),
+    "latency_p99_ms": ("ms", False),
+    "latency_max_ms": ("ms", False),
+    "read_failures": ("", False),
+    "poll_cpu_us_per_tx": ("us", False),
+    "ingest_rows_per_s": ("rows/s", True),
+}
+
+
+def synthetic_profile(registers: int) -> DeviceProfile:
+    """``registers`` contiguous holding registers, half u16 and half f32."""
+    regs: List[RegisterDef] = []
+    addr = 0
+    for i in range(registers):
+        rtype = RegType.u16 if i % 2 == 0 else RegType.f32
+        regs.append(RegisterDef(name=f"r{i}", address=addr, function=3, type=rtype))
+        addr += regs[-1].words or 1
+    return DeviceProfile(meta=Metadata(brand="bench", model="synthetic"), registers=regs)
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def bench_scan(cli: ModbusRTUClient, ids: Sequence[int], turnaround_s: float) -> Dict[str, float]:
+    t0 = time.perf_counter()
+    cli.scan_units(ids)
+    t1 = time.perf_counter()
+    cli.scan_units_fast(ids, turnaround_s=turnaround_s)
+    t2 = time.perf_counter()
+    return {"scan_s": t1 - t0, "scan_fast_s": t2 - t1}
+
+
+def bench_poll(
+    cli: ModbusRTUClient, unit_ids: Sequence[int], profile: DeviceProfile, max_gap: int, cycles: int
+) -> Dict[str, float]:
+    """Poll every unit ``cycles`` times with the block planner, timing each transaction.
+
+    Latency is mostly wire time; the CPU time of the polling thread is what
+    tells transports apart.
+    """
+    blocks = plan_reads(profile, max_gap=max_gap)
+    latencies: List[float] = []
+    words = 0
+    failures = 0
+    t_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    for _ in range(cycles):
+        for uid in unit_ids:
+            for block in blocks:
+                t0 = time.perf_counter()
+                fn = cli.read_input if block.function == 4 else cli.read_holding
+                regs = fn(uid, block.address, block.count)
+                latencies.append(time.perf_counter() - t0)
+                if regs is None:
+                    failures += 1
+                else:
+                    words += len(regs)
+    elapsed = time.perf_counter() - t_start
+    cpu = time.thread_time() - cpu_start
+    # one full planner pass as a sanity check that decoding inputs are complete
+    execute_plan(cli, unit_ids[0], blocks)
+    latencies.sort()
+    return {
+        "poll_registers_per_s": words / elapsed if elapsed else 0.0,
+        "poll_transactions_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_p50_ms": percentile(latencies, 0.50) * 1000,
+        "latency_p90_ms": percentile(latencies, 0.90) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "latency_max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "read_failures": float(failures),
+        "poll_cpu_us_per_tx": cpu / len(latencies) * 1e6 if latencies else 0.0,
+    }
+
+
+async def bench_poll_async(
+    params: ModbusParams, unit_ids: Sequence[int], profile: DeviceProfile, max_gap: int, cycles: int
+) -> Dict[str, float]:
+    """``bench_poll`` through ``AsyncModbusRTUClient``, one coroutine per unit sharing its request queue.
+
+    Callers wait on each other in the queue, so the latency reported is the
+    interval between consecutive completions: the bus time of one transaction
+    including the gap before the next frame.
+    """
+    blocks = plan_reads(profile, max_gap=max_gap)
+    cli = AsyncModbusRTUClient()
+    if not await cli.connect(params):
+        raise RuntimeError(f"Cannot open {params.port}: {cli.last_error}")
+    done: List[float] = []
+    counts = {"words": 0, "failures": 0}
+
+    async def poll_unit(uid: int) -> None:
+        for _ in range(cycles):
+            for block in blocks:
+                fn = cli.read_input if block.function == 4 else cli.read_holding
+                regs = await fn(uid, block.address, block.count)
+                done.append(time.perf_counter())
+                if regs is None:
+                    counts["failures"] += 1
+                else:
+                    counts["words"] += len(regs)
+
+    try:
+        t_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        await asyncio.gather(*(poll_unit(uid) for uid in unit_ids))
+        elapsed = time.perf_counter() - t_start
+        cpu = time.thread_time() - cpu_start
+    finally:
+        await cli.close()
+    done.sort()
+    latencies = sorted(b - a for a, b in zip([t_start] + done, done))
+    return {
+        "poll_registers_per_s": counts["words"] / elapsed if elapsed else 0.0,
+        "poll_transactions_per_s": len(done) / elapsed if elapsed else 0.0,
+        "latency_p50_ms": percentile(latencies, 0.50) * 1000,
+        "latency_p90_ms": percentile(latencies, 0.90) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "latency_max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "read_failures": float(counts["failures"]),
+        "poll_cpu_us_per_tx": cpu / len(done) * 1e6 if done else 0.0,
+    }
+
+
+def bench_ingest(rows: int, batch_size: int) -> Dict[str, float]:
+    """Rows/s through ``MeasurementWriter`` into a fresh database, final flush included."""
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = MeasurementWriter(DBConfig(path=str(Path(tmp) / "bench.sqlite"), batch_size=batch_size))
+        writer.start()
+        names = [f"r{i}" for i in range(20)]
+        now = time.time()
+        t0 = time.perf_counter()
+        for i in range(rows):
+            writer.submit(now + i * 0.001, 1 + i % 4, names[i % len(names)], float(i), port="bench")
+        writer.stop(timeout=60.0)
+        elapsed = time.perf_counter() - t0
+    return {"ingest_rows_per_s": writer.rows_written / elapsed if elapsed else 0.0}
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """Metrics that got worse than ``baseline`` by more than ``tolerance`` (fraction)."""
+    regressions = []
+    for name, value in results.items():
+        if name not in baseline or name not in METRICS:
+            continue
+        ref = baseline[name]
+        higher_better = METRICS[name][1]
+        if ref == 0:
+            worse = value < 0 if higher_better else value > 0
+        else:
+            delta = (value - ref) / abs(ref)
+            worse = delta < -tolerance if higher_better else delta > tolerance
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def report(results: Dict[str, float], baseline: Optional[Dict[str, float]] = None) -> str:
+    lines = []
+    for name, value in results.items():
+        unit = METRICS.get(name, ("", True))[0]
+        line = f"{name:<26}{value:>14.2f} {unit}"
+        if baseline and baseline.get(name):
+            line += f"   ({(value - baseline[name]) / abs(baseline[name]) * 100:+.1f}% vs baseline)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Modbus RTU end-to-end benchmark on the slave simulator")
+    ap.add_argument("--profile", help="DeviceProfile YAML (default: synthetic profile)")
+    ap.add_argument("--registers", type=int, default=40, help="size of the synthetic profile")
+    ap.add_argument("--units", type=int, default=4, help="virtual units on the bus (ids 1..N)")
+    ap.add_argument("--scan-ids", type=int, default=16, help="scan ids 1..N")
+    ap.add_argument("--baudrate", type=int, default=38400)
+    ap.add_argument("--timeout", type=float, default=0.3)
+    ap.add_argument("--transport", choices=["pymodbus", "lean", "async"], default="pymodbus")
+    ap.add_argument("--turnaround-ms", type=float, default=5.0)
+    ap.add_argument("--jitter-ms", type=float, default=1.0)
+    ap.add_argument("--timeout-rate", type=float, default=0.0)
+    ap.add_argument("--crc-error-rate", type=float, default=0.0)
+    ap.add_argument("--exception-rate", type=float, default=0.0)
+    ap.add_argument("--max-gap", type=int, default=8)
+    ap.add_argument("--cycles", type=int, default=20)
+    ap.add_argument("--ingest-rows", type=int, default=100_000)
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--baseline", help="compare with a previous --json result")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="allowed regression (fraction)")
+    args = ap.parse_args(argv)
+
+    profile = load_profile(args.profile) if args.profile else synthetic_profile(args.registers)
+    unit_ids = list(range(1, args.units + 1))
+    use_async = args.transport == "async"
+    params = ModbusParams(
+        baudrate=args.baudrate, timeout=args.timeout, transport="pymodbus" if use_async else args.transport
+    )
+    faults = SimFaults(
+        turnaround_s=args.turnaround_ms / 1000.0,
+        jitter_s=args.jitter_ms / 1000.0,
+        timeout_rate=args.timeout_rate,
+        crc_error_rate=args.crc_error_rate,
+        exception_rate=args.exception_rate,
+        seed=args.seed,
+    )
+    results: Dict[str, float] = {}
+    with simulator_from_profile(profile, unit_ids, faults=faults, params=params) as sim:
+        params.port = sim.port
+        cli = ModbusRTUClient()
+        if not cli.connect(params):
+            print(f"Cannot open {sim.port}: {cli.last_error}", file=sys.stderr)
+            return 2
+        try:
+            results.update(bench_scan(cli, range(1, args.scan_ids + 1), faults.turnaround_s))
+            if not use_async:
+                results.update(bench_poll(cli, unit_ids, profile, args.max_gap, args.cycles))
+        finally:
+            cli.close()
+        if use_async:
+            results.update(asyncio.run(bench_poll_async(params, unit_ids, profile, args.max_gap, args.cycles)))
+    results.update(bench_ingest(args.ingest_rows, args.batch_size))
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+    print(report(results, baseline))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
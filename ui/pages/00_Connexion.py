@@ -5,7 +5,9 @@ import logging
 import streamlit as st
 
 from core.serial_comm import SerialParams, list_serial_ports, open_serial, test_loopback
-from core.modbus_client import ModbusParams, ModbusRTUClient
+from core.acquisition import get_service
+from core.bus_manager import BusHandle, Priority, close_bus, get_bus
+from core.modbus_client import ModbusParams
 
 
 logger = logging.getLogger(__name__)
@@ -48,6 +50,13 @@ else:
         timeout_s=float(timeout),
     )
 
+    transport = st.radio(
+        "Pilote Modbus",
+        ["pymodbus", "lean"],
+        horizontal=True,
+        format_func=lambda t: {"pymodbus": "pymodbus", "lean": "RTU direct (latence minimale)"}[t],
+    )
+
     c1, c2, c3 = st.columns(3)
     with c1:
         if st.button("Test bouclage (optionnel)"):
@@ -66,18 +75,17 @@ else:
         stopbits=sp.stopbits,
         bytesize=sp.bytesize,
         timeout=sp.timeout_s,
+        transport=transport,
     )
 
-    def ensure_client() -> ModbusRTUClient:
-        if "mb_client" not in st.session_state:
-            st.session_state.mb_client = ModbusRTUClient()
-        return st.session_state.mb_client
-
     with c2:
         if st.button("Se connecter"):
-            cli = ensure_client()
+            # All sessions share one bus manager per port
+            cli = BusHandle(get_bus(mp.port), Priority.INTERACTIVE)
+            st.session_state.mb_client = cli
             if cli.connect(mp):
                 st.session_state.connection = {"connected": True, "port": sp.port}
+                st.session_state.mb_params = mp
                 st.success(f"Connecté sur {sp.port}")
             else:
                 st.session_state.connection = {"connected": False, "port": None}
@@ -88,8 +96,11 @@ else:
                     st.error("Échec de connexion")
     with c3:
         if st.button("Se déconnecter"):
-            cli = ensure_client()
-            cli.close()
+            port = st.session_state.connection.get("port")
+            svc = get_service(port) if port else None
+            if port and not (svc is not None and svc.running):
+                close_bus(port)
+            st.session_state.pop("mb_client", None)
             st.session_state.connection = {"connected": False, "port": None}
             st.info("Déconnecté")
 
@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import threading
 import time
+from dataclasses import replace
 
 import streamlit as st
 
+from core.acquisition import get_service
+from core.bus_manager import BusHandle, Priority, get_bus
+from core.bus_pool import BusPool
+from core.modbus_client import ModbusParams
+from core.scanner import ScanCache, candidates_from_config, heuristic_scan
+from core.serial_comm import list_serial_ports
+
 
 st.title("Scan réseau Modbus")
 
@@ -16,29 +25,129 @@ end_id = st.number_input("Adresse fin", min_value=1, max_value=247, value=10, st
 probe_addr = st.number_input("Adresse reg. sonde (FC03)", min_value=0, max_value=65535, value=0, step=1)
 count = st.number_input("Nb registres", min_value=1, max_value=4, value=1, step=1)
 
+scan_cfg = st.session_state.get("defaults", {}).get("scan", {})
+serial_cfg = st.session_state.get("defaults", {}).get("serial", {})
+fast = st.checkbox(
+    "Scan rapide (timeout calculé selon le débit, puis re‑sondage des absents)",
+    value=bool(scan_cfg.get("fast", True)),
+)
+fast_opts = {
+    "turnaround_s": float(scan_cfg.get("turnaround_ms", 5)) / 1000.0,
+    "retry_passes": int(scan_cfg.get("retry_passes", 1)),
+    "backoff_ms": float(scan_cfg.get("backoff_ms", 50)),
+}
+
 place = st.empty()
 result = st.empty()
 
 if st.button("Scanner"):
     cli = st.session_state.get("mb_client")
     ids = list(range(int(start_id), int(end_id) + 1))
-    found: list[int] = []
     prog = st.progress(0.0, text="Scan en cours…")
-    for i, uid in enumerate(ids, start=1):
-        ok = False
-        try:
-            regs = cli.read_holding(unit=uid, address=int(probe_addr), count=int(count))
-            ok = regs is not None
-        except Exception:  # noqa: BLE001
-            ok = False
-        if ok:
-            found.append(uid)
-            result.info(f"Présent: {found}")
-        prog.progress(i / len(ids), text=f"Scan {i}/{len(ids)}")
-        time.sleep(0.02)
+    t0 = time.monotonic()
+    done: list[int] = []
+
+    def on_result(uid: int, present: bool) -> None:
+        done.append(uid)
+        if present:
+            result.info(f"Présent: {uid}")
+        prog.progress(len(done) / len(ids), text=f"Scan {len(done)}/{len(ids)}")
+
+    # Probes run at scan priority: reads/writes from other pages interleave
+    if fast:
+        found = cli.scan_units_fast(
+            ids, probe_addr=int(probe_addr), probe_count=int(count), on_result=on_result, **fast_opts
+        )
+    else:
+        found = cli.scan_units(ids, probe_addr=int(probe_addr), probe_count=int(count), on_result=on_result)
     prog.empty()
     if found:
-        st.success(f"Trouvés: {found}")
+        st.success(f"Trouvés: {found} ({time.monotonic() - t0:.1f} s)")
     else:
         st.info("Aucun esclave détecté sur l'intervalle donné.")
 
+st.divider()
+with st.expander("Scan multi‑adaptateurs (un bus par port, en parallèle)"):
+    ports = [p["device"] for p in list_serial_ports()]
+    sel_ports = st.multiselect("Ports", options=ports, default=ports)
+    if st.button("Scanner tous les ports") and sel_ports:
+        base = st.session_state.get("mb_params") or ModbusParams()
+        pool = BusPool([replace(base, port=p) for p in sel_ports])
+        ids = list(range(int(start_id), int(end_id) + 1))
+        worker = threading.Thread(
+            target=pool.scan,
+            args=(ids, int(probe_addr), int(count), fast),
+            kwargs=fast_opts if fast else {},
+            daemon=True,
+        )
+        worker.start()
+        prog = st.progress(0.0, text="Scan en cours…")
+        total = len(ids) * len(sel_ports)
+        while worker.is_alive():
+            done = sum(pool.progress.values())
+            prog.progress(min(done / total, 1.0), text=f"Scan {done}/{total}")
+            time.sleep(0.2)
+        prog.empty()
+        for port, err in pool.errors.items():
+            st.error(f"{port}: {err}")
+        if pool.found:
+            st.success(f"Trouvés: {sorted(pool.found)}")
+        else:
+            st.info("Aucun esclave détecté sur les ports sélectionnés.")
+
+with st.expander("Scan heuristique multi‑configuration (baud/parité/stop)"):
+    infos = list_serial_ports()
+    if infos:
+        h_sel = st.selectbox(
+            "Adaptateur",
+            options=list(range(len(infos))),
+            format_func=lambda i: f"{infos[i]['device']} — {infos[i].get('serial_number') or infos[i].get('hwid')}",
+        )
+        cache = ScanCache(scan_cfg.get("cache_path", "storage/scan_cache.json"))
+        use_cache = st.checkbox("Utiliser la dernière config connue", value=True)
+        svc = get_service(infos[h_sel]["device"])
+        if svc is not None and svc.running:
+            st.warning("Acquisition en cours sur ce port : arrêtez‑la (page Appareil) avant le scan heuristique.")
+        elif st.button("Lancer le scan heuristique"):
+            info = infos[h_sel]
+            cli = st.session_state.get("mb_client")
+            status = st.empty()
+            trying: list[str] = []
+
+            def on_config(i: int, total: int, cfg) -> None:
+                trying.append(f"Essai {cfg.label()} ({i}/{total - 1})")
+
+            # The sweep changes line settings: it runs as one exclusive request of
+            # the port's bus manager, which then restores the previous settings
+            job = get_bus(info["device"]).exclusive(
+                lambda c: heuristic_scan(
+                    info,
+                    ids=range(int(start_id), int(end_id) + 1),
+                    candidates=candidates_from_config(scan_cfg.get("candidates")),
+                    cache=cache if use_cache else None,
+                    probe_addr=int(probe_addr),
+                    probe_count=int(count),
+                    timeout=float(serial_cfg.get("timeout_s", 0.3)),
+                    on_config=on_config,
+                    client=c,
+                    **fast_opts,
+                )
+            )
+            while not job.done():
+                if trying:
+                    status.info(trying[-1])
+                time.sleep(0.2)
+            outcome = job.result()
+            status.empty()
+            if outcome.config is None:
+                st.info(f"Aucune réponse sur {outcome.configs_tried} configuration(s).")
+            else:
+                src = "cache" if outcome.from_cache else f"{outcome.configs_tried} config(s) essayée(s)"
+                st.success(f"{outcome.config.label()} — unités {outcome.units} ({src})")
+                if cli is not None:
+                    mp = outcome.config.params(info["device"], (st.session_state.get("mb_params") or ModbusParams()).timeout)
+                    cli = BusHandle(get_bus(info["device"]), Priority.INTERACTIVE)
+                    if cli.connect(mp):
+                        st.session_state.mb_client = cli
+                        st.session_state.mb_params = mp
+                        st.session_state.connection = {"connected": True, "port": info["device"]}
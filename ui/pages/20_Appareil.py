@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-import struct
 from typing import Dict, Optional
 
 import streamlit as st
 
-from core.modbus_client import ModbusRTUClient
-from profiles.loader import load_profiles
-from profiles.schema import Access, DeviceProfile, RegisterDef, RegType, Endianness
+from core.acquisition import AcquisitionConfig, get_service, start_service, stop_service
+from core.decode import decode_register
+from core.bus_manager import BusHandle
+from core.health import CLOSED
+from core.read_planner import execute_plan, plan_reads
+from core.write_planner import WriteResult, apply_sequence, execute_writes, plan_writes
+from profiles.registry import get_registry
+from storage.sqlite import DBConfig, get_writer
+from profiles.schema import Access, DeviceProfile
 
 
 st.title("Vue Appareil")
@@ -16,56 +21,96 @@ if not st.session_state.get("connection", {}).get("connected"):
     st.warning("Non connecté. Allez à la page Connexion.")
     st.stop()
 
-cli: ModbusRTUClient = st.session_state.get("mb_client")
-profiles: Dict[str, DeviceProfile] = load_profiles()
+cli: BusHandle = st.session_state.get("mb_client")
+profiles: Dict[str, DeviceProfile] = get_registry().profiles()
 
 if not profiles:
     st.info("Aucun profil chargé (dossier 'profiles/'). Un exemple est fourni: profiles/example_device.yaml")
 
 unit_id = st.number_input("Adresse esclave (unit id)", min_value=1, max_value=247, value=1, step=1)
+unit_health = next((h for h in cli.health() if h.unit == int(unit_id)), None)
+if unit_health is not None and unit_health.state != CLOSED:
+    st.warning(
+        f"Unité {int(unit_id)} hors ligne ({unit_health.consecutive_failures} échecs consécutifs) : "
+        f"lectures suspendues, nouveau test toutes les {unit_health.backoff_s:.0f} s."
+    )
 
 key = st.selectbox("Profil", options=["(aucun)"] + list(profiles.keys()))
 profile: Optional[DeviceProfile] = profiles.get(key) if key != "(aucun)" else None
 
 
-def decode_value(reg: RegisterDef, regs: list[int]) -> Optional[float]:
-    try:
-        if reg.type in (RegType.u16, RegType.i16):
-            v = regs[0] & 0xFFFF
-            if reg.type == RegType.i16 and v >= 0x8000:
-                v -= 0x10000
-            return float(v) * float(reg.scale)
-        # 32-bit types
-        w0, w1 = regs[0] & 0xFFFF, regs[1] & 0xFFFF
-        if reg.endianness == Endianness.le:
-            w0, w1 = w1, w0
-        raw = (w0 << 16) | w1
-        if reg.type == RegType.u32:
-            return float(raw) * float(reg.scale)
-        if reg.type == RegType.i32:
-            if raw & 0x80000000:
-                raw -= 0x100000000
-            return float(raw) * float(reg.scale)
-        if reg.type == RegType.f32:
-            b = w0.to_bytes(2, "big") + w1.to_bytes(2, "big")
-            f = struct.unpack(">f", b)[0]
-            return float(f) * float(reg.scale)
-    except Exception:  # noqa: BLE001
-        return None
-    return None
-
-
-def encode_u16(value: float, reg: RegisterDef) -> int:
-    # Very basic encoder for u16/i16 only (MVP)
-    scaled = int(round(float(value) / float(reg.scale or 1.0)))
-    if reg.type == RegType.i16:
-        if scaled < 0:
-            scaled = (scaled + 0x10000) & 0xFFFF
-    return scaled & 0xFFFF
-
+def show_write_result(res: WriteResult, slot=st) -> None:
+    if res.ok:
+        slot.success(f"Écrit ({res.transactions} requête(s))")
+        return
+    if res.mismatched:
+        slot.warning(f"Relecture différente: {', '.join(res.mismatched)}")
+    if res.failed:
+        slot.error(f"Échec écriture: {', '.join(res.failed)}")
+    if res.skipped:
+        slot.error(f"Non envoyés: {', '.join(res.skipped)}")
+
+
+acq_cfg = AcquisitionConfig.from_dict(st.session_state.get("defaults", {}).get("acquisition"))
+port = st.session_state.connection.get("port")
+svc = get_service(port) if port else None
+acquiring = svc is not None and svc.running
+
+if profile and acq_cfg.enabled:
+    with st.expander(f"Acquisition continue ({acq_cfg.hz:g} Hz)", expanded=acquiring):
+        a1, a2 = st.columns(2)
+        if not acquiring:
+            if a1.button("Démarrer l'acquisition") and st.session_state.get("mb_params"):
+                # Polls share the bus with this page at a lower priority
+                svc = start_service(st.session_state.mb_params, acq_cfg)
+                if svc.running:
+                    svc.set_target(int(unit_id), profile)
+                    acquiring = True
+                else:
+                    stop_service(port)
+                    st.error(f"Échec acquisition: {svc.last_error}")
+        else:
+            if a1.button("Ajouter cette unité"):
+                svc.set_target(int(unit_id), profile)
+            if a2.button("Arrêter l'acquisition"):
+                stop_service(port)
+                acquiring = False
+        if acquiring:
+            record = st.checkbox("Historiser dans SQLite", value=svc.writer is not None)
+            if record and svc.writer is None:
+                svc.set_writer(get_writer(DBConfig.from_dict(st.session_state.get("defaults", {}).get("storage"))))
+            elif not record:
+                svc.set_writer(None)
+            load = svc.load()
+            st.caption(
+                f"Unités: {[t.unit_id for t in svc.targets()]} · lectures={load.runs} · "
+                f"échéances sautées={load.missed} · retard p50/p99={load.lateness_p50_ms:.0f}/"
+                f"{load.lateness_p99_ms:.0f} ms · dernière lecture={svc.last_cycle_s * 1000:.0f} ms · "
+                f"lignes écrites={svc.recorder.ratio:.0%} des valeurs lues"
+            )
+            writer = svc.writer
+            if writer is not None and (writer.last_error or writer.rows_dropped):
+                st.warning(
+                    f"Historisation SQLite en échec ({writer.last_error or 'rétablie'}) : "
+                    f"{writer.queue_depth} ligne(s) en attente, {writer.rows_dropped} perdue(s)"
+                )
+            if load.overloaded:
+                st.warning(
+                    f"Les cadences demandées occupent {load.requested:.0%} du bus (budget {load.budget:.0%}) : "
+                    f"périodes allongées x{load.stretch:.2f}"
+                    + (f", registres critiques x{load.critical_stretch:.2f}" if load.critical_stretch > 1 else "")
+                )
 
 if profile:
     st.subheader(f"Profil: {key}")
+    block_results: Dict[str, Optional[list[int]]] = {}
+    latest = svc.latest.get(int(unit_id)) if acquiring else None
+    if latest is not None:
+        block_results = latest.raw
+    elif st.button("Tout lire"):
+        plan = plan_reads(profile)
+        block_results = execute_plan(cli, unit=int(unit_id), blocks=plan)
+        st.caption(f"{len(profile.registers)} registre(s) lus en {len(plan)} requête(s)")
     for r in profile.registers:
         cols = st.columns([2, 1, 2, 2, 2])
         cols[0].markdown(f"**{r.name}**\n`addr={r.address}` · `FC{r.function}` · `{r.type}` {r.unit or ''}")
@@ -74,37 +119,56 @@ if profile:
         write_col = cols[3]
         status_col = cols[4]
 
-        if read_btn:
-            if r.function == 4:
+        if read_btn or r.name in block_results:
+            if r.name in block_results and not read_btn:
+                regs = block_results[r.name]
+            elif r.function == 4:
                 regs = cli.read_input(unit=int(unit_id), address=r.address, count=r.words)
             else:
                 regs = cli.read_holding(unit=int(unit_id), address=r.address, count=r.words)
             if regs is None:
                 status_col.error("Erreur lecture")
             else:
-                v = decode_value(r, regs)
+                v = decode_register(r, regs)
                 if v is None:
                     status_col.warning(f"Regs: {regs}")
                 else:
                     val_slot.markdown(f"**{v}** {r.unit or ''}")
 
-        # Write (MVP: only u16/i16 via FC06)
         can_write = (st.session_state.get("role", "RO") in ("OP", "ADMIN")) and (r.access == Access.RW)
-        if can_write and r.type in (RegType.u16, RegType.i16) and r.function == 3:
+        if can_write and r.function == 3:
             wval = write_col.number_input(
                 f"Valeur ({r.unit or ''})",
                 value=float(r.minimum) if r.minimum is not None else 0.0,
                 key=f"val_{r.name}_{r.address}",
             )
             if write_col.button("Écrire", key=f"write_{r.name}_{r.address}"):
-                # Guardrails: range check
-                if r.minimum is not None and wval < r.minimum:
-                    status_col.error("Sous la plage min")
-                elif r.maximum is not None and wval > r.maximum:
-                    status_col.error("Au‑delà de la plage max")
+                try:
+                    # Guardrails (min/max, type range) are enforced by the planner
+                    blocks = plan_writes([(r, wval)])
+                except ValueError as exc:
+                    status_col.error(str(exc))
                 else:
-                    raw = encode_u16(wval, r)
-                    ok = cli.write_single_register(unit=int(unit_id), address=r.address, value=raw)
-                    status_col.success("Écrit") if ok else status_col.error("Échec écriture")
+                    show_write_result(execute_writes(cli, int(unit_id), blocks), status_col)
         else:
-            write_col.caption("Lecture seule ou non supporté (MVP)")
+            write_col.caption("Lecture seule")
+
+    if profile.sequences:
+        st.subheader("Séquences")
+        can_apply = st.session_state.get("role", "RO") in ("OP", "ADMIN")
+        for seq in profile.sequences:
+            with st.expander(seq.name):
+                if seq.description:
+                    st.caption(seq.description)
+                st.dataframe(
+                    [{"registre": s.reg, "valeur": s.value} for s in seq.steps],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+                if not can_apply:
+                    st.caption("Application: rôle OP ou ADMIN requis")
+                elif st.button("Appliquer", key=f"seq_{seq.name}"):
+                    try:
+                        show_write_result(apply_sequence(cli, int(unit_id), profile, seq))
+                    except ValueError as exc:
+                        st.error(str(exc))
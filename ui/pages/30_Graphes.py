@@ -1,8 +1,135 @@
 from __future__ import annotations
 
+import time
+from datetime import datetime
+
+import numpy as np
+import plotly.graph_objects as go
 import streamlit as st
 
+from core.acquisition import AcquisitionConfig, services
+from core.live import LiveView
+from storage.sqlite import DBConfig, ShardedDB, list_series
+
+
+st.title("Graphes")
+
+defaults = st.session_state.get("defaults", {})
+cfg = DBConfig.from_dict(defaults.get("storage"))
+# Attaches only the day shards each query window needs; one per session, reused across reruns
+db = st.session_state.get("sharded_db")
+if db is None or db.cfg != cfg:
+    if db is not None:
+        db.close()
+    db = st.session_state.sharded_db = ShardedDB(cfg)
+
+mode = st.radio("Mode", ["Historique", "Temps réel"], horizontal=True)
+
+if mode == "Temps réel":
+    LIVE_WINDOWS = {"30 s": 30, "1 min": 60, "5 min": 300, "15 min": 900}
+    acq_cfg = AcquisitionConfig.from_dict(defaults.get("acquisition"))
+    running = [svc for svc in services().values() if svc.running]
+    if not running:
+        st.info("Aucune acquisition en cours. Démarrez‑la depuis la page Appareil.")
+        st.stop()
+
+    units = {
+        (svc.params.port, t.unit_id, r.name): r.unit or ""
+        for svc in running
+        for t in svc.targets()
+        for r in t.profile.registers
+    }
+    keys = list(units)
+
+    def live_label(key) -> str:
+        port, unit_id, name = key
+        return f"{port} unité {unit_id} · {name}" + (f" [{units[key]}]" if units[key] else "")
+
+    sel = st.multiselect("Variables", options=keys, format_func=live_label, default=keys[:1])
+    c1, c2 = st.columns(2)
+    span = LIVE_WINDOWS[c1.selectbox("Fenêtre", list(LIVE_WINDOWS), index=1)]
+    refresh_s = c2.select_slider("Rafraîchissement (s)", options=[0.2, 0.5, 1.0, 2.0], value=0.5)
+
+    # One fixed-size window per series, kept across reruns of this session
+    fastest_hz = max(
+        (1.0 / r.poll_s if r.poll_s else acq_cfg.hz for svc in running for t in svc.targets() for r in t.profile.registers),
+        default=acq_cfg.hz,
+    )
+    capacity = int(span * fastest_hz) + 1
+    view = st.session_state.get("live_view")
+    if view is None or view.capacity != capacity:
+        view = st.session_state.live_view = LiveView(capacity)
+    stored = {(s.port, s.unit_id, s.name): s.id for s in list_series(db.conn)}
+    now = time.time()
+    for key in view.select(sel):
+        if key in stored:  # start from the recorded history, once
+            hist = db.query_series(stored[key], now - span, now, max_points=capacity)
+            view.seed(key, hist.ts, hist.vavg)
+    buffers = list({id(svc.buffer): svc.buffer for svc in running}.values())
+    utc_offset_s = datetime.now().astimezone().utcoffset().total_seconds()
+
+    @st.fragment(run_every=refresh_s)
+    def live_chart() -> None:
+        # Only this block reruns: pull the new samples, redraw the fixed windows
+        view.update(buffers)
+        t_end = time.time()
+        fig = go.Figure()
+        for key in sel:
+            ts, values = view.arrays(key, after=t_end - span)
+            x = ((ts + utc_offset_s) * 1000).astype("datetime64[ms]")
+            fig.add_trace(go.Scattergl(x=x, y=values, mode="lines", name=live_label(key)))
+        x_range = np.array([t_end - span, t_end]) + utc_offset_s
+        fig.update_layout(
+            height=450,
+            margin=dict(l=10, r=10, t=10, b=10),
+            xaxis=dict(range=(x_range * 1000).astype("datetime64[ms]").tolist()),
+            uirevision="live",  # keep zoom/legend state between refreshes
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    live_chart()
+    st.stop()
+
+series = list_series(db.conn)
+
+if not series:
+    st.info("Aucune mesure historisée. Activez l'historisation dans la page Appareil.")
+    st.stop()
+
+WINDOWS = {"10 min": 600, "1 h": 3600, "6 h": 6 * 3600, "1 jour": 86400, "1 semaine": 7 * 86400}
 
-st.title("Graphes (à venir)")
-st.info("MVP: la visualisation temps réel et l'historisation SQLite seront ajoutées à la prochaine itération.")
+sel = st.multiselect(
+    "Variables",
+    options=list(range(len(series))),
+    format_func=lambda i: series[i].label(),
+    default=[0],
+)
+c1, c2, c3 = st.columns(3)
+window = c1.selectbox("Fenêtre", list(WINDOWS), index=1)
+max_points = c2.number_input("Points max", min_value=100, max_value=5000, value=1000, step=100)
+# Change-only/deadband registers store one row per change: draw them as held steps
+steps = c3.checkbox("Paliers (valeurs maintenues)")
 
+t1 = time.time()
+t0 = t1 - WINDOWS[window]
+fig = go.Figure()
+for i in sel:
+    info = series[i]
+    label = f"{info.unit_id}:{info.name}"
+    if steps:
+        held = db.query_steps(info.id, t0, t1, hold_until=t1)
+        x = [datetime.fromtimestamp(t) for t in held.ts]
+        fig.add_trace(go.Scatter(x=x, y=held.values, mode="lines", line_shape="hv", name=label))
+        st.caption(f"{label}: {len(held.ts)} points bruts")
+        continue
+    s = db.query_series(info.id, t0, t1, max_points=int(max_points))
+    x = [datetime.fromtimestamp(t) for t in s.ts]
+    # min/max envelope keeps spikes visible after downsampling
+    fig.add_trace(go.Scatter(x=x, y=s.vmax, mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip"))
+    fig.add_trace(
+        go.Scatter(x=x, y=s.vmin, mode="lines", line=dict(width=0), fill="tonexty", opacity=0.2, name=f"{label} min/max")
+    )
+    fig.add_trace(go.Scatter(x=x, y=s.vavg, mode="lines", name=label))
+    st.caption(f"{label}: {len(s.ts)} points depuis `{s.source}` (pas {s.bucket_s:.2f} s)")
+fig.update_layout(height=450, margin=dict(l=10, r=10, t=10, b=10))
+st.plotly_chart(fig, use_container_width=True)
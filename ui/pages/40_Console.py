@@ -1,8 +1,95 @@
 from __future__ import annotations
 
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
 import streamlit as st
 
+from core.capture import RX, TX, CaptureConfig, CaptureFile, Frame, captures, filter_frames
+
+
+st.title("Console Hex")
+st.caption("Trames brutes Tx/Rx capturées sur le bus (horodatage haute résolution).")
+
+cap_cfg = CaptureConfig.from_dict(st.session_state.get("defaults", {}).get("capture"))
+rings = captures()
+spill_dir = Path(cap_cfg.spill_dir) if cap_cfg.spill_dir else None
+files = sorted(spill_dir.glob("*.mbcap"), reverse=True) if spill_dir and spill_dir.exists() else []
+
+sources = [f"Mémoire · {port}" for port in rings] + [f"Fichier · {p.name}" for p in files]
+if not sources:
+    st.info("Aucune capture. Connectez‑vous à un port : chaque transaction Modbus y est enregistrée.")
+    st.stop()
+
+src = st.selectbox("Source", options=list(range(len(sources))), format_func=lambda i: sources[i])
+
+c1, c2, c3, c4 = st.columns(4)
+direction = {"Tx + Rx": None, "Tx": TX, "Rx": RX}[c1.selectbox("Sens", ["Tx + Rx", "Tx", "Rx"])]
+unit = int(c2.number_input("Unité (0 = toutes)", min_value=0, max_value=247, value=0, step=1)) or None
+function = int(c3.number_input("Fonction (0 = toutes)", min_value=0, max_value=127, value=0, step=1)) or None
+bad_crc = c4.checkbox("CRC invalides seulement")
+page_size = st.selectbox("Trames/page", [100, 250, 500, 1000], index=1)
+filtered = direction is not None or unit is not None or function is not None or bad_crc
+
+frames: List[Frame]
+if src < len(rings):
+    ring = list(rings.values())[src]
+    first, last = ring.first_seq(), ring.last_seq
+    a1, a2, a3 = st.columns(3)
+    a1.metric("Trames en mémoire", max(0, last - first + 1))
+    a2.metric("Perdues (débordement)", ring.dropped)
+    if ring.spill_path is None:
+        if a3.button("Enregistrer sur disque") and cap_cfg.spill_dir:
+            ring.start_spill(cap_cfg.spill_dir)
+            st.rerun()
+        elif not cap_cfg.spill_dir:
+            a3.caption("capture.spill_dir non configuré")
+    else:
+        a3.caption(f"Enregistrement : {ring.spill_path.name}")
+        if a3.button("Arrêter l'enregistrement"):
+            ring.stop_spill()
+    if filtered:
+        frames = filter_frames(ring.frames(first, last + 1), direction, unit, function, bad_crc)
+        total = len(frames)
+    else:
+        frames = []
+        total = max(0, last - first + 1)
+    if st.button("Vider la mémoire"):
+        ring.clear()
+        st.rerun()
+else:
+    cf = CaptureFile(files[src - len(rings)])
+    st.metric("Trames dans le fichier", len(cf))
+    if filtered:
+        frames = [f for f in cf.iter_frames() if filter_frames([f], direction, unit, function, bad_crc)]
+        total = len(frames)
+    else:
+        frames = []
+        total = len(cf)
+
+pages = max(1, -(-total // page_size))
+page_no = int(st.number_input(f"Page (1…{pages})", min_value=1, max_value=pages, value=pages, step=1)) - 1
+lo, hi = page_no * page_size, min(total, (page_no + 1) * page_size)
+if filtered:
+    shown = frames[lo:hi]
+elif src < len(rings):
+    shown = ring.frames(first + lo, first + hi)
+else:
+    shown = cf.read(range(lo, hi))
 
-st.title("Console Hex & Scripts (à venir)")
-st.caption("Envoi de trames brutes et presets — prévu ultérieurement.")
+lines = []
+prev_ns = None
+for f in shown:
+    delta = "" if prev_ns is None else f"+{(f.mono_ns - prev_ns) / 1e6:8.3f} ms"
+    prev_ns = f.mono_ns
+    stamp = datetime.fromtimestamp(f.ts).strftime("%H:%M:%S.%f")
+    flag = "" if f.crc_ok else "  [CRC!]"
+    lines.append(f"{stamp} {delta:>13}  {'Tx' if f.direction == TX else 'Rx'}  {f.hex()}{flag}")
+st.code("\n".join(lines) or "(aucune trame)", language=None)
 
+if src >= len(rings):
+    path = files[src - len(rings)]
+    if st.button("Préparer le téléchargement"):
+        with open(path, "rb") as fh:
+            st.download_button("Télécharger la capture", data=fh, file_name=path.name)
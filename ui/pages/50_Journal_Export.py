@@ -1,20 +1,137 @@
 from __future__ import annotations
 
+import html
+import shutil
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
 
 import streamlit as st
 
+from storage.export import ExportJob, run_export_job
+from storage.log_index import LEVELS, get_log_index
+from storage.sqlite import DBConfig, ShardedDB, apply_retention, list_series
+
+
+# Served by Streamlit's static route (.streamlit/config.toml): the browser downloads the file straight from disk
+DOWNLOAD_DIR = Path("static") / "exports"
+
+
+def download_link(path: Path, label: str) -> None:
+    name = html.escape(path.name)
+    link = f'<a href="app/static/exports/{name}" download="{name}">{html.escape(label)}</a>'
+    st.markdown(link, unsafe_allow_html=True)
+
 
 st.title("Journal & Export")
 
-log_path = Path("logs/app.log")
+log_cfg = st.session_state.get("defaults", {}).get("logging", {})
+log_path = Path(log_cfg.get("path", "logs/app.log"))
 if log_path.exists():
     st.subheader("Logs applicatifs")
-    st.download_button("Télécharger le log", data=log_path.read_bytes(), file_name="app.log")
-    st.text_area("Contenu", log_path.read_text(encoding="utf-8", errors="ignore"), height=300)
+    index = get_log_index(log_path, int(log_cfg.get("backup_count", 3)))
+    c1, c2, c3 = st.columns([2, 2, 1])
+    levels = c1.multiselect("Niveaux", LEVELS, default=["INFO", "WARNING", "ERROR", "CRITICAL"])
+    logger_prefix = c2.text_input("Logger (préfixe)", value="")
+    page_size = c3.selectbox("Lignes/page", [100, 200, 500], index=1)
+    since_on = st.checkbox("Depuis une date")
+    since = None
+    if since_on:
+        d1, d2 = st.columns(2)
+        day = d1.date_input("Jour")
+        hour = d2.time_input("Heure")
+        since = datetime.combine(day, hour).timestamp()
+    all_levels = len(levels) == len(LEVELS)
+    pages = index.pages(page_size, None if all_levels else levels, logger_prefix, since)
+    page_no = st.number_input(f"Page (1…{pages})", min_value=1, max_value=pages, value=pages, step=1)
+    records, _ = index.page(int(page_no) - 1, page_size, None if all_levels else levels, logger_prefix, since)
+    st.caption(f"{len(index)} enregistrement(s) indexé(s) dans app.log et ses rotations")
+    st.code("\n".join(r.text for r in records) or "(aucun enregistrement)", language=None)
+    if st.button("Préparer le téléchargement du log"):
+        # Snapshot of the live file, copied in chunks; the previous snapshot of this session is replaced
+        old = st.session_state.get("log_download")
+        if old is not None:
+            old.unlink(missing_ok=True)
+        DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        copy = DOWNLOAD_DIR / f"{log_path.stem}_{datetime.now():%Y%m%d_%H%M%S}{log_path.suffix}"
+        shutil.copyfile(log_path, copy)
+        st.session_state.log_download = copy
+    log_copy = st.session_state.get("log_download")
+    if log_copy is not None and log_copy.exists():
+        download_link(log_copy, f"Télécharger {log_copy.name}")
 else:
     st.info("Pas encore de journal. Les logs apparaîtront ici.")
 
-st.subheader("Exports mesures (à venir)")
-st.caption("Exports CSV/XLSX depuis SQLite seront ajoutés prochainement.")
+st.subheader("Exports mesures")
+
+db_cfg = DBConfig.from_dict(st.session_state.get("defaults", {}).get("storage"))
+# One read connection per session, reused across reruns (shared with Graphes)
+db = st.session_state.get("sharded_db")
+if db is None or db.cfg != db_cfg:
+    if db is not None:
+        db.close()
+    db = st.session_state.sharded_db = ShardedDB(db_cfg)
+series = list_series(db.conn)
+job: ExportJob | None = st.session_state.get("export_job")
+
+if not series:
+    st.caption("Aucune mesure historisée.")
+elif job is None or job.finished:
+    sel = st.multiselect(
+        "Variables",
+        options=list(range(len(series))),
+        format_func=lambda i: series[i].label(),
+        default=list(range(len(series))),
+    )
+    c1, c2, c3 = st.columns(3)
+    fmt = c1.selectbox("Format", ["csv", "xlsx"])
+    pivot = c2.checkbox("Une colonne par variable", value=False)
+    hours = c3.number_input("Dernières heures (0 = tout)", min_value=0, value=0, step=1)
+    if st.button("Exporter") and sel:
+        t1 = time.time()
+        t0 = t1 - hours * 3600 if hours else None
+        name = f"mesures_{datetime.now():%Y%m%d_%H%M%S}.{fmt}"
+        job = ExportJob(path=DOWNLOAD_DIR / name)
+        st.session_state.export_job = job
+        threading.Thread(
+            target=run_export_job,
+            args=(db_cfg, job, fmt, [series[i] for i in sel], t0, None, pivot),
+            name="export",
+            daemon=True,
+        ).start()
+        st.rerun()
+
+if job is not None and not job.finished:
+    if st.button("Annuler l'export"):
+        job.cancel.set()
+    prog = st.progress(0.0, text="Export en cours…")
+    while not job.finished:
+        frac = job.done / job.total if job.total else 0.0
+        prog.progress(min(frac, 1.0), text=f"Export {job.done}/{job.total}")
+        time.sleep(0.3)
+    st.rerun()
+
+if job is not None and job.finished:
+    if job.error:
+        st.error(f"Échec export: {job.error}")
+    elif job.result is not None and job.path.exists():
+        state = "interrompu" if job.result.cancelled else "terminé"
+        st.success(f"Export {state}: {job.result.rows} ligne(s) → {job.path}")
+        download_link(job.path, "Télécharger l'export")
 
+st.subheader("Stockage")
+shards = db.shards()
+sizes = [s.path.stat().st_size if s.path.exists() else 0 for s in shards]
+s1, s2, s3 = st.columns(3)
+s1.metric("Fichiers (partitions)", len(shards))
+s2.metric("Taille totale", f"{(sum(sizes) + Path(db_cfg.path).stat().st_size) / 2**20:.1f} Mio")
+s3.metric("Rétention", f"{db_cfg.retention_days:g} j" if db_cfg.retention_days else "illimitée")
+if shards:
+    st.caption(
+        f"Partitions par {'jour' if db_cfg.shard == 'day' else 'session'} : "
+        f"{shards[0].path.name} … {shards[-1].path.name}"
+    )
+if db_cfg.retention_days and st.button("Appliquer la rétention maintenant"):
+    removed = apply_retention(db.conn, db_cfg)
+    st.success(f"{len(removed)} partition(s) supprimée(s)")
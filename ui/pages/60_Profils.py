@@ -4,18 +4,22 @@ import json
 
 import streamlit as st
 
-from profiles.loader import load_profiles
+from profiles.registry import get_registry
 
 
 st.title("Profils d'appareils")
 
-profiles = load_profiles()
+registry = get_registry()
+profiles = registry.compiled()
 
 if not profiles:
     st.info("Aucun profil trouvé dans `profiles/`. Un exemple est disponible.")
 else:
     st.success(f"{len(profiles)} profil(s) chargé(s)")
-    for key, prof in profiles.items():
+    for key, comp in profiles.items():
         with st.expander(key):
-            st.json(json.loads(prof.model_dump_json(indent=2)))
+            st.caption(f"{comp.path.name} · {len(comp.profile.registers)} registre(s) · {comp.total_words} mot(s) · {len(comp.plan)} lecture(s) groupée(s)")
+            st.json(json.loads(comp.profile.model_dump_json(indent=2)))
+for path, err in registry.errors.items():
+    st.error(f"{path.name}: {err}")
 
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import time
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from core.bus_manager import Priority, buses
+from core.health import OPEN
+from core.metrics import LATENCY_BUCKETS_S, OUTCOMES, get_metrics
+
+
+st.title("Métriques du bus")
+
+metrics = get_metrics()
+rows = metrics.rows()
+st.caption(f"Depuis {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(metrics.started))}")
+
+health_rows = []
+for port, bus in buses().items():
+    for h in bus.handle(Priority.INTERACTIVE).health():
+        health_rows.append(
+            {
+                "port": port,
+                "unité": h.unit,
+                "état": {"closed": "OK", "open": "hors ligne", "half_open": "re-test"}[h.state_name],
+                "échecs consécutifs": h.consecutive_failures,
+                "prochain test (s)": round(max(0.0, h.next_probe - time.monotonic()), 1) if h.state == OPEN else None,
+                "ouvertures": h.trips,
+                "requêtes évitées": h.skipped,
+                "dernière réponse": time.strftime("%H:%M:%S", time.localtime(h.last_ok)) if h.last_ok else "—",
+            }
+        )
+if health_rows:
+    st.subheader("Santé des unités")
+    offline = [r for r in health_rows if r["état"] != "OK"]
+    if offline:
+        st.warning(
+            f"{len(offline)} unité(s) hors ligne : leurs requêtes échouent immédiatement, un test léger est envoyé "
+            "après un délai qui double à chaque échec."
+        )
+    st.dataframe(health_rows, use_container_width=True, hide_index=True)
+    if offline and st.button("Retester maintenant"):
+        for port, bus in buses().items():
+            bus.handle(Priority.INTERACTIVE).reset_health()
+        st.rerun()
+
+if not rows:
+    st.info("Aucune transaction enregistrée pour l'instant.")
+    st.stop()
+
+df = pd.DataFrame(rows)
+totals = df[["total", *OUTCOMES, "bytes_tx", "bytes_rx"]].sum()
+c = st.columns(5)
+c[0].metric("Transactions", int(totals["total"]))
+c[1].metric("Succès", f"{100.0 * totals['ok'] / totals['total']:.1f} %" if totals["total"] else "—")
+c[2].metric("Timeouts", int(totals["timeout"]))
+c[3].metric("Exceptions", int(totals["exception"]))
+c[4].metric("Octets Tx/Rx", f"{int(totals['bytes_tx'])} / {int(totals['bytes_rx'])}")
+
+st.subheader("Par port / unité / fonction")
+st.dataframe(
+    df.style.format({"success_pct": "{:.1f}", "mean_ms": "{:.1f}", "p50_ms": "{:.1f}", "p90_ms": "{:.1f}", "p99_ms": "{:.1f}", "max_ms": "{:.1f}"}),
+    use_container_width=True,
+    hide_index=True,
+)
+
+st.subheader("Latences par unité")
+fig = go.Figure()
+for r in rows:
+    label = f"{r['port']} u{r['unit']} FC{r['fc']:02d}"
+    fig.add_trace(go.Bar(name=label, x=["p50", "p90", "p99", "max"], y=[r["p50_ms"], r["p90_ms"], r["p99_ms"], r["max_ms"]]))
+fig.update_layout(barmode="group", height=350, yaxis_title="ms", margin=dict(l=10, r=10, t=10, b=10))
+st.plotly_chart(fig, use_container_width=True)
+st.caption("Percentiles estimés depuis l'histogramme (bornes : " + ", ".join(f"{b * 1000:g}" for b in LATENCY_BUCKETS_S) + " ms).")
+
+c1, c2, c3 = st.columns(3)
+if c1.button("Rafraîchir"):
+    st.rerun()
+c2.download_button("Exporter (Prometheus)", data=metrics.to_prometheus(), file_name="modbus.prom", mime="text/plain")
+if c3.button("Remettre à zéro"):
+    metrics.reset()
+    st.rerun()
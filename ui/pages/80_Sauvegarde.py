@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import streamlit as st
+
+from core.bus_manager import Priority, get_bus
+from core.dump import HOLE, UNKNOWN, VALID, DumpJob, RegisterDump, run_dump_job, run_restore_job
+
+
+st.title("Sauvegarde / restauration")
+
+if not st.session_state.get("connection", {}).get("connected"):
+    st.warning("Non connecté. Allez à la page Connexion.")
+    st.stop()
+
+# Bulk reads run at scan priority: acquisition and the other pages keep the bus
+cli = get_bus(st.session_state.connection["port"]).handle(Priority.SCAN)
+dump_dir = Path(st.session_state.get("defaults", {}).get("dump", {}).get("dir", "storage/dumps"))
+
+c1, c2, c3, c4 = st.columns(4)
+unit = int(c1.number_input("Unité", min_value=1, max_value=247, value=1, step=1))
+fc = c2.selectbox("Table", [3, 4], format_func=lambda f: {3: "Holding (FC03)", 4: "Input (FC04)"}[f])
+start = int(c3.number_input("Adresse début", min_value=0, max_value=65535, value=0, step=1))
+end = int(c4.number_input("Adresse fin", min_value=0, max_value=65535, value=65535, step=1))
+min_hole = st.select_slider(
+    "Résolution des trous (mots)",
+    options=[1, 8, 32, 125],
+    value=1,
+    help="1 = exact. Plus grand: moins de requêtes sur les zones vides, au risque d'ignorer des registres isolés.",
+)
+
+path = dump_dir / f"unit{unit:03d}_fc{fc:02d}.mbdump"
+existing = None
+if path.exists():
+    try:
+        existing = RegisterDump.load(path)
+    except (OSError, ValueError) as exc:
+        st.error(f"Sauvegarde illisible ({path.name}): {exc}")
+
+if existing is not None:
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Registres valides", existing.count(VALID))
+    m2.metric("Trous", existing.count(HOLE))
+    m3.metric("Restant à lire", existing.count(UNKNOWN))
+    m4.metric("Créée le", datetime.fromtimestamp(existing.created).strftime("%d/%m %H:%M"))
+    st.caption(f"{path} · plage {existing.start}…{existing.end}")
+
+job: DumpJob | None = st.session_state.get("dump_job")
+
+
+def launch(target, *args) -> None:
+    new_job = DumpJob(path=path)
+    st.session_state.dump_job = new_job
+    threading.Thread(target=target, args=(cli, new_job, *args), name="dump", daemon=True).start()
+    st.rerun()
+
+
+if job is None or job.finished:
+    b1, b2, b3, b4 = st.columns(4)
+    if b1.button("Nouvelle sauvegarde"):
+        if end < start:
+            st.error("Plage invalide")
+        else:
+            dump = RegisterDump(unit, fc, start, end)
+            if existing is not None:
+                dump.seed_holes(existing)  # holes found last time are not probed again
+            launch(run_dump_job, dump, min_hole)
+    if existing is not None and not existing.complete and b2.button("Reprendre"):
+        launch(run_dump_job, existing, min_hole)
+    if existing is not None and fc == 3:
+        if b3.button("Comparer à l'appareil"):
+            launch(run_restore_job, existing, True, True)
+        if st.session_state.get("role", "RO") == "ADMIN":
+            if b4.button("Restaurer (registres modifiés)"):
+                launch(run_restore_job, existing, True, False)
+        else:
+            b4.caption("Restauration: rôle ADMIN requis")
+
+if job is not None and not job.finished:
+    if st.button("Interrompre"):
+        job.cancel.set()
+    prog = st.progress(0.0, text="En cours…")
+    while not job.finished:
+        frac = job.done / job.total if job.total else 0.0
+        prog.progress(min(frac, 1.0), text=f"{job.done}/{job.total}")
+        time.sleep(0.3)
+    st.rerun()
+
+if job is not None and job.finished:
+    if job.error:
+        st.error(f"Échec: {job.error}")
+    elif job.stats is not None:
+        s = job.stats
+        msg = f"{s.transactions} requête(s), {s.holes_found} trou(s) trouvé(s) en {s.elapsed_s:.1f} s"
+        if s.aborted:
+            st.warning(f"Sauvegarde interrompue ({s.aborted}) : {msg}. « Reprendre » continue où elle s'est arrêtée.")
+        else:
+            st.success(f"Sauvegarde terminée : {msg}")
+    elif job.restore is not None:
+        r = job.restore
+        st.info(
+            f"{r.changed} registre(s) différent(s) sur {r.compared} comparé(s)"
+            + (f" · {r.written} écrit(s) en {r.writes} requête(s) FC16" if r.writes else "")
+        )
+        if r.failed:
+            st.error(f"Refusé par l'appareil: {', '.join(f'{a}(+{n})' for a, n in r.failed[:50])}")
+        if r.changes:
+            st.dataframe(
+                [{"adresse": a, "sauvegarde": ref, "appareil": cur} for a, ref, cur in r.changes[:1000]],
+                use_container_width=True,
+            )
+
+if path.exists() and st.button("Préparer le téléchargement"):
+    with open(path, "rb") as fh:
+        st.download_button("Télécharger la sauvegarde", data=fh, file_name=path.name)